@@ -0,0 +1,242 @@
+"""
+Autocomplete - Índice de prefixos com pontuação frecency para a barra de endereço
+
+- Chaves por URL: URL sem esquema, etiquetas do host, segmentos e tokens do caminho
+- Lista ordenada das chaves distintas + postings (chave -> ids de URL): as
+  chaves com um dado prefixo formam um intervalo contíguo da lista (bisect),
+  e as sugestões são os URLs desse intervalo com maior frecency
+- Os prefixos curtos (até SHORT_PREFIX caracteres) cobrem quase todas as
+  chaves; para esses há uma lista limitada (TOP_K) com os URLs de maior
+  frecency, mantida a cada visita, e a primeira tecla não percorre o índice
+- Frecency = soma das visitas com decaimento exponencial (meia-vida configurável),
+  guardada em escala logarítmica relativa a uma época fixa: as pontuações só
+  sobem com o tempo e não é preciso recalcular o decaimento de ninguém
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+
+# Época fixa para a escala logarítmica (2020-01-01 UTC)
+EPOCH_BASE = 1577836800
+HALF_LIFE_DAYS = 30
+BOOKMARK_WEIGHT = 5.0
+# prefixos com lista top-K pré-calculada e tamanho dessas listas
+SHORT_PREFIX = 3
+TOP_K = 32
+# acima de qualquer carácter: query + _KEY_END limita o intervalo do prefixo
+_KEY_END = '\U0010ffff'
+
+_SCHEME_RE = re.compile(r'^[a-z][a-z0-9+.-]*://')
+_SEGMENT_SPLIT_RE = re.compile(r'[/?#&=]+')
+_TOKEN_SPLIT_RE = re.compile(r'[^0-9a-z]+')
+
+
+def strip_url(text: str) -> str:
+    """Normaliza texto para comparação: minúsculas, sem esquema nem 'www.'"""
+    text = _SCHEME_RE.sub('', text.strip().lower())
+    if text.startswith('www.'):
+        text = text[4:]
+    return text
+
+
+def url_keys(url: str) -> set:
+    """Chaves do índice para um URL: URL sem esquema, etiquetas do host e segmentos do caminho"""
+    stripped = strip_url(url)
+    if not stripped:
+        return set()
+    keys = {stripped}
+    host, _, path = stripped.partition('/')
+    for label in host.split('.')[:-1]:
+        if len(label) >= 2:
+            keys.add(label)
+    for segment in _SEGMENT_SPLIT_RE.split(path):
+        if len(segment) >= 2:
+            keys.add(segment)
+            for token in _TOKEN_SPLIT_RE.split(segment):
+                if len(token) >= 2:
+                    keys.add(token)
+    return keys
+
+
+def _short_prefixes(keys) -> set:
+    return {key[:n] for key in keys for n in range(1, SHORT_PREFIX + 1)}
+
+
+class FrecencyIndex:
+    """Índice em memória de URLs do histórico/bookmarks ordenado por frecency"""
+
+    def __init__(self, half_life_days: float = HALF_LIFE_DAYS):
+        self.decay = math.log(2) / (half_life_days * 86400)
+        self.ids = {}       # url -> id
+        self.urls = []      # id -> url (None depois de remove)
+        self.titles = []    # id -> título
+        self.scores = []    # id -> log(frecency)
+        self.postings = {}  # chave -> [ids]
+        self.keys = []      # chaves distintas, ordenadas
+        # prefixo curto -> ids com maior frecency (ordem decrescente); em
+        # partial ficam os prefixos com mais candidatos do que a lista
+        self.top = {}
+        self.partial = set()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _log_weight(self, timestamp: float, weight: float) -> float:
+        return (timestamp - EPOCH_BASE) * self.decay + math.log(weight)
+
+    def add_visit(self, url: str, title: str = '', timestamp: float = None, weight: float = 1.0):
+        """Regista uma visita (ou peso equivalente) e atualiza o índice"""
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            self._add(url, title, self._log_weight(timestamp, weight))
+
+    def load(self, rows):
+        """Carga de (url, título, nº de visitas, última visita)
+
+        Num índice vazio as chaves e as listas dos prefixos curtos são
+        calculadas uma só vez no fim.
+        """
+        with self.lock:
+            bulk = not self.keys
+            for url, title, count, last in rows:
+                self._add(url, title, self._log_weight(last, max(count, 1)), incremental=not bulk)
+            if bulk:
+                self.keys = sorted(self.postings)
+                self.top = {}
+                self.partial = set()
+                for prefix in _short_prefixes(self.keys):
+                    self._build_top(prefix)
+
+    def add_bookmark(self, url: str, title: str = '', timestamp: float = None):
+        """Bookmarks contam como várias visitas"""
+        self.add_visit(url, title, timestamp, BOOKMARK_WEIGHT)
+
+    def _add(self, url: str, title: str, log_weight: float, incremental: bool = True):
+        uid = self.ids.get(url)
+        if uid is not None:
+            old = self.scores[uid]
+            # log(e^a + e^b) estável
+            hi, lo = (old, log_weight) if old >= log_weight else (log_weight, old)
+            self.scores[uid] = hi + math.log1p(math.exp(lo - hi))
+            if title:
+                self.titles[uid] = title
+            if incremental:
+                for prefix in _short_prefixes(url_keys(url)):
+                    self._bump_top(prefix, uid)
+            return
+        uid = len(self.urls)
+        self.ids[url] = uid
+        self.urls.append(url)
+        self.titles.append(title or '')
+        self.scores.append(log_weight)
+        keys = url_keys(url)
+        for key in keys:
+            postings = self.postings.get(key)
+            if postings is None:
+                self.postings[key] = [uid]
+                if incremental:
+                    insort(self.keys, key)
+            else:
+                postings.append(uid)
+        if incremental:
+            for prefix in _short_prefixes(keys):
+                self._bump_top(prefix, uid)
+
+    def _candidates(self, prefix: str) -> set:
+        """Ids de todos os URLs com uma chave começada por prefix"""
+        keys, postings = self.keys, self.postings
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + _KEY_END, lo)
+        candidates = set()
+        for i in range(lo, hi):
+            candidates.update(postings[keys[i]])
+        return candidates
+
+    def _build_top(self, prefix: str):
+        candidates = self._candidates(prefix)
+        if len(candidates) > TOP_K:
+            self.partial.add(prefix)
+        else:
+            self.partial.discard(prefix)
+        self.top[prefix] = heapq.nlargest(TOP_K, candidates, key=self.scores.__getitem__)
+
+    def _bump_top(self, prefix: str, uid: int):
+        """O URL uid subiu de pontuação (ou é novo): atualiza a lista do prefixo"""
+        top = self.top.setdefault(prefix, [])
+        scores = self.scores
+        if uid in top:
+            top.remove(uid)
+        elif len(top) >= TOP_K:
+            if scores[uid] <= scores[top[-1]]:
+                self.partial.add(prefix)
+                return
+            top.pop()
+            self.partial.add(prefix)
+        # listas curtas: inserção ordenada sem bisect (ordem decrescente)
+        score = scores[uid]
+        i = len(top)
+        while i and scores[top[i - 1]] < score:
+            i -= 1
+        top.insert(i, uid)
+
+    def remove(self, url: str):
+        """Tira um URL do índice (por exemplo, sem visitas depois de apagar histórico)"""
+        with self.lock:
+            uid = self.ids.pop(url, None)
+            if uid is None:
+                return
+            for key in url_keys(url):
+                postings = self.postings.get(key)
+                if postings is None:
+                    continue
+                postings.remove(uid)
+                if not postings:
+                    del self.postings[key]
+                    i = bisect_left(self.keys, key)
+                    if i < len(self.keys) and self.keys[i] == key:
+                        del self.keys[i]
+            # o resto de cada lista continua a ser o top dos candidatos que sobram
+            for prefix in _short_prefixes(url_keys(url)):
+                top = self.top.get(prefix)
+                if top is not None and uid in top:
+                    top.remove(uid)
+                    if not top and prefix not in self.partial:
+                        del self.top[prefix]
+            self.urls[uid] = None
+            self.titles[uid] = ''
+            self.scores[uid] = -math.inf
+
+    def suggest(self, text: str, limit: int = 8) -> list:
+        """Retorna [(url, título)] mais relevantes para o texto escrito"""
+        query = strip_url(text)
+        if not query:
+            return []
+        with self.lock:
+            if len(query) <= SHORT_PREFIX and limit <= TOP_K:
+                top = self.top.get(query, ())
+                if len(top) < limit and query in self.partial:
+                    # remoções esvaziaram a lista: recalcular uma vez
+                    self._build_top(query)
+                    top = self.top[query]
+                best = top[:limit]
+            else:
+                best = heapq.nlargest(limit, self._candidates(query), key=self.scores.__getitem__)
+            return [(self.urls[uid], self.titles[uid]) for uid in best]
+
+    def clear(self):
+        with self.lock:
+            self.ids = {}
+            self.urls = []
+            self.titles = []
+            self.scores = []
+            self.postings = {}
+            self.keys = []
+            self.top = {}
+            self.partial = set()
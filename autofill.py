@@ -0,0 +1,136 @@
+"""
+Autofill - Preenchimento de logins com as senhas guardadas
+
+- A aba sabe, desde o urlChanged, que logins existem para a origem (índice
+  origem -> logins do PasswordManager, lookup O(1))
+- Só nas páginas com logins guardados, no fim do carregamento, o cliente do
+  QWebChannel e o script de autofill correm no mundo isolado da aplicação;
+  as restantes páginas não recebem nenhum script
+- O script procura um campo de senha; com formulário de login, a página
+  avisa o AutofillBridge da aba pelo QWebChannel
+- A senha só é desencriptada quando o utilizador pede o preenchimento;
+  o bridge envia-a à página pelo sinal fill
+"""
+
+from functools import lru_cache
+
+from PySide6.QtCore import QObject, QFile, QIODevice, Signal, Slot
+from PySide6.QtWebChannel import QWebChannel
+from PySide6.QtWebEngineCore import QWebEngineScript
+
+from url_canon import canonical_origin
+
+
+BRIDGE_NAME = 'pixletAutofill'
+
+AUTOFILL_JS = '''
+(function () {
+    'use strict';
+    // uma só vez por documento (o carregamento pode terminar mais de uma vez)
+    if (window.pixletAutofillReady || !document.querySelector('input[type=password]') ||
+            typeof qt === 'undefined' || !qt.webChannelTransport) {
+        return;
+    }
+    window.pixletAutofillReady = true;
+    function usernameField(password) {
+        // o campo de utilizador é o último campo de texto antes do da senha
+        var scope = password.form || document;
+        var inputs = scope.querySelectorAll('input[type=email], input[type=text], input:not([type])');
+        var found = null;
+        for (var i = 0; i < inputs.length; i++) {
+            if (inputs[i].compareDocumentPosition(password) & Node.DOCUMENT_POSITION_FOLLOWING) {
+                found = inputs[i];
+            }
+        }
+        return found;
+    }
+    function setValue(input, value) {
+        input.focus();
+        input.value = value;
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+        input.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+    new QWebChannel(qt.webChannelTransport, function (channel) {
+        var bridge = channel.objects.%s;
+        bridge.fill.connect(function (username, secret) {
+            var password = document.querySelector('input[type=password]');
+            if (!password) {
+                return;
+            }
+            var user = usernameField(password);
+            if (user && username) {
+                setValue(user, username);
+            }
+            setValue(password, secret);
+        });
+        bridge.formDetected(location.href);
+    });
+})();
+''' % BRIDGE_NAME
+
+
+@lru_cache(maxsize=1)
+def _qwebchannel_js() -> str:
+    """Cliente JS do QWebChannel (recurso do Qt)"""
+    f = QFile(':/qtwebchannel/qwebchannel.js')
+    if not f.open(QIODevice.ReadOnly):
+        return ''
+    try:
+        return bytes(f.readAll()).decode('utf-8')
+    finally:
+        f.close()
+
+
+@lru_cache(maxsize=1)
+def autofill_source() -> str:
+    """Cliente do QWebChannel + script de autofill (montado uma só vez)"""
+    return _qwebchannel_js() + AUTOFILL_JS
+
+
+class AutofillBridge(QObject):
+    """Objeto de uma aba exposto à página pelo QWebChannel"""
+    # (utilizador, senha) para a página preencher
+    fill = Signal(str, str)
+    # a página atual tem um formulário de login
+    form_detected = Signal()
+
+    def __init__(self, page):
+        super().__init__(page)
+        self.page = page
+        self.origin = ''
+        self.logins = []
+        self.has_form = False
+
+    def set_url(self, url: str, logins: list):
+        """Nova página (urlChanged): origem e logins guardados para ela"""
+        self.origin = canonical_origin(url)
+        self.logins = logins
+        self.has_form = False
+
+    def on_load_finished(self, ok: bool):
+        """Página carregada: só com logins guardados para a origem corre o script"""
+        if ok and self.logins:
+            # mundo isolado: os scripts da página não veem o bridge
+            self.page.runJavaScript(autofill_source(), QWebEngineScript.ScriptWorldId.ApplicationWorld)
+
+    @property
+    def can_fill(self) -> bool:
+        return self.has_form and bool(self.logins)
+
+    @Slot(str)
+    def formDetected(self, url: str):
+        if canonical_origin(url) != self.origin:
+            # aviso de uma página que entretanto já mudou
+            return
+        self.has_form = True
+        self.form_detected.emit()
+
+
+def install_autofill(page) -> AutofillBridge:
+    """Liga o QWebChannel e o autofill a uma QWebEnginePage; retorna o bridge"""
+    bridge = AutofillBridge(page)
+    channel = QWebChannel(page)
+    channel.registerObject(BRIDGE_NAME, bridge)
+    page.setWebChannel(channel, QWebEngineScript.ScriptWorldId.ApplicationWorld)
+    page.loadFinished.connect(bridge.on_load_finished)
+    return bridge
@@ -0,0 +1,154 @@
+"""
+Bookmark Search - Índice de tokens para filtrar bookmarks enquanto se escreve
+
+- Cada bookmark é partido em tokens (título, URL sem esquema e caminho da
+  pasta), em minúsculas e sem acentos
+- Índice invertido token -> ids, mais a lista ordenada de tokens: um termo
+  da pesquisa é um prefixo, resolvido por pesquisa binária nessa lista
+- Atualizado incrementalmente quando se adiciona, remove, renomeia ou move
+- Termos curtos (muito comuns) ficam em cache até à próxima alteração, e
+  quando o resultado já é pequeno os termos seguintes só o filtram
+"""
+
+import bisect
+import re
+import threading
+import unicodedata
+
+from autocomplete import strip_url
+
+
+# a partir daqui é mais barato filtrar os candidatos do que juntar conjuntos
+REFINE_LIMIT = 2000
+PREFIX_CACHE_SIZE = 64
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos ('Ação' -> 'acao')"""
+    text = text.casefold()
+    if text.isascii():
+        return text
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list:
+    return _WORD_RE.findall(fold(text or ''))
+
+
+def bookmark_tokens(url: str, title: str = '', folder: str = '') -> tuple:
+    """Tokens distintos de um bookmark"""
+    return tuple(set(tokenize(f'{title or ""} {strip_url(url or "")} {folder or ""}')))
+
+
+class BookmarkSearchIndex:
+    """Índice invertido de bookmarks por prefixo de token (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}     # id -> (url, título, pasta, id da pasta)
+        self.tokens = {}      # id -> tokens do bookmark
+        self.postings = {}    # token -> {ids}
+        self.sorted_tokens = []
+        self._prefix_cache = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self, rows):
+        """Construção inicial a partir de (id, url, título, pasta, id da pasta)
+
+        O chamador tem de ter self.lock: assim o índice pode já estar
+        partilhado enquanto é construído (quem o usar espera pelo fim).
+        """
+        for bookmark_id, url, title, folder, parent_id in rows:
+            self._index(bookmark_id, url, title, folder, parent_id)
+        self.sorted_tokens = sorted(self.postings)
+        self._prefix_cache.clear()
+
+    def add(self, bookmark_id: int, url: str, title: str = '', folder: str = '', parent_id: int = None):
+        """Indexa um bookmark (substitui a entrada anterior do mesmo id)"""
+        with self.lock:
+            self._unindex(bookmark_id)
+            for token in self._index(bookmark_id, url, title, folder, parent_id):
+                if len(self.postings[token]) == 1:
+                    bisect.insort(self.sorted_tokens, token)
+            self._prefix_cache.clear()
+
+    def remove(self, bookmark_id: int):
+        with self.lock:
+            self._unindex(bookmark_id)
+            self._prefix_cache.clear()
+
+    def _index(self, bookmark_id, url, title, folder, parent_id) -> tuple:
+        tokens = bookmark_tokens(url, title, folder)
+        self.entries[bookmark_id] = (url or '', title or '', folder or '', parent_id)
+        self.tokens[bookmark_id] = tokens
+        postings = self.postings
+        for token in tokens:
+            ids = postings.get(token)
+            if ids is None:
+                postings[token] = {bookmark_id}
+            else:
+                ids.add(bookmark_id)
+        return tokens
+
+    def _unindex(self, bookmark_id):
+        if self.entries.pop(bookmark_id, None) is None:
+            return
+        for token in self.tokens.pop(bookmark_id):
+            ids = self.postings[token]
+            ids.discard(bookmark_id)
+            if not ids:
+                del self.postings[token]
+                i = bisect.bisect_left(self.sorted_tokens, token)
+                del self.sorted_tokens[i]
+
+    def _prefix(self, term: str) -> set:
+        """Ids com algum token que começa por term"""
+        cached = self._prefix_cache.get(term)
+        if cached is not None:
+            return cached
+        tokens = self.sorted_tokens
+        start = bisect.bisect_left(tokens, term)
+        end = bisect.bisect_left(tokens, term + '\U0010ffff', start)
+        postings = self.postings
+        if end - start == 1:
+            ids = postings[tokens[start]]
+        else:
+            ids = set().union(*(postings[tokens[i]] for i in range(start, end)))
+        if len(self._prefix_cache) >= PREFIX_CACHE_SIZE:
+            self._prefix_cache.clear()
+        self._prefix_cache[term] = ids
+        return ids
+
+    def search(self, text: str) -> set:
+        """Ids dos bookmarks que têm todos os termos do texto (como prefixos)
+
+        Retorna um conjunto novo (vazio se o texto não tiver termos).
+        """
+        # termos mais longos primeiro: são os mais seletivos
+        terms = sorted(set(tokenize(text)), key=len, reverse=True)
+        # 'git' é redundante se também se procura 'github'
+        terms = [t for i, t in enumerate(terms) if not any(u.startswith(t) for u in terms[:i])]
+        if not terms:
+            return set()
+        with self.lock:
+            result = None
+            for term in terms:
+                if result is None:
+                    result = self._prefix(term)
+                elif len(result) <= REFINE_LIMIT:
+                    tokens = self.tokens
+                    result = {i for i in result if any(t.startswith(term) for t in tokens[i])}
+                else:
+                    result = result & self._prefix(term)
+                if not result:
+                    break
+            # cópia: os conjuntos do índice mudam com importações noutra thread
+            return set(result)
+
+    def entry(self, bookmark_id: int) -> tuple:
+        """(url, título, pasta, id da pasta) de um bookmark indexado (ou None)"""
+        return self.entries.get(bookmark_id)
@@ -0,0 +1,193 @@
+"""
+Bookmarks HTML - Importação/exportação no formato Netscape (bookmarks.html)
+
+Formato usado por Chrome, Firefox, Edge e Safari para exportar bookmarks:
+pastas em <H3> seguidas de <DL>, bookmarks em <A HREF=...>, separadores <HR>.
+
+- Importação com parser incremental (html.parser alimentado por blocos):
+  memória limitada ao lote atual, independentemente do tamanho do ficheiro
+- Bookmarks gravados em lotes; URLs já guardados são ignorados pelo índice
+  do BookmarksManager e pastas com o mesmo nome são reaproveitadas
+- Exportação com um gerador de linhas e cursores por pasta: o documento
+  nunca está todo em memória
+"""
+
+import datetime
+import html
+import os
+from html.parser import HTMLParser
+
+from history_io import to_epoch
+
+
+BATCH_SIZE = 5000
+CHUNK_SIZE = 1 << 16
+
+HEADER = '''<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<!-- This is an automatically generated file.
+     It will be read and overwritten.
+     DO NOT EDIT! -->
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+'''
+
+
+def _from_epoch(value) -> str:
+    try:
+        return datetime.datetime.fromtimestamp(int(value)).isoformat()
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+class _NetscapeParser(HTMLParser):
+    """Parser incremental: cria pastas/separadores logo e junta bookmarks em lotes"""
+
+    def __init__(self, bookmarks_manager, progress=None):
+        super().__init__(convert_charrefs=True)
+        self.manager = bookmarks_manager
+        self.progress = progress
+        self.stack = []            # pastas abertas (<DL>)
+        self.folder_title = None   # texto de um <H3> em curso
+        self.next_folder = None    # pasta do último </H3>, aberta pelo próximo <DL>
+        self.link = None           # (href, add_date, partes do título) de um <A> em curso
+        self.batch = []
+        self.batch_parent = None
+        self.imported = 0
+        self.skipped = 0
+        # separadores só entram em pastas criadas por esta importação: numa
+        # pasta reaproveitada (reimportar o mesmo ficheiro) ficariam repetidos
+        self.new_folders = set() if bookmarks_manager.children(None, 1) else {None}
+
+    @property
+    def parent_id(self):
+        return self.stack[-1] if self.stack else None
+
+    def flush(self):
+        """Grava os bookmarks pendentes (sempre todos da mesma pasta)"""
+        if not self.batch:
+            return
+        added = self.manager.add_bookmarks(self.batch, self.batch_parent)
+        self.imported += added
+        self.skipped += len(self.batch) - added
+        self.batch = []
+        if self.progress:
+            self.progress(self.imported + self.skipped)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'h3':
+            self.folder_title = []
+        elif tag == 'a':
+            attrs = dict(attrs)
+            self.link = (attrs.get('href') or '', attrs.get('add_date'), [])
+        elif tag == 'dl':
+            self.stack.append(self.next_folder if self.stack else None)
+            self.next_folder = None
+        elif tag == 'hr' and self.parent_id in self.new_folders:
+            # a ordem na pasta tem de respeitar os bookmarks ainda no lote
+            self.flush()
+            self.manager.add_separator(self.parent_id)
+
+    def handle_endtag(self, tag):
+        if tag == 'h3' and self.folder_title is not None:
+            title = ''.join(self.folder_title).strip()
+            self.folder_title = None
+            self.flush()
+            # importar duas vezes o mesmo ficheiro não duplica pastas
+            self.next_folder = self.manager.find_folder(title, self.parent_id)
+            if self.next_folder is None:
+                self.next_folder = self.manager.add_folder(title, self.parent_id)
+                self.new_folders.add(self.next_folder)
+        elif tag == 'a' and self.link is not None:
+            href, add_date, title = self.link
+            self.link = None
+            if not href or href.lower().startswith(('javascript:', 'place:')):
+                self.skipped += 1
+                return
+            if self.batch and self.batch_parent != self.parent_id:
+                self.flush()
+            self.batch_parent = self.parent_id
+            self.batch.append({'url': href, 'title': ''.join(title).strip(),
+                               'added': _from_epoch(add_date)})
+            if len(self.batch) >= BATCH_SIZE:
+                self.flush()
+        elif tag == 'dl' and self.stack:
+            self.flush()
+            self.stack.pop()
+
+    def handle_data(self, data):
+        if self.folder_title is not None:
+            self.folder_title.append(data)
+        elif self.link is not None:
+            self.link[2].append(data)
+
+
+def import_bookmarks_html(bookmarks_manager, path: str, progress=None) -> tuple:
+    """Importa um ficheiro bookmarks.html; retorna (importados, ignorados)"""
+    parser = _NetscapeParser(bookmarks_manager, progress)
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
+    parser.flush()
+    return parser.imported, parser.skipped
+
+
+def _iter_folder(conn, parent_id, depth: int, counter: list):
+    indent = '    ' * depth
+    cursor = conn.execute(
+        'SELECT id, kind, url, title, added FROM bookmarks WHERE parent_id IS ? '
+        'ORDER BY position, id', (parent_id,))
+    while True:
+        rows = cursor.fetchmany(500)
+        if not rows:
+            return
+        for row in rows:
+            title = html.escape(row['title'] or '', quote=False)
+            added = to_epoch(row['added'])
+            if row['kind'] == 'folder':
+                yield f'{indent}<DT><H3 ADD_DATE="{added}">{title}</H3>\n'
+                yield f'{indent}<DL><p>\n'
+                yield from _iter_folder(conn, row['id'], depth + 1, counter)
+                yield f'{indent}</DL><p>\n'
+            elif row['kind'] == 'separator':
+                yield f'{indent}<HR>\n'
+            else:
+                counter[0] += 1
+                href = html.escape(row['url'] or '', quote=True)
+                yield f'{indent}<DT><A HREF="{href}" ADD_DATE="{added}">{title or href}</A>\n'
+
+
+def iter_bookmarks_html(storage, counter: list = None):
+    """Gerador das linhas do documento bookmarks.html
+
+    Lê numa ligação só de leitura, uma pasta de cada vez. counter[0]
+    conta os bookmarks já produzidos (opcional).
+    """
+    counter = counter if counter is not None else [0]
+    conn = storage.reader()
+    try:
+        yield HEADER
+        yield '<DL><p>\n'
+        yield from _iter_folder(conn, None, 1, counter)
+        yield '</DL><p>\n'
+    finally:
+        conn.close()
+
+
+def export_bookmarks_html(bookmarks_manager, path: str, progress=None) -> int:
+    """Exporta a árvore de bookmarks para bookmarks.html; retorna quantos"""
+    counter = [0]
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        reported = 0
+        for line in iter_bookmarks_html(bookmarks_manager.storage, counter):
+            f.write(line)
+            if progress and counter[0] - reported >= BATCH_SIZE:
+                reported = counter[0]
+                progress(reported)
+    os.replace(tmp, path)
+    return counter[0]
@@ -0,0 +1,73 @@
+"""
+Breach Check - Senhas comprometidas numa lista de hashes SHA-1, offline
+
+Ficheiro no formato de https://haveibeenpwned.com/Passwords (versão
+"ordered by hash"): uma linha por senha, SHA1:CONTAGEM, ordenado por hash.
+
+- O ficheiro é mapeado em memória (mmap) e pesquisado por bisseção sobre
+  os bytes: cada consulta lê ~log2(linhas) páginas, sem carregar a lista
+- A assinatura do ficheiro (tamanho e data) acompanha os resultados
+  guardados, para se saber quando uma lista nova obriga a verificar de novo
+"""
+
+import hashlib
+import mmap
+import os
+
+
+HASH_LEN = 40
+
+
+def sha1_hex(password: str) -> bytes:
+    """SHA-1 da senha em hexadecimal maiúsculo (como na lista)"""
+    return hashlib.sha1(password.encode('utf-8')).hexdigest().upper().encode('ascii')
+
+
+class BreachList:
+    """Lista ordenada de hashes SHA-1 mapeada em memória"""
+
+    def __init__(self, path: str):
+        self.path = path
+        stat = os.stat(path)
+        self.signature = f'{stat.st_size}:{int(stat.st_mtime)}'
+        self._file = open(path, 'rb')
+        # ficheiro vazio não pode ser mapeado
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+        self.size = stat.st_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def count(self, password: str) -> int:
+        """Quantas vezes a senha aparece na lista (0 se não aparece)"""
+        return self.count_hash(sha1_hex(password))
+
+    def count_hash(self, digest: bytes) -> int:
+        """Contagem de um SHA-1 (hex maiúsculo) por bisseção sobre as linhas"""
+        data = self._map
+        lo, hi = 0, self.size
+        # invariante: lo é sempre o início de uma linha
+        while lo < hi:
+            mid = (lo + hi) // 2
+            newline = data.rfind(b'\n', lo, mid)
+            start = newline + 1 if newline >= 0 else lo
+            end = data.find(b'\n', start)
+            if end < 0:
+                end = self.size
+            line_hash = data[start:start + HASH_LEN].upper()
+            if line_hash < digest:
+                lo = end + 1
+            elif line_hash > digest:
+                hi = start
+            else:
+                count = data[start + HASH_LEN:end].strip().lstrip(b':')
+                return int(count) if count.isdigit() else 1
+        return 0
@@ -0,0 +1,197 @@
+"""
+History Analytics - Estatísticas de navegação sobre o histórico em colunas
+
+- Visitas guardadas em colunas array('q') (epoch) e array('l') (id do host),
+  ordenadas por epoch, com os hosts guardados uma só vez
+- Construídas numa thread por uma ligação só de leitura, em blocos
+  (np.fromiter); remoções de um período só cortam essa fatia das colunas
+- Top sites e histogramas por dia/hora calculados com NumPy (bincount,
+  argpartition) sobre vistas sem cópia das colunas
+- Sem NumPy usa collections.Counter (mesmos resultados, mais lento)
+
+Instalação (opcional):
+    pip install numpy
+"""
+
+import datetime
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import chain
+from urllib.parse import urlsplit
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
+
+def url_host(url: str) -> str:
+    """Host de um URL, sem 'www.' (vazio se não tiver)"""
+    try:
+        host = urlsplit(url).hostname or ''
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+CHUNK_SIZE = 50000
+
+
+class HistoryColumns:
+    """Histórico em colunas: epoch e id do host de cada visita, por epoch"""
+
+    def __init__(self):
+        self.times = array('q')
+        self.host_ids = array('l')
+        self.hosts = []          # id -> host
+        self.host_ids_by_name = {}
+        # rowid da última visita lida da BD (ver catch_up)
+        self.last_rowid = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    def _host_id(self, host: str) -> int:
+        hid = self.host_ids_by_name.get(host)
+        if hid is None:
+            hid = self.host_ids_by_name[host] = len(self.hosts)
+            self.hosts.append(host)
+        return hid
+
+    def append(self, url: str, epoch: float):
+        """Acrescenta uma visita (usado como visit_listener do HistoryManager)"""
+        epoch = int(epoch)
+        host_id = self._host_id(url_host(url))
+        if self.times and epoch < self.times[-1]:
+            # relógio atrasado: manter a ordem por epoch
+            i = bisect_right(self.times, epoch)
+            self.times.insert(i, epoch)
+            self.host_ids.insert(i, host_id)
+            return
+        self.times.append(epoch)
+        self.host_ids.append(host_id)
+
+    def remove_range(self, start: float, end: float):
+        """Tira as visitas com start <= epoch < end (HistoryManager.delete_range)"""
+        lo = bisect_left(self.times, int(start))
+        hi = bisect_left(self.times, int(end))
+        del self.times[lo:hi]
+        del self.host_ids[lo:hi]
+
+    @classmethod
+    def from_storage(cls, storage) -> 'HistoryColumns':
+        """Constrói as colunas a partir das tabelas urls/visits (para correr numa thread)
+
+        Lê por storage.reader(), sem o lock partilhado, num só snapshot;
+        last_rowid fica com a última visita desse snapshot.
+        """
+        columns = cls()
+        conn = storage.reader()
+        conn.row_factory = None
+        try:
+            conn.execute('BEGIN')
+            # host calculado uma vez por URL, não por visita
+            url_hosts = {}
+            for url_id, url in conn.execute('SELECT id, url FROM urls'):
+                url_hosts[url_id] = columns._host_id(url_host(url))
+            columns.last_rowid = conn.execute('SELECT COALESCE(MAX(rowid), 0) FROM visits').fetchone()[0]
+            cursor = conn.execute(
+                'SELECT url_id, visited_at FROM visits WHERE rowid <= ?', (columns.last_rowid,))
+            if np is not None:
+                columns._load_numpy(cursor, url_hosts)
+            else:
+                pairs = []
+                for rows in iter(lambda: cursor.fetchmany(CHUNK_SIZE), []):
+                    pairs.extend((ts, url_hosts.get(url_id, 0)) for url_id, ts in rows)
+                pairs.sort()
+                columns.times.extend(ts for ts, _ in pairs)
+                columns.host_ids.extend(host_id for _, host_id in pairs)
+        finally:
+            conn.close()
+        return columns
+
+    def _load_numpy(self, cursor, url_hosts: dict):
+        """Lê (url_id, epoch) em blocos e grava as colunas ordenadas por epoch"""
+        host_dtype = np.dtype(f'i{self.host_ids.itemsize}')
+        # url_id -> id do host, como tabela indexada
+        lookup = np.zeros(max(url_hosts, default=0) + 1, dtype=host_dtype)
+        lookup[np.fromiter(url_hosts.keys(), np.int64, len(url_hosts))] = \
+            np.fromiter(url_hosts.values(), host_dtype, len(url_hosts))
+        times, hosts = [], []
+        for rows in iter(lambda: cursor.fetchmany(CHUNK_SIZE), []):
+            flat = np.fromiter(chain.from_iterable(rows), np.int64, 2 * len(rows))
+            hosts.append(lookup[flat[0::2]])
+            times.append(flat[1::2].copy())
+        if not times:
+            return
+        times = np.concatenate(times)
+        order = np.argsort(times, kind='stable')
+        self.times.frombytes(times[order].tobytes())
+        self.host_ids.frombytes(np.concatenate(hosts)[order].tobytes())
+
+    def catch_up(self, storage):
+        """Acrescenta as visitas gravadas depois de from_storage (rowid > last_rowid)"""
+        rows = storage.query(
+            'SELECT v.rowid, v.visited_at, u.url FROM visits v JOIN urls u ON u.id = v.url_id '
+            'WHERE v.rowid > ? ORDER BY v.rowid', (self.last_rowid,))
+        for rowid, visited_at, url in rows:
+            self.append(url, visited_at)
+            self.last_rowid = rowid
+
+    def _selection(self, start: float = None, end: float = None):
+        """Colunas (times, host_ids) restritas a [start, end)"""
+        # colunas ordenadas por epoch: o período é uma fatia contígua
+        lo = 0 if start is None else bisect_left(self.times, int(start))
+        hi = len(self.times) if end is None else bisect_left(self.times, int(end))
+        if np is not None:
+            times = np.frombuffer(self.times, dtype=np.int64) if len(self.times) else np.zeros(0, np.int64)
+            hosts = (np.frombuffer(self.host_ids, dtype=np.dtype(f'i{self.host_ids.itemsize}'))
+                     if len(self.host_ids) else np.zeros(0, np.int64))
+            return times[lo:hi], hosts[lo:hi]
+        return self.times[lo:hi], self.host_ids[lo:hi]
+
+    def top_sites(self, n: int = 20, start: float = None, end: float = None) -> list:
+        """Retorna [(host, nº de visitas)] dos n hosts mais visitados"""
+        _, hosts = self._selection(start, end)
+        if np is not None:
+            if not len(hosts):
+                return []
+            counts = np.bincount(hosts, minlength=len(self.hosts))
+            n = min(n, len(counts))
+            top = np.argpartition(-counts, n - 1)[:n]
+            top = top[np.argsort(-counts[top], kind='stable')]
+            return [(self.hosts[i], int(counts[i])) for i in top if counts[i] > 0]
+        return [(self.hosts[h], c) for h, c in Counter(hosts).most_common(n)]
+
+    @staticmethod
+    def _utc_offset() -> int:
+        """Desvio atual da hora local (aproximação: ignora mudanças de DST)"""
+        return time.localtime().tm_gmtoff or 0
+
+    def visits_per_day(self, start: float = None, end: float = None) -> list:
+        """Retorna [(data, nº de visitas)] por dia local, só dias com visitas"""
+        times, _ = self._selection(start, end)
+        offset = self._utc_offset()
+        if np is not None:
+            if not len(times):
+                return []
+            days = (times + offset) // 86400
+            first = int(days.min())
+            counts = np.bincount(days - first)
+            nonzero = np.nonzero(counts)[0]
+            return [(datetime.date.fromordinal(719163 + first + int(d)), int(counts[d])) for d in nonzero]
+        counts = Counter((t + offset) // 86400 for t in times)
+        return [(datetime.date.fromordinal(719163 + d), c) for d, c in sorted(counts.items())]
+
+    def visits_per_hour(self, start: float = None, end: float = None) -> list:
+        """Retorna lista de 24 contagens (visitas por hora local do dia)"""
+        times, _ = self._selection(start, end)
+        offset = self._utc_offset()
+        if np is not None:
+            if not len(times):
+                return [0] * 24
+            return [int(c) for c in np.bincount(((times + offset) // 3600) % 24, minlength=24)]
+        counts = Counter(((t + offset) // 3600) % 24 for t in times)
+        return [counts.get(h, 0) for h in range(24)]
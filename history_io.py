@@ -0,0 +1,227 @@
+"""
+History IO - Exportação/importação em streaming de histórico e bookmarks
+
+Formatos (escolhidos pela extensão do ficheiro):
+    .jsonl  um registo JSON por linha
+    .csv    cabeçalho url,title,visited_at (ou url,title,added)
+    .json   array JSON (formato antigo history.json / bookmarks.json), só importação
+
+A memória usada é limitada ao tamanho de um lote, independentemente do
+tamanho do ficheiro: as linhas são lidas/escritas uma a uma e gravadas
+na base de dados em lotes, com duplicados ignorados.
+"""
+
+import csv
+import datetime
+import json
+import os
+
+
+BATCH_SIZE = 10000
+
+
+def to_epoch(value) -> int:
+    """Converte timestamp ISO (hora local), epoch ou texto numérico em segundos epoch"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        return int(value.strip())
+    try:
+        return int(datetime.datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return 0
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16):
+    """Parser em streaming de um array JSON: produz um elemento de cada vez
+
+    Lê o ficheiro por blocos e usa raw_decode, por isso a memória usada é
+    a de um elemento e não a do ficheiro inteiro. Pára sem erro num
+    ficheiro truncado.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = f.read(chunk_size).lstrip()
+        if not buf.startswith('['):
+            return
+        pos = 1
+        eof = False
+        while True:
+            # saltar espaços e vírgulas entre elementos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                buf, pos = f.read(chunk_size), 0
+                eof = not buf
+            if pos >= len(buf) or buf[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    return
+                # elemento cortado a meio do bloco: ler mais
+                more = f.read(chunk_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield item
+            pos = end
+
+
+def iter_jsonl(path: str):
+    """Lê registos de um ficheiro JSONL, ignorando linhas inválidas/truncadas"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # última linha pode ter ficado a meio num crash
+                continue
+
+
+def iter_records(path: str):
+    """Registos (dicionários) de um ficheiro .jsonl, .csv ou .json"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.DictReader(f)
+    elif ext == '.json':
+        yield from iter_json_array(path)
+    else:
+        yield from iter_jsonl(path)
+
+
+def _batches(iterable, size: int = BATCH_SIZE):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Writer:
+    """Escreve registos em JSONL ou CSV conforme a extensão"""
+
+    def __init__(self, f, path: str, fields: list):
+        self.csv = os.path.splitext(path)[1].lower() == '.csv'
+        self.f = f
+        self.fields = fields
+        if self.csv:
+            self.writer = csv.writer(f)
+            self.writer.writerow(fields)
+
+    def write(self, row: tuple):
+        if self.csv:
+            self.writer.writerow(row)
+        else:
+            self.f.write(json.dumps(dict(zip(self.fields, row)), ensure_ascii=False) + '\n')
+
+
+def _export(storage, path: str, sql: str, fields: list, progress=None) -> int:
+    """Exporta o resultado de uma query em streaming (escrita atómica)"""
+    count = 0
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8', newline='') as f:
+        writer = _Writer(f, path, fields)
+        # ligação só de leitura própria: não bloqueia as escritas da GUI
+        conn = storage.reader()
+        try:
+            cursor = conn.execute(sql)
+            while True:
+                rows = cursor.fetchmany(BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    writer.write(tuple(row))
+                count += len(rows)
+                if progress:
+                    progress(count)
+        finally:
+            conn.close()
+    os.replace(tmp, path)
+    return count
+
+
+def export_history(history_manager, path: str, progress=None) -> int:
+    """Exporta todas as visitas (url, title, visited_at epoch); retorna quantas"""
+    return _export(
+        history_manager.storage, path,
+        'SELECT u.url, u.title, v.visited_at FROM visits v JOIN urls u ON u.id = v.url_id '
+        'ORDER BY v.visited_at, v.rowid',
+        ['url', 'title', 'visited_at'], progress)
+
+
+def export_bookmarks(bookmarks_manager, path: str, progress=None) -> int:
+    """Exporta todos os bookmarks (url, title, added); retorna quantos"""
+    return _export(
+        bookmarks_manager.storage, path,
+        "SELECT url, title, added FROM bookmarks WHERE kind = 'bookmark' ORDER BY id",
+        ['url', 'title', 'added'], progress)
+
+
+def store_visits(history_manager, visits: list, canonical: bool = False) -> tuple:
+    """Grava um lote de (url, título, epoch), ignorando visitas já existentes
+
+    canonical: os URLs já vêm na forma canónica (não são normalizados de novo).
+    Retorna (gravadas, ignoradas).
+    """
+    added = history_manager.add_visits(visits, skip_existing=True, canonical=canonical)
+    return added, len(visits) - added
+
+
+def store_bookmarks(bookmarks_manager, records: list) -> tuple:
+    """Grava um lote de bookmarks (dicionários), ignorando URLs já guardados
+
+    Retorna (gravados, ignorados).
+    """
+    added = bookmarks_manager.add_bookmarks(records)
+    return added, len(records) - added
+
+
+def import_history(history_manager, path: str, progress=None) -> tuple:
+    """Importa visitas em lotes, ignorando as que já existem
+
+    Aceita registos com 'visited_at' (epoch) ou 'timestamp' (ISO).
+    Retorna (importadas, ignoradas).
+    """
+    imported = skipped = 0
+    for batch in _batches(iter_records(path)):
+        visits = []
+        for record in batch:
+            if not isinstance(record, dict) or not record.get('url'):
+                skipped += 1
+                continue
+            when = record.get('visited_at') or record.get('timestamp')
+            visits.append((record['url'], record.get('title') or '', to_epoch(when)))
+        added, ignored = store_visits(history_manager, visits)
+        imported += added
+        skipped += ignored
+        if progress:
+            progress(imported + skipped)
+    if imported:
+        history_manager.notify_changed()
+    return imported, skipped
+
+
+def import_bookmarks(bookmarks_manager, path: str, progress=None) -> tuple:
+    """Importa bookmarks em lotes, ignorando URLs já guardados
+
+    Retorna (importados, ignorados).
+    """
+    imported = skipped = 0
+    for batch in _batches(iter_records(path)):
+        added, ignored = store_bookmarks(bookmarks_manager, batch)
+        imported += added
+        skipped += ignored
+        if progress:
+            progress(imported + skipped)
+    return imported, skipped
@@ -0,0 +1,371 @@
+"""
+Link Checker - Verificação em segundo plano dos links dos bookmarks
+
+- Cliente HTTP/1.1 mínimo sobre asyncio (sem dependências): HEAD e, se o
+  servidor não o aceitar, GET; segue redirecionamentos
+- Concorrência limitada no total e por host, com um ritmo máximo de pedidos
+  por host; os URLs são intercalados por host para não ficarem à espera
+  uns dos outros
+- Ligações keep-alive reutilizadas por (esquema, host, porta)
+- Resultados em cache com TTL: verificar de novo só repete os antigos
+- Corre num event loop próprio (LinkChecker.run), fora da thread da GUI
+
+Cada link fica 'ok', 'redirected' (o URL final é outro), 'slow' (acima de
+slow_seconds) ou 'dead' (erro de ligação, timeout ou código >= 400).
+"""
+
+import asyncio
+import ssl
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit, urljoin
+
+from url_canon import canonical_url
+
+
+CONCURRENCY = 64
+PER_HOST = 4
+HOST_RATE = 10.0          # pedidos por segundo a cada host
+TIMEOUT = 10.0
+SLOW_SECONDS = 3.0
+CACHE_TTL = 24 * 3600
+MAX_REDIRECTS = 5
+# corpo de respostas a GET lido para poder reutilizar a ligação
+MAX_BODY = 64 * 1024
+MAX_HEADERS = 100
+
+USER_AGENT = 'Pixlet-LinkChecker/1.0'
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# códigos com que alguns servidores recusam HEAD mas respondem a GET
+HEAD_FALLBACK_CODES = frozenset({400, 403, 404, 405, 501})
+REDIRECT_CODES = frozenset({301, 302, 303, 307, 308})
+
+OK = 'ok'
+REDIRECTED = 'redirected'
+SLOW = 'slow'
+DEAD = 'dead'
+
+
+class LinkResult:
+    """Resultado da verificação de um URL"""
+    __slots__ = ('url', 'status', 'code', 'final_url', 'elapsed', 'error', 'checked_at')
+
+    def __init__(self, url: str, status: str, code: int = 0, final_url: str = '',
+                 elapsed: float = 0.0, error: str = ''):
+        self.url = url
+        self.status = status
+        self.code = code
+        self.final_url = final_url or url
+        self.elapsed = elapsed
+        self.error = error
+        self.checked_at = time.time()
+
+    def __repr__(self):
+        return f'LinkResult({self.url!r}, {self.status!r}, code={self.code})'
+
+
+class LinkCache:
+    """Resultados por URL, válidos durante ttl segundos"""
+
+    def __init__(self, ttl: float = CACHE_TTL):
+        self.ttl = ttl
+        self.results = {}
+
+    def get(self, url: str) -> LinkResult:
+        result = self.results.get(url)
+        if result is None or time.time() - result.checked_at > self.ttl:
+            return None
+        return result
+
+    def put(self, result: LinkResult):
+        self.results[result.url] = result
+
+    def clear(self):
+        self.results.clear()
+
+
+class _HttpError(Exception):
+    pass
+
+
+class _Host:
+    """Limite de pedidos simultâneos e ritmo para um host"""
+    __slots__ = ('semaphore', 'interval', 'next_start')
+
+    def __init__(self, limit: int, rate: float):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_start = 0.0
+
+    async def wait_turn(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self.next_start)
+        self.next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class _ConnectionPool:
+    """Ligações keep-alive livres por (esquema, host, porta)"""
+
+    def __init__(self, ssl_context):
+        self.ssl_context = ssl_context
+        self.idle = {}
+
+    async def open(self, scheme: str, host: str, port: int):
+        """Retorna (reader, writer, reutilizada)"""
+        idle = self.idle.get((scheme, host, port))
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        tls = self.ssl_context if scheme == 'https' else None
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=tls, server_hostname=host if tls else None)
+        return reader, writer, False
+
+    def release(self, key: tuple, reader, writer):
+        self.idle.setdefault(key, []).append((reader, writer))
+
+    def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+
+class _Session:
+    """Estado de uma verificação (check_all): limites por host e ligações
+
+    Criado dentro do event loop da verificação; verificações simultâneas
+    (noutras threads/loops) têm cada uma o seu e só partilham a LinkCache.
+    """
+
+    def __init__(self, ssl_context, per_host: int, host_rate: float):
+        self.per_host = per_host
+        self.host_rate = host_rate
+        self.hosts = {}
+        self.pool = _ConnectionPool(ssl_context)
+
+    def limiter(self, host: str) -> _Host:
+        limiter = self.hosts.get(host)
+        if limiter is None:
+            limiter = self.hosts[host] = _Host(self.per_host, self.host_rate)
+        return limiter
+
+
+async def _read_body(reader, headers: dict) -> bool:
+    """Lê o corpo (se pequeno); retorna True se a ligação pode ser reutilizada"""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        total = 0
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                # trailers até à linha vazia
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return True
+            total += size
+            if total > MAX_BODY:
+                return False
+            await reader.readexactly(size + 2)
+    length = headers.get('content-length')
+    if length is None or not length.isdigit() or int(length) > MAX_BODY:
+        return False
+    await reader.readexactly(int(length))
+    return True
+
+
+class LinkChecker:
+    """Verificador de links assíncrono com limites por host e cache"""
+
+    def __init__(self, concurrency: int = CONCURRENCY, per_host: int = PER_HOST,
+                 host_rate: float = HOST_RATE, timeout: float = TIMEOUT,
+                 slow_seconds: float = SLOW_SECONDS, cache: LinkCache = None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.host_rate = host_rate
+        self.timeout = timeout
+        self.slow_seconds = slow_seconds
+        self.cache = cache if cache is not None else LinkCache()
+        self.ssl_context = ssl.create_default_context()
+
+    def run(self, urls, progress=None) -> list:
+        """Verifica os URLs num event loop novo (para chamar numa thread)"""
+        return asyncio.run(self.check_all(urls, progress))
+
+    async def check_all(self, urls, progress=None) -> list:
+        """Verifica os URLs; progress(n) é chamado a cada 100 verificados"""
+        session = _Session(self.ssl_context, self.per_host, self.host_rate)
+        results = []
+        pending = _interleave_by_host(urls)
+
+        async def worker():
+            while pending:
+                url = pending.popleft()
+                results.append(await self.check(url, session))
+                if progress and len(results) % 100 == 0:
+                    progress(len(results))
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)))))
+        finally:
+            session.pool.close()
+        return results
+
+    async def check(self, url: str, session: _Session = None) -> LinkResult:
+        """Verifica um URL (ou devolve o resultado em cache)
+
+        Sem session (fora de check_all) usa limites e ligações só para este URL.
+        """
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+        own = session is None
+        if own:
+            session = _Session(self.ssl_context, self.per_host, self.host_rate)
+        elapsed = [0.0]
+        try:
+            code, final_url = await self._resolve(session, url, elapsed)
+        except asyncio.TimeoutError:
+            result = LinkResult(url, DEAD, elapsed=elapsed[0], error='timeout')
+        except (OSError, ssl.SSLError, _HttpError, asyncio.IncompleteReadError, ValueError) as e:
+            result = LinkResult(url, DEAD, elapsed=elapsed[0], error=str(e) or type(e).__name__)
+        else:
+            elapsed = elapsed[0]
+            if code >= 400:
+                status = DEAD
+            elif canonical_url(final_url) != canonical_url(url):
+                status = REDIRECTED
+            elif elapsed > self.slow_seconds:
+                status = SLOW
+            else:
+                status = OK
+            result = LinkResult(url, status, code, final_url, elapsed)
+        finally:
+            if own:
+                session.pool.close()
+        self.cache.put(result)
+        return result
+
+    async def _resolve(self, session: _Session, url: str, elapsed: list) -> tuple:
+        """(código final, URL final) seguindo redirecionamentos
+
+        elapsed[0] acumula o tempo de rede (sem a espera pelos limites do host).
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            code, location = await self._request(session, 'HEAD', url, elapsed)
+            if code in HEAD_FALLBACK_CODES:
+                code, location = await self._request(session, 'GET', url, elapsed)
+            if code not in REDIRECT_CODES or not location:
+                return code, url
+            url = urljoin(url, location)
+        raise _HttpError('demasiados redirecionamentos')
+
+    async def _request(self, session: _Session, method: str, url: str, elapsed: list) -> tuple:
+        """Um pedido HTTP: (código, Location)"""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS or not parts.hostname:
+            raise _HttpError(f'esquema não suportado: {scheme or url}')
+        host = parts.hostname
+        port = parts.port or DEFAULT_PORTS[scheme]
+        limiter = session.limiter(host)
+        host_header = host if port == DEFAULT_PORTS[scheme] else f'{host}:{port}'
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        request = (f'{method} {target} HTTP/1.1\r\nHost: {host_header}\r\n'
+                   f'User-Agent: {USER_AGENT}\r\nAccept: */*\r\nConnection: keep-alive\r\n\r\n').encode('latin-1', 'replace')
+        async with limiter.semaphore:
+            await limiter.wait_turn()
+            start = time.monotonic()
+            try:
+                # o timeout só conta a partir da vez deste pedido no host
+                return await asyncio.wait_for(
+                    self._exchange(session.pool, (scheme, host, port), method, request), self.timeout)
+            finally:
+                elapsed[0] += time.monotonic() - start
+
+    async def _exchange(self, pool: _ConnectionPool, key: tuple, method: str, request: bytes) -> tuple:
+        while True:
+            reader, writer, reused = await pool.open(*key)
+            try:
+                writer.write(request)
+                await writer.drain()
+                code, headers = await self._read_head(reader)
+                keep = headers.get('connection', '').lower() != 'close'
+                if method != 'HEAD' and code not in (204, 304):
+                    keep = keep and await _read_body(reader, headers)
+            except (OSError, asyncio.IncompleteReadError, _HttpError):
+                writer.close()
+                # ligação keep-alive fechada pelo servidor entretanto: tentar numa nova
+                if not reused:
+                    raise
+                continue
+            except BaseException:
+                # timeout/cancelamento a meio da resposta: a ligação não é reutilizável
+                writer.close()
+                raise
+            if keep:
+                pool.release(key, reader, writer)
+            else:
+                writer.close()
+            return code, headers.get('location')
+
+    @staticmethod
+    async def _read_head(reader) -> tuple:
+        line = await reader.readline()
+        if not line:
+            raise _HttpError('ligação fechada')
+        fields = line.split(None, 2)
+        if len(fields) < 2 or not fields[0].startswith(b'HTTP/') or not fields[1].isdigit():
+            raise _HttpError('resposta HTTP inválida')
+        code = int(fields[1])
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 100 <= code < 200:
+            # 1xx informativo: a resposta verdadeira vem a seguir
+            return await LinkChecker._read_head(reader)
+        return code, headers
+
+
+def _interleave_by_host(urls) -> deque:
+    """URLs únicos intercalados por host (a, b, c, a, b, c, ...)"""
+    by_host = OrderedDict()
+    seen = set()
+    for url in urls:
+        if url in seen:
+            continue
+        seen.add(url)
+        try:
+            host = urlsplit(url).hostname or ''
+        except ValueError:
+            host = ''
+        by_host.setdefault(host, deque()).append(url)
+    queues = deque(by_host.values())
+    order = deque()
+    while queues:
+        queue = queues.popleft()
+        order.append(queue.popleft())
+        if queue:
+            queues.append(queue)
+    return order
+
+
+def check_bookmarks(bookmarks_manager, checker: LinkChecker = None, progress=None) -> dict:
+    """Verifica os links de todos os bookmarks; retorna {estado: [LinkResult]}"""
+    checker = checker or LinkChecker()
+    urls = [b['url'] for b in bookmarks_manager.bookmarks
+            if b.get('url', '').lower().startswith(('http://', 'https://'))]
+    report = {OK: [], REDIRECTED: [], SLOW: [], DEAD: []}
+    for result in checker.run(urls, progress):
+        report[result.status].append(result)
+    return report
@@ -0,0 +1,143 @@
+"""
+Password IO - Importação de senhas em massa e troca da chave de encriptação
+
+Formatos CSV aceites (exportações de Chrome/Edge, Firefox, Bitwarden, ...):
+    name,url,username,password[,note]
+    url,username,password,httpRealm,formActionOrigin,...
+    ...,login_uri,login_username,login_password,...
+
+- A encriptação (ou reencriptação, na troca de chave) corre por lotes num
+  pool de processos (profile_import.make_pool)
+- Os resultados só são gravados no fim, numa única transação: uma
+  importação ou troca de chave interrompida não deixa nada a meio
+"""
+
+import csv
+
+try:
+    from cryptography.fernet import Fernet  # type: ignore
+except ImportError:
+    Fernet = None
+
+from profile_import import pool_map, make_pool
+
+
+BATCH_SIZE = 500
+
+SERVICE_COLUMNS = ('url', 'origin', 'login_uri', 'website', 'name')
+USERNAME_COLUMNS = ('username', 'login_username', 'login', 'email')
+PASSWORD_COLUMNS = ('password', 'login_password')
+
+
+def _column(header: list, names: tuple) -> str:
+    for name in names:
+        if name in header:
+            return name
+    return None
+
+
+def iter_passwords_csv(path: str):
+    """(serviço, utilizador, senha) de um CSV exportado por outro gestor"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        header = [name.strip().lower() for name in reader.fieldnames or []]
+        reader.fieldnames = header
+        service_col = _column(header, SERVICE_COLUMNS)
+        username_col = _column(header, USERNAME_COLUMNS)
+        password_col = _column(header, PASSWORD_COLUMNS)
+        if service_col is None or password_col is None:
+            raise ValueError('CSV sem colunas de URL/serviço e senha')
+        for row in reader:
+            service = (row.get(service_col) or '').strip()
+            if not service and service_col != 'name':
+                # login sem URL: fica com o nome da entrada
+                service = (row.get('name') or '').strip()
+            username = (row.get(username_col) or '').strip() if username_col else ''
+            yield service, username, row.get(password_col) or ''
+
+
+def _batches(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _encrypt_batch(args) -> list:
+    """Encripta (serviço, utilizador, senha) com a chave dada (corre no pool)"""
+    key, rows = args
+    cipher = Fernet(key)
+    return [(service, username, cipher.encrypt(password.encode()).decode())
+            for service, username, password in rows]
+
+
+def _reencrypt_batch(args) -> list:
+    """(id, token antigo) -> (id, token antigo, token novo) (corre no pool)
+
+    Registos que não se desencriptam com a chave antiga ficam de fora.
+    """
+    old_key, new_key, rows = args
+    old, new = Fernet(old_key), Fernet(new_key)
+    result = []
+    for password_id, token in rows:
+        try:
+            plain = old.decrypt(token.encode())
+        except Exception:
+            continue
+        result.append((password_id, token, new.encrypt(plain).decode()))
+    return result
+
+
+def import_passwords_csv(password_manager, path: str, progress=None) -> tuple:
+    """Importa senhas de um CSV; retorna (novas, atualizadas, ignoradas)
+
+    Logins repetidos no ficheiro ficam com a última senha; logins que já
+    existem ficam com a senha do ficheiro.
+    """
+    if not password_manager.cipher:
+        raise RuntimeError('Encriptação não disponível. Instale: pip install cryptography')
+    logins = {}
+    read = 0
+    for service, username, password in iter_passwords_csv(path):
+        read += 1
+        if service and password:
+            logins[(service, username)] = password
+    rows = [(service, username, password) for (service, username), password in logins.items()]
+    # sem serviço/senha, ou repetidas no ficheiro
+    skipped = read - len(rows)
+
+    key = password_manager.key
+    encrypted = []
+    pool = make_pool()
+    try:
+        for batch in pool_map(_encrypt_batch, ((key, batch) for batch in _batches(rows)), pool):
+            encrypted.extend(batch)
+            if progress:
+                progress(len(encrypted))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    added, updated = password_manager.add_encrypted(encrypted)
+    password_manager.save_passwords()
+    return added, updated, skipped
+
+
+def rotate_key(password_manager, progress=None) -> int:
+    """Reencripta todas as senhas com uma chave nova; retorna quantas"""
+    if not password_manager.cipher:
+        raise RuntimeError('Encriptação não disponível. Instale: pip install cryptography')
+    old_key = password_manager.key
+    new_key = Fernet.generate_key()
+    rows = [(r['id'], r['password']) for r in password_manager.storage.query(
+        'SELECT id, password FROM passwords ORDER BY id')]
+    reencrypted = {}
+    pool = make_pool()
+    try:
+        batches = ((old_key, new_key, batch) for batch in _batches(rows))
+        for batch in pool_map(_reencrypt_batch, batches, pool):
+            for password_id, old_token, new_token in batch:
+                reencrypted[password_id] = (old_token, new_token)
+            if progress:
+                progress(len(reencrypted))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return password_manager.replace_key(new_key, reencrypted)
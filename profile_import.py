@@ -0,0 +1,263 @@
+"""
+Profile Import - Importação de histórico e bookmarks de outros navegadores
+
+Fontes suportadas (cópias dos ficheiros do perfil):
+    History         Chrome/Chromium/Edge/Brave (SQLite: urls + visits)
+    Bookmarks       Chrome/Chromium/Edge/Brave (JSON)
+    places.sqlite   Firefox (SQLite: moz_places, moz_historyvisits, moz_bookmarks)
+
+- As linhas são lidas em streaming e processadas em lotes grandes
+- Normalização e remoção de duplicados de cada lote correm num pool de
+  processos, enquanto o processo principal grava o lote anterior
+- Visitas/bookmarks que já existem no Pixlet são ignorados
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.request import pathname2url
+
+from history_io import store_visits, store_bookmarks
+from url_canon import canonical_url
+
+
+BATCH_SIZE = 50000
+# lotes em processamento no pool ao mesmo tempo (limita a memória)
+MAX_PENDING = 4
+
+# Chromium guarda microssegundos desde 1601-01-01 UTC
+WEBKIT_EPOCH_OFFSET = 11644473600
+IMPORTABLE_SCHEMES = ('http', 'https', 'ftp', 'file')
+
+
+def webkit_to_epoch(value) -> int:
+    """Timestamp do Chromium (µs desde 1601) para segundos epoch"""
+    try:
+        return max(int(value) // 1000000 - WEBKIT_EPOCH_OFFSET, 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def prtime_to_epoch(value) -> int:
+    """PRTime do Firefox (µs desde 1970) para segundos epoch"""
+    try:
+        return max(int(value) // 1000000, 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def normalize_url(url: str) -> str:
+    """URL canónico (url_canon); vazio se não for importável"""
+    url = (url or '').strip()
+    if url.partition(':')[0].lower() not in IMPORTABLE_SCHEMES:
+        return ''
+    return canonical_url(url)
+
+
+def normalize_visits(rows: list) -> list:
+    """Normaliza um lote de (url, título, epoch) e remove duplicados (corre no pool)"""
+    normalized = {}
+    seen = set()
+    visits = []
+    for url, title, ts in rows:
+        # cada URL aparece em muitas visitas: normalizar uma vez por lote
+        norm = normalized.get(url)
+        if norm is None:
+            norm = normalized[url] = normalize_url(url)
+        if not norm or (norm, ts) in seen:
+            continue
+        seen.add((norm, ts))
+        visits.append((norm, title or '', ts))
+    return visits
+
+
+def normalize_bookmarks(rows: list) -> list:
+    """Normaliza um lote de (url, título, epoch) de bookmarks (corre no pool)"""
+    seen = set()
+    bookmarks = []
+    for url, title, ts in rows:
+        # o bookmark guarda o URL original; a forma canónica só serve para deduplicar
+        key = normalize_url(url)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        url = url.strip()
+        added = datetime.datetime.fromtimestamp(ts).isoformat() if ts else None
+        bookmarks.append({'url': url, 'title': title or '', 'added': added})
+    return bookmarks
+
+
+def detect_profile(path: str) -> str:
+    """Tipo de ficheiro: 'chrome', 'chrome-bookmarks' ou 'firefox'"""
+    with open(path, 'rb') as f:
+        header = f.read(16)
+    if not header.startswith(b'SQLite format 3'):
+        if header.lstrip().startswith(b'{'):
+            return 'chrome-bookmarks'
+        raise ValueError('Ficheiro não reconhecido (esperado History, Bookmarks ou places.sqlite)')
+    conn = _connect(path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+    if 'moz_places' in tables:
+        return 'firefox'
+    if {'urls', 'visits'} <= tables:
+        return 'chrome'
+    raise ValueError('Base de dados não é um perfil do Chrome nem do Firefox')
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Abre a base de dados do outro navegador só para leitura"""
+    uri = 'file:' + pathname2url(os.path.abspath(path))
+    try:
+        conn = sqlite3.connect(uri + '?mode=ro', uri=True)
+        conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        return conn
+    except sqlite3.OperationalError:
+        # bloqueada pelo navegador aberto: ler o ficheiro tal como está
+        return sqlite3.connect(uri + '?immutable=1', uri=True)
+
+
+def _iter_query(path: str, sql: str, convert):
+    """Lotes de (url, título, epoch) de uma query sobre o ficheiro do perfil"""
+    conn = _connect(path)
+    try:
+        cursor = conn.execute(sql)
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                return
+            yield [(url, title, convert(ts)) for url, title, ts in rows]
+    finally:
+        conn.close()
+
+
+def iter_chrome_history(path: str):
+    return _iter_query(
+        path,
+        'SELECT u.url, u.title, v.visit_time FROM visits v JOIN urls u ON u.id = v.url',
+        webkit_to_epoch)
+
+
+def iter_firefox_history(path: str):
+    return _iter_query(
+        path,
+        'SELECT p.url, p.title, v.visit_date FROM moz_historyvisits v '
+        'JOIN moz_places p ON p.id = v.place_id',
+        prtime_to_epoch)
+
+
+def iter_firefox_bookmarks(path: str):
+    # type 1 = bookmark (2 = pasta, 3 = separador)
+    return _iter_query(
+        path,
+        'SELECT p.url, b.title, b.dateAdded FROM moz_bookmarks b '
+        'JOIN moz_places p ON p.id = b.fk WHERE b.type = 1',
+        prtime_to_epoch)
+
+
+def iter_chrome_bookmarks(path: str):
+    """Lotes de bookmarks de um ficheiro Bookmarks do Chromium (JSON)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    batch = []
+    roots = [node for node in (data.get('roots') or {}).values() if isinstance(node, dict)]
+    # pilha invertida: percorre pela ordem em que aparecem no Chrome
+    stack = roots[::-1]
+    while stack:
+        node = stack.pop()
+        if node.get('type') == 'url':
+            batch.append((node.get('url'), node.get('name'), webkit_to_epoch(node.get('date_added'))))
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+        stack.extend(reversed(node.get('children') or []))
+    if batch:
+        yield batch
+
+
+def pool_map(func, batches, pool):
+    """Como pool.map, mas com no máximo MAX_PENDING lotes em memória"""
+    if pool is None:
+        yield from map(func, batches)
+        return
+    pending = deque()
+    for batch in batches:
+        pending.append(pool.submit(func, batch))
+        if len(pending) >= MAX_PENDING:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def make_pool():
+    workers = min(4, (os.cpu_count() or 1) - 1)
+    if workers < 1:
+        # um só CPU: o pool só acrescentava o custo de serializar os lotes
+        return None
+    try:
+        return ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError):
+        # sem multiprocessing (ex.: sandbox): normalizar no próprio processo
+        return None
+
+
+def import_profile(path: str, history_manager=None, bookmarks_manager=None, progress=None) -> dict:
+    """Importa histórico e bookmarks de um ficheiro de perfil do Chrome/Firefox
+
+    No Chrome os bookmarks estão no ficheiro Bookmarks ao lado de History e
+    são importados também se existirem. Retorna contagens por tipo:
+    {'visits': (importadas, ignoradas), 'bookmarks': (importados, ignorados)}
+    """
+    kind = detect_profile(path)
+    if kind == 'firefox':
+        sources = [('visits', iter_firefox_history(path)), ('bookmarks', iter_firefox_bookmarks(path))]
+    elif kind == 'chrome':
+        sources = [('visits', iter_chrome_history(path))]
+        sibling = os.path.join(os.path.dirname(path), 'Bookmarks')
+        if os.path.isfile(sibling):
+            sources.append(('bookmarks', iter_chrome_bookmarks(sibling)))
+    else:
+        sources = [('bookmarks', iter_chrome_bookmarks(path))]
+
+    result = {'visits': (0, 0), 'bookmarks': (0, 0)}
+    done = 0
+    pool = make_pool()
+    try:
+        for what, batches in sources:
+            if what == 'visits' and history_manager is None:
+                continue
+            if what == 'bookmarks' and bookmarks_manager is None:
+                continue
+            imported = 0
+            normalize = normalize_visits if what == 'visits' else normalize_bookmarks
+            for batch in pool_map(normalize, _counting(batches, result, what), pool):
+                if what == 'visits':
+                    # normalize_visits já deixou os URLs na forma canónica
+                    added, _ = store_visits(history_manager, batch, canonical=True)
+                else:
+                    added, _ = store_bookmarks(bookmarks_manager, batch)
+                imported += added
+                done += len(batch)
+                if progress:
+                    progress(done)
+            # ignoradas = inválidas/duplicadas no ficheiro + já existentes
+            result[what] = (imported, result.pop(what + '_read', 0) - imported)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if result['visits'][0] and history_manager is not None:
+        history_manager.notify_changed()
+    return result
+
+
+def _counting(batches, result: dict, what: str):
+    """Conta as linhas lidas (inclui as descartadas na normalização)"""
+    key = what + '_read'
+    for batch in batches:
+        result[key] = result.get(key, 0) + len(batch)
+        yield batch
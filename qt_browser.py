@@ -16,16 +16,24 @@ import os
 import json
 import datetime
 import subprocess
+import threading
+import time
 import base64
-from PySide6.QtCore import QUrl, Slot
+import bisect
+import multiprocessing
+from PySide6.QtCore import (
+    Qt, QUrl, Slot, Signal, QTimer, QStringListModel, QAbstractListModel, QAbstractItemModel,
+    QAbstractProxyModel, QAbstractTableModel, QModelIndex, QEvent
+)
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QToolBar, QLineEdit, QTabWidget,
     QWidget, QVBoxLayout, QMessageBox, QMenuBar, QStatusBar,
-    QDialog, QLabel, QPushButton, QFormLayout, QFileDialog,
-    QListWidget, QListWidgetItem, QHBoxLayout, QInputDialog,
-    QTableWidget, QTableWidgetItem, QHeaderView, QSpinBox
+    QDialog, QLabel, QPushButton, QFormLayout, QFileDialog, QMenu,
+    QListView, QTreeView, QHBoxLayout, QInputDialog,
+    QTableWidget, QTableWidgetItem, QHeaderView, QSpinBox, QCompleter, QComboBox,
+    QTableView, QStyledItemDelegate, QStyle, QStyleOptionButton
 )
-from PySide6.QtGui import QAction
+from PySide6.QtGui import QAction, QColor
 from PySide6.QtWebEngineWidgets import QWebEngineView
 
 try:
@@ -33,6 +41,24 @@ try:
 except ImportError:
     Fernet = None
 
+from storage import Storage, migrate_json_file, write_json_atomic
+from autocomplete import FrecencyIndex
+from history_analytics import HistoryColumns
+from history_io import (
+    iter_json_array, iter_jsonl, to_epoch,
+    export_history, import_history, export_bookmarks, import_bookmarks
+)
+from profile_import import import_profile
+from bookmarks_html import import_bookmarks_html, export_bookmarks_html
+from bookmark_search import BookmarkSearchIndex, fold
+from link_checker import LinkChecker, check_bookmarks, DEAD, REDIRECTED, SLOW
+from secret_cache import SecretCache
+from password_io import import_passwords_csv, rotate_key
+from breach_check import BreachList
+from url_canon import canonical_url, canonical_origin, service_key
+from autofill import install_autofill
+from tab_lifecycle import TabLifecycleManager
+
 try:
     from firebase_sync import FirebaseSync
 except ImportError:
@@ -44,6 +70,14 @@ class BrowserTab(QWidget):
         super().__init__()
         self.layout = QVBoxLayout(self)
         self.view = QWebEngineView()
+        # AutofillBridge da página (só com encriptação disponível)
+        self.autofill = None
+        # para o TabLifecycleManager: abas fixas nunca são suspensas
+        self.pinned = False
+        self.last_active = time.monotonic()
+        # a recarregar depois de descartada; recorded_url = último URL registado no histórico
+        self.restoring = False
+        self.recorded_url = ''
         self.view.setUrl(QUrl(url))
         self.layout.addWidget(self.view)
 
@@ -54,172 +88,1102 @@ class BrowserTab(QWidget):
         return self.view.url().toString()
 
 
+def _load_json_list(path: str) -> list:
+    """Lê um ficheiro JSON legado com uma lista de registos"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else []
+
+
+class HistoryEntry:
+    """Entrada de histórico compacta: slots, epoch int e strings partilhadas
+
+    Mantém a interface do dicionário antigo (entry['url'], entry.get('visited'))
+    calculando 'timestamp' e 'visited' só quando são pedidos. url_id (id
+    em urls, 0 se desconhecido) serve de chave de paginação.
+    """
+    __slots__ = ('url', 'title', 'visited_at', 'visit_count', 'url_id')
+    FIELDS = ('url', 'title', 'timestamp', 'visited', 'visit_count')
+
+    def __init__(self, url: str, title: str, visited_at: int, visit_count: int = 1, url_id: int = 0):
+        self.url = url
+        self.title = title
+        self.visited_at = visited_at
+        self.visit_count = visit_count
+        self.url_id = url_id
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.datetime.fromtimestamp(self.visited_at).isoformat()
+
+    @property
+    def visited(self) -> str:
+        return datetime.datetime.fromtimestamp(self.visited_at).strftime('%Y-%m-%d %H:%M:%S')
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __eq__(self, other):
+        if not isinstance(other, HistoryEntry):
+            return NotImplemented
+        return (self.url, self.visited_at) == (other.url, other.visited_at)
+
+    def __hash__(self):
+        return hash((self.url, self.visited_at))
+
+    def __repr__(self):
+        return f'HistoryEntry({self.url!r}, {self.title!r}, {self.visited_at})'
+
+
 class HistoryManager:
-    """Gerencia histórico de navegação com timestamps"""
-    def __init__(self, base_path: str):
+    """Gerencia histórico de navegação (SQLite, agregado por URL)"""
+    # Cargas do mesmo URL dentro desta janela (segundos) contam como uma visita
+    COALESCE_WINDOW = 30
+
+    BATCH_SIZE = 10000
+    # remoções (expirar, limpar período) por lotes, com uma pausa entre eles
+    DELETE_BATCH = 1000
+    DELETE_PAUSE = 0.005
+    # importações gravadas em transações de WRITE_BATCH visitas, com uma pausa entre elas
+    WRITE_BATCH = 2000
+    WRITE_PAUSE = 0.005
+    # URLs por consulta em url_stats_for (abaixo do limite de parâmetros do SQLite)
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, base_path: str, storage: Storage = None, load_async: bool = False):
+        self.storage = storage or Storage(base_path)
         self.history_file = os.path.join(base_path, 'history.json')
-        self.history = self.load_history()
+        self.journal_file = os.path.join(base_path, 'history.jsonl')
+        self.has_fts = self.storage.has_table('urls_fts')
+        # callbacks: visit_listeners(url, title, epoch), change_listeners() e
+        # removal_listeners(start, end, urls) (só as visitas desse período foram
+        # removidas; urls = os URLs que perderam visitas)
+        self.visit_listeners = []
+        self.change_listeners = []
+        self.removal_listeners = []
+        # ready fica ativo quando a importação de dados antigos termina
+        self.ready = threading.Event()
+        self.ready_listeners = []
+        self._ready_lock = threading.Lock()
+        if load_async:
+            threading.Thread(target=self._load, daemon=True).start()
+        else:
+            self._load()
+
+    def _load(self):
+        try:
+            self._migrate_legacy()
+        finally:
+            with self._ready_lock:
+                self.ready.set()
+                listeners, self.ready_listeners = self.ready_listeners, []
+            for listener in listeners:
+                try:
+                    listener()
+                except Exception:
+                    pass
+
+    def when_ready(self, callback):
+        """Chama callback quando o histórico estiver completo (já ou mais tarde)"""
+        with self._ready_lock:
+            if not self.ready.is_set():
+                self.ready_listeners.append(callback)
+                return
+        callback()
+
+    def _migrate_legacy(self):
+        """Importa history.json + journal (formato antigo) uma única vez, em streaming"""
+        last_in_snapshot = []
+
+        def load_snapshot(path):
+            for entry in iter_json_array(path):
+                last_in_snapshot[:] = [entry]
+                yield entry
+
+        rotated = self.history_file + '.compacting'
+
+        def load_rotated(path):
+            pending = list(iter_jsonl(path))
+            # compactação interrompida: o journal rodado pode já estar no snapshot
+            if pending and last_in_snapshot and last_in_snapshot[0] == pending[-1]:
+                return []
+            return pending
+
+        migrate_json_file(self.history_file, load_snapshot, self._insert_rows)
+        migrate_json_file(rotated, load_rotated, self._insert_rows)
+        migrate_json_file(self.journal_file, iter_jsonl, self._insert_rows)
+
+    def _insert_rows(self, entries) -> int:
+        """Grava registos antigos (dicionários) em lotes"""
+        count = 0
+        batch = []
+        for e in entries:
+            if not (isinstance(e, dict) and e.get('url')):
+                continue
+            batch.append((e['url'], e.get('title') or '', to_epoch(e.get('timestamp'))))
+            if len(batch) >= self.BATCH_SIZE:
+                self.add_visits(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.add_visits(batch)
+            count += len(batch)
+        return count
+
+    @staticmethod
+    def _row_to_entry(row) -> 'HistoryEntry':
+        """Converte um registo de urls numa HistoryEntry"""
+        return HistoryEntry(row['url'], row['title'], row['last_visit'], row['visit_count'], row['id'])
+
+    @property
+    def history(self) -> list:
+        """Todas as visitas, por ordem cronológica"""
+        return self.load_history()
 
     def add_entry(self, url: str, title: str = ''):
-        """Adiciona entrada ao histórico"""
-        entry = {
-            'url': url,
-            'title': title,
-            'timestamp': datetime.datetime.now().isoformat(),
-            'visited': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        self.history.append(entry)
-        self.save_history()
+        """Adiciona visita ao histórico (recarregamentos próximos são agregados)"""
+        url = canonical_url(url)
+        now = int(time.time())
+        counted = True
+        with self.storage.transaction() as conn:
+            row = conn.execute(
+                'SELECT id, last_visit FROM urls WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                url_id = conn.execute(
+                    'INSERT INTO urls (url, title, visit_count, first_visit, last_visit) '
+                    'VALUES (?, ?, 1, ?, ?)', (url, title or '', now, now)).lastrowid
+            elif now - row['last_visit'] < self.COALESCE_WINDOW:
+                # reload/redirect: só atualiza o título
+                counted = False
+                if title:
+                    conn.execute('UPDATE urls SET title = ? WHERE id = ?', (title, row['id']))
+            else:
+                url_id = row['id']
+                conn.execute(
+                    "UPDATE urls SET title = COALESCE(NULLIF(?, ''), title), "
+                    'visit_count = visit_count + 1, last_visit = ? WHERE id = ?',
+                    (title or '', now, url_id))
+            if counted:
+                conn.execute(
+                    'INSERT INTO visits (url_id, visited_at) VALUES (?, ?)', (url_id, now))
+        if not counted:
+            return
+        for listener in self.visit_listeners:
+            try:
+                listener(url, title or '', now)
+            except Exception:
+                pass
 
-    def load_history(self) -> list:
-        """Carrega histórico de ficheiro"""
-        if os.path.exists(self.history_file):
+    def add_visits(self, visits, skip_existing: bool = False, canonical: bool = False) -> int:
+        """Insere visitas em lote: iterável de (url, título, epoch)
+
+        Com skip_existing, visitas já gravadas (mesmo URL e epoch) ou
+        repetidas no lote são ignoradas. Com canonical, os URLs já vêm na
+        forma canónica (ex.: normalizados no pool da importação de perfis).
+        Retorna o nº de visitas gravadas.
+
+        Grava em transações de WRITE_BATCH visitas: entre elas o lock fica
+        livre e a GUI pode continuar a gravar e a consultar.
+        """
+        if canonical:
+            rows = [(url, title or '', int(ts)) for url, title, ts in visits if url]
+        else:
+            rows = [(canonical_url(url), title or '', int(ts)) for url, title, ts in visits if url]
+        if skip_existing:
+            rows = list({(url, ts): (url, title, ts) for url, title, ts in rows}.values())
+        if not rows:
+            return 0
+        # só a visita mais recente com título leva o título: MAX(title) no SQL
+        latest = {}
+        for i, (url, title, ts) in enumerate(rows):
+            if title and (url not in latest or ts >= rows[latest[url]][2]):
+                latest[url] = i
+        keep = set(latest.values())
+        rows = [row if i in keep or not row[1] else (row[0], '', row[2]) for i, row in enumerate(rows)]
+        # agrupadas por URL: cada URL é atualizado (e reindexado no full-text)
+        # numa só transação, e não numa por cada lote em que aparece
+        rows.sort()
+        count = 0
+        for i in range(0, len(rows), self.WRITE_BATCH):
+            if i:
+                # dar a vez a quem está à espera do lock
+                time.sleep(self.WRITE_PAUSE)
+            with self.storage.lock:
+                with self.storage.transaction() as conn:
+                    count += self._insert_visits(conn, rows[i:i + self.WRITE_BATCH], skip_existing)
+                self.storage.commit()
+        return count
+
+    @staticmethod
+    def _insert_visits(conn, rows: list, skip_existing: bool) -> int:
+        """Uma transação de add_visits: retorna quantas visitas gravou"""
+        # o lote passa por uma tabela temporária e é gravado com meia dúzia
+        # de instruções em vez de um upsert por visita (cada um disparava
+        # o trigger do índice full-text isoladamente)
+        conn.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS staged_visits ('
+            '  url TEXT NOT NULL, title TEXT NOT NULL, visited_at INTEGER NOT NULL)')
+        conn.executemany('INSERT INTO staged_visits VALUES (?, ?, ?)', rows)
+        if skip_existing:
+            conn.execute(
+                'DELETE FROM staged_visits WHERE EXISTS ('
+                '  SELECT 1 FROM urls u JOIN visits v ON v.url_id = u.id'
+                '  WHERE u.url = staged_visits.url AND v.visited_at = staged_visits.visited_at)')
+        count = conn.execute('SELECT COUNT(*) FROM staged_visits').fetchone()[0]
+        conn.execute(
+            'INSERT INTO urls (url, title, visit_count, first_visit, last_visit) '
+            'SELECT url, MAX(title), COUNT(*), MIN(visited_at), MAX(visited_at) '
+            'FROM staged_visits GROUP BY url '
+            'ON CONFLICT(url) DO UPDATE SET '
+            "  title = CASE WHEN excluded.last_visit >= urls.last_visit AND excluded.title != '' "
+            '    THEN excluded.title ELSE urls.title END, '
+            '  visit_count = urls.visit_count + excluded.visit_count, '
+            '  first_visit = MIN(urls.first_visit, excluded.first_visit), '
+            '  last_visit = MAX(urls.last_visit, excluded.last_visit)')
+        conn.execute(
+            'INSERT INTO visits (url_id, visited_at) '
+            'SELECT u.id, s.visited_at FROM staged_visits s JOIN urls u ON u.url = s.url '
+            'ORDER BY s.visited_at')
+        conn.execute('DELETE FROM staged_visits')
+        return count
+
+    def notify_changed(self):
+        """Avisa consumidores de alterações em massa (importação ou limpeza total)"""
+        for listener in self.change_listeners:
             try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                listener()
             except Exception:
-                return []
-        return []
+                pass
+
+    def notify_removed(self, start: float, end: float, urls: set):
+        """Avisa consumidores de que as visitas com start <= epoch < end foram removidas"""
+        for listener in self.removal_listeners:
+            try:
+                listener(start, end, urls)
+            except Exception:
+                pass
+
+    def load_history(self) -> list:
+        """Carrega o log completo de visitas (entradas compactas)"""
+        entries = []
+        with self.storage.lock:
+            # url/título lidos uma vez por URL e partilhados por todas as visitas
+            urls = {row[0]: (sys.intern(row[1]), row[2]) for row in
+                    self.storage.conn.execute('SELECT id, url, title FROM urls')}
+            cursor = self.storage.conn.execute(
+                'SELECT url_id, visited_at FROM visits ORDER BY visited_at, rowid')
+            for url_id, visited_at in cursor:
+                url, title = urls.get(url_id, ('', ''))
+                entries.append(HistoryEntry(url, title, visited_at))
+        return entries
 
     def save_history(self):
-        """Guarda histórico em ficheiro"""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        """Força a gravação imediata das escritas pendentes"""
+        self.storage.commit()
 
     def clear_history(self):
         """Limpa todo o histórico"""
-        self.history = []
-        self.save_history()
-
-    def get_recent(self, limit: int = 50) -> list:
-        """Retorna últimas entradas"""
-        return sorted(self.history, key=lambda x: x.get('timestamp', ''), reverse=True)[:limit]
+        with self.storage.transaction() as conn:
+            conn.execute('DELETE FROM visits')
+            conn.execute('DELETE FROM urls')
+        self.notify_changed()
+
+    def delete_range(self, start: float, end: float) -> int:
+        """Remove visitas com start <= epoch < end e atualiza os URLs afetados
+
+        Apaga em lotes de DELETE_BATCH visitas, cada um gravado numa transação
+        própria: entre lotes o lock fica livre e a GUI pode continuar a gravar.
+        """
+        removed = 0
+        urls = set()
+        while True:
+            with self.storage.lock:
+                with self.storage.transaction() as conn:
+                    batch = self._delete_batch(conn, int(start), int(end), urls)
+                self.storage.commit()
+            removed += batch
+            if batch < self.DELETE_BATCH:
+                break
+            # dar a vez a quem está à espera do lock
+            time.sleep(self.DELETE_PAUSE)
+        if removed:
+            self.notify_removed(start, end, urls)
+        return removed
+
+    def _delete_batch(self, conn, start: int, end: int, urls: set) -> int:
+        """Um lote de delete_range: retorna quantas visitas apagou
+
+        Junta a urls os URLs que perderam visitas neste lote.
+        """
+        conn.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS doomed_visits ('
+            '  visit_rowid INTEGER PRIMARY KEY, url_id INTEGER NOT NULL)')
+        conn.execute('DELETE FROM doomed_visits')
+        conn.execute(
+            'INSERT INTO doomed_visits SELECT rowid, url_id FROM visits '
+            'WHERE visited_at >= ? AND visited_at < ? LIMIT ?', (start, end, self.DELETE_BATCH))
+        removed = conn.execute(
+            'DELETE FROM visits WHERE rowid IN (SELECT visit_rowid FROM doomed_visits)').rowcount
+        if not removed:
+            return 0
+        conn.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS doomed_urls ('
+            '  id INTEGER PRIMARY KEY, removed INTEGER NOT NULL)')
+        conn.execute('DELETE FROM doomed_urls')
+        conn.execute('INSERT INTO doomed_urls SELECT url_id, COUNT(*) FROM doomed_visits GROUP BY url_id')
+        urls.update(row[0] for row in conn.execute(
+            'SELECT u.url FROM urls u JOIN doomed_urls d ON d.id = u.id'))
+        # contagem descontada pelas visitas do lote; primeira/última pelo índice (url_id, visited_at)
+        conn.execute(
+            'UPDATE urls SET '
+            '  visit_count = visit_count - (SELECT removed FROM doomed_urls d WHERE d.id = urls.id), '
+            '  first_visit = COALESCE((SELECT MIN(visited_at) FROM visits WHERE url_id = urls.id), 0), '
+            '  last_visit = COALESCE((SELECT MAX(visited_at) FROM visits WHERE url_id = urls.id), 0) '
+            'WHERE id IN (SELECT id FROM doomed_urls)')
+        conn.execute(
+            'DELETE FROM urls WHERE id IN (SELECT id FROM doomed_urls) '
+            '  AND NOT EXISTS (SELECT 1 FROM visits WHERE url_id = urls.id)')
+        conn.execute('DELETE FROM doomed_visits')
+        return removed
+
+    def delete_recent(self, seconds: float) -> int:
+        """Remove as visitas dos últimos `seconds` segundos"""
+        now = time.time()
+        return self.delete_range(now - seconds, now + 1)
+
+    def expire(self, retention_days: int) -> int:
+        """Remove visitas mais antigas que o período de retenção"""
+        if retention_days <= 0:
+            return 0
+        return self.delete_range(0, time.time() - retention_days * 86400)
+
+    def count(self) -> int:
+        """Número de URLs distintos no histórico"""
+        return self.storage.scalar('SELECT COUNT(*) FROM urls')
+
+    def visit_count(self) -> int:
+        """Número total de visitas registadas"""
+        return self.storage.scalar('SELECT COUNT(*) FROM visits')
+
+    def get_recent(self, limit: int = 50, after: HistoryEntry = None) -> list:
+        """Retorna URLs visitados mais recentemente, a seguir à entrada after
+
+        Pagina por (last_visit, id) no índice de last_visit, e não por OFFSET:
+        o custo não cresce com o scroll e remoções entretanto não fazem
+        saltar nem repetir entradas.
+        """
+        if after is None:
+            rows = self.storage.query(
+                'SELECT id, url, title, visit_count, last_visit FROM urls '
+                'ORDER BY last_visit DESC, id DESC LIMIT ?', (limit,))
+        else:
+            rows = self.storage.query(
+                'SELECT id, url, title, visit_count, last_visit FROM urls '
+                'WHERE (last_visit, id) < (?, ?) '
+                'ORDER BY last_visit DESC, id DESC LIMIT ?', (after.visited_at, after.url_id, limit))
+        return [self._row_to_entry(r) for r in rows]
+
+    def search(self, text: str, limit: int = 100, after: HistoryEntry = None) -> list:
+        """Pesquisa por substring no título/URL (URLs mais recentes primeiro)
+
+        Pagina pelo id do URL, a seguir à entrada after (como get_recent).
+        """
+        terms = text.split()
+        if not terms:
+            return self.get_recent(limit, after)
+        # sem after: acima de qualquer id (INTEGER do SQLite: 64 bits)
+        after_id = after.url_id if after is not None else (1 << 63) - 1
+        if self.has_fts and all(len(t) >= 3 for t in terms):
+            # trigram: cada termo entre aspas é uma pesquisa de substring
+            match = ' AND '.join('"' + t.replace('"', '""') + '"' for t in terms)
+            rows = self.storage.query(
+                'SELECT u.id, u.url, u.title, u.visit_count, u.last_visit FROM urls u JOIN ('
+                '  SELECT rowid FROM urls_fts WHERE urls_fts MATCH ? AND rowid < ?'
+                '  ORDER BY rowid DESC LIMIT ?'
+                ') f ON u.id = f.rowid ORDER BY u.id DESC',
+                (match, after_id, limit))
+        else:
+            where = ' AND '.join(['(url LIKE ? OR title LIKE ?)'] * len(terms))
+            params = []
+            for t in terms:
+                pattern = '%' + t + '%'
+                params += [pattern, pattern]
+            rows = self.storage.query(
+                f'SELECT id, url, title, visit_count, last_visit FROM urls WHERE id < ? AND {where} '
+                'ORDER BY id DESC LIMIT ?', (after_id, *params, limit))
+        return [self._row_to_entry(r) for r in rows]
+
+    def url_stats(self) -> tuple:
+        """Retorna ([(url, título, nº de visitas, última visita epoch)], last_rowid)
+
+        Lê por storage.reader(), sem o lock partilhado, num só snapshot;
+        last_rowid é a última visita desse snapshot (ver visits_after).
+        """
+        conn = self.storage.reader()
+        conn.row_factory = None
+        try:
+            conn.execute('BEGIN')
+            last_rowid = conn.execute('SELECT COALESCE(MAX(rowid), 0) FROM visits').fetchone()[0]
+            rows = conn.execute('SELECT url, title, visit_count, last_visit FROM urls').fetchall()
+        finally:
+            conn.close()
+        return rows, last_rowid
+
+    def url_stats_for(self, urls) -> list:
+        """(url, título, nº de visitas, última visita epoch) dos URLs dados que ainda existem"""
+        urls = list(urls)
+        rows = []
+        for i in range(0, len(urls), self.LOOKUP_CHUNK):
+            chunk = urls[i:i + self.LOOKUP_CHUNK]
+            marks = ','.join('?' * len(chunk))
+            rows += [tuple(r) for r in self.storage.query(
+                f'SELECT url, title, visit_count, last_visit FROM urls WHERE url IN ({marks})', chunk)]
+        return rows
+
+    def visits_after(self, rowid: int) -> list:
+        """(url, título, epoch) das visitas gravadas depois de rowid, por ordem"""
+        rows = self.storage.query(
+            'SELECT u.url, u.title, v.visited_at FROM visits v JOIN urls u ON u.id = v.url_id '
+            'WHERE v.rowid > ? ORDER BY v.rowid', (rowid,))
+        return [tuple(r) for r in rows]
+
+    def find_by_url(self, url: str) -> dict:
+        """Retorna o registo agregado de um URL (lookup indexado)"""
+        row = self.storage.query_one(
+            'SELECT id, url, title, visit_count, last_visit FROM urls WHERE url = ?',
+            (canonical_url(url),))
+        return self._row_to_entry(row) if row else None
 
 
 class BookmarksManager:
-    """Gerencia bookmarks/favoritos"""
-    def __init__(self, base_path: str):
+    """Gerencia bookmarks/favoritos (SQLite)
+
+    Os bookmarks formam uma árvore de pastas: cada nó (bookmark, pasta ou
+    separador) tem um id estável, o id do pai (None = raiz) e uma posição
+    fracionária dentro da pasta.
+    """
+    BOOKMARK = 'bookmark'
+    FOLDER = 'folder'
+    SEPARATOR = 'separator'
+    PATH_SEPARATOR = ' / '
+    # caminho de todas as pastas, ex.: 'Trabalho / Docs' (tabela tree(id, path)
+    # para o resto da query); o mesmo formato que _folder_path
+    FOLDER_PATHS = (
+        'WITH RECURSIVE tree(id, path) AS ('
+        "  SELECT id, title FROM bookmarks WHERE kind = 'folder' AND parent_id IS NULL "
+        '  UNION ALL '
+        f"  SELECT b.id, tree.path || '{PATH_SEPARATOR}' || b.title FROM bookmarks b "
+        "  JOIN tree ON b.parent_id = tree.id WHERE b.kind = 'folder') ")
+    # importações gravadas em transações de WRITE_BATCH bookmarks, com uma pausa entre elas
+    WRITE_BATCH = 2000
+    WRITE_PAUSE = 0.005
+
+    def __init__(self, base_path: str, storage: Storage = None):
+        self.storage = storage or Storage(base_path)
         self.bookmarks_file = os.path.join(base_path, 'bookmarks.json')
-        self.bookmarks = self.load_bookmarks()
-
-    def add_bookmark(self, url: str, title: str):
-        """Adiciona bookmark"""
-        bookmark = {
-            'url': url,
-            'title': title,
-            'added': datetime.datetime.now().isoformat()
-        }
-        self.bookmarks.append(bookmark)
-        self.save_bookmarks()
+        # chave canónica -> id do bookmark: "já está nos bookmarks?" sem ir à BD
+        self.index = {}
+        self._load_index()
+        # pesquisa por título/URL/pasta: construída na primeira pesquisa
+        self._search_index = None
+        migrate_json_file(self.bookmarks_file, _load_json_list, self.add_bookmarks)
+
+    def _load_index(self):
+        with self.storage.lock:
+            # por ordem decrescente: em duplicados antigos fica o mais antigo
+            self.index = {key: bookmark_id for bookmark_id, key in self.storage.conn.execute(
+                "SELECT id, url_key FROM bookmarks WHERE kind = 'bookmark' ORDER BY id DESC")}
+
+    @property
+    def search_index(self) -> BookmarkSearchIndex:
+        """Índice de tokens para a pesquisa (construído no primeiro uso)"""
+        with self.storage.lock:
+            if self._search_index is not None:
+                return self._search_index
+            index = BookmarkSearchIndex()
+            rows = self._search_rows()
+            # alterações a partir daqui esperam pelo lock do índice, mas a
+            # tokenização (a parte demorada) já não bloqueia a BD
+            index.lock.acquire()
+            self._search_index = index
+        try:
+            index.load(rows)
+        finally:
+            index.lock.release()
+        return index
+
+    def _search_rows(self, node_id: int = None) -> list:
+        """(id, url, título, pasta, id da pasta) dos bookmarks, ou só dos de um nó"""
+        subtree = ''
+        params = ()
+        if node_id is not None:
+            subtree = ('AND b.id IN (WITH RECURSIVE sub(id) AS ('
+                       '  SELECT ? UNION ALL SELECT c.id FROM bookmarks c JOIN sub ON c.parent_id = sub.id) '
+                       'SELECT id FROM sub)')
+            params = (node_id,)
+        rows = self.storage.query(
+            self.FOLDER_PATHS +
+            "SELECT b.id, b.url, b.title, COALESCE(tree.path, ''), b.parent_id FROM bookmarks b "
+            f"LEFT JOIN tree ON tree.id = b.parent_id WHERE b.kind = 'bookmark' {subtree}", params)
+        return [tuple(r) for r in rows]
+
+    def _reindex(self, node_id: int):
+        """Atualiza na pesquisa os bookmarks de um nó renomeado ou movido"""
+        if self._search_index is not None:
+            for row in self._search_rows(node_id):
+                self._search_index.add(*row)
+
+    @staticmethod
+    def _end_position(conn, parent_id) -> float:
+        """Posição a seguir ao último nó de uma pasta"""
+        last = conn.execute(
+            'SELECT MAX(position) FROM bookmarks WHERE parent_id IS ?', (parent_id,)).fetchone()[0]
+        return (last or 0) + 1
+
+    def _position_before(self, conn, parent_id, before_id, node_id=None) -> float:
+        """Posição para um nó antes de before_id (None = no fim da pasta)"""
+        if before_id is None:
+            return self._end_position(conn, parent_id)
+        row = conn.execute('SELECT position FROM bookmarks WHERE id = ?', (before_id,)).fetchone()
+        if row is None:
+            return self._end_position(conn, parent_id)
+        after = row[0]
+        before = conn.execute(
+            'SELECT MAX(position) FROM bookmarks WHERE parent_id IS ? AND position < ? AND id != ?',
+            (parent_id, after, node_id or 0)).fetchone()[0]
+        if before is None:
+            return after - 1
+        position = (before + after) / 2
+        if before < position < after:
+            return position
+        # sem espaço entre as duas posições (só após muitas inserções no mesmo sítio)
+        self._renumber(conn, parent_id)
+        return self._position_before(conn, parent_id, before_id, node_id)
+
+    @staticmethod
+    def _renumber(conn, parent_id):
+        ids = [row[0] for row in conn.execute(
+            'SELECT id FROM bookmarks WHERE parent_id IS ? ORDER BY position, id', (parent_id,))]
+        conn.executemany('UPDATE bookmarks SET position = ? WHERE id = ?',
+                         [(i + 1, node_id) for i, node_id in enumerate(ids)])
+
+    def add_bookmarks(self, bookmarks: list, parent_id: int = None) -> int:
+        """Adiciona bookmarks em lote (dicionários com url, title e added)
+
+        URLs já guardados (ou repetidos no lote) são ignorados.
+        Retorna quantos foram adicionados.
+
+        Grava em transações de WRITE_BATCH bookmarks: entre elas o lock
+        fica livre e a GUI pode continuar a gravar e a consultar.
+        """
+        bookmarks = list(bookmarks)
+        now = datetime.datetime.now().isoformat()
+        count = 0
+        folder = None
+        for i in range(0, len(bookmarks), self.WRITE_BATCH):
+            if i:
+                # dar a vez a quem está à espera do lock
+                time.sleep(self.WRITE_PAUSE)
+            with self.storage.lock:
+                with self.storage.transaction() as conn:
+                    position = self._end_position(conn, parent_id)
+                    added = 0
+                    for b in bookmarks[i:i + self.WRITE_BATCH]:
+                        if not (isinstance(b, dict) and b.get('url')):
+                            continue
+                        key = canonical_url(b['url'])
+                        if key in self.index:
+                            continue
+                        title = b.get('title', '') or ''
+                        bookmark_id = self.index[key] = conn.execute(
+                            'INSERT INTO bookmarks (url, url_key, title, added, kind, parent_id, position) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (b['url'], key, title, b.get('added') or now,
+                             self.BOOKMARK, parent_id, position + added)).lastrowid
+                        if self._search_index is not None:
+                            if folder is None:
+                                folder = self._folder_path(conn, parent_id)
+                            self._search_index.add(bookmark_id, b['url'], title, folder, parent_id)
+                        added += 1
+                count += added
+                self.storage.commit()
+        return count
+
+    @staticmethod
+    def _folder_path(conn, parent_id) -> str:
+        """Caminho de uma pasta, ex.: 'Trabalho / Docs' ('' na raiz)"""
+        titles = [row[0] for row in conn.execute(
+            'WITH RECURSIVE up(parent_id, title, depth) AS ('
+            '  SELECT parent_id, title, 0 FROM bookmarks WHERE id = ? '
+            '  UNION ALL SELECT b.parent_id, b.title, up.depth + 1 FROM bookmarks b '
+            '  JOIN up ON b.id = up.parent_id) '
+            'SELECT title FROM up ORDER BY depth DESC', (parent_id,))]
+        return BookmarksManager.PATH_SEPARATOR.join(titles)
+
+    @property
+    def bookmarks(self) -> list:
+        return self.load_bookmarks()
+
+    def is_bookmarked(self, url: str) -> bool:
+        """O URL (ou uma variante do mesmo URL canónico) está nos bookmarks?"""
+        return canonical_url(url) in self.index
+
+    def add_bookmark(self, url: str, title: str, parent_id: int = None) -> bool:
+        """Adiciona bookmark; retorna False se o URL já estiver guardado"""
+        return self.add_bookmarks([{'url': url, 'title': title}], parent_id) == 1
+
+    def add_folder(self, title: str, parent_id: int = None) -> int:
+        """Cria uma pasta no fim de parent_id; retorna o id"""
+        return self._add_node(self.FOLDER, title, parent_id)
+
+    def add_separator(self, parent_id: int = None) -> int:
+        """Cria um separador no fim de parent_id; retorna o id"""
+        return self._add_node(self.SEPARATOR, '', parent_id)
+
+    def _add_node(self, kind: str, title: str, parent_id: int = None) -> int:
+        with self.storage.transaction() as conn:
+            return conn.execute(
+                "INSERT INTO bookmarks (url, url_key, title, added, kind, parent_id, position) "
+                "VALUES ('', '', ?, ?, ?, ?, ?)",
+                (title or '', datetime.datetime.now().isoformat(), kind, parent_id,
+                 self._end_position(conn, parent_id))).lastrowid
+
+    def remove_bookmark(self, url: str) -> bool:
+        """Remove bookmark por URL (qualquer variante do mesmo URL canónico)"""
+        key = canonical_url(url)
+        with self.storage.transaction() as conn:
+            if self.index.pop(key, None) is None:
+                return False
+            if self._search_index is not None:
+                for row in conn.execute(
+                        "SELECT id FROM bookmarks WHERE url_key = ? AND kind = 'bookmark'", (key,)):
+                    self._search_index.remove(row[0])
+            conn.execute("DELETE FROM bookmarks WHERE url_key = ? AND kind = 'bookmark'", (key,))
+        return True
+
+    def remove_node(self, node_id: int):
+        """Remove um nó e, se for pasta, tudo o que está dentro dela"""
+        with self.storage.transaction() as conn:
+            rows = conn.execute(
+                'WITH RECURSIVE sub(id) AS ('
+                '  SELECT ? UNION ALL SELECT b.id FROM bookmarks b JOIN sub ON b.parent_id = sub.id) '
+                'SELECT id, kind, url_key FROM bookmarks WHERE id IN sub', (node_id,)).fetchall()
+            ids = [row[0] for row in rows]
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                conn.execute(f'DELETE FROM bookmarks WHERE id IN ({",".join("?" * len(chunk))})', chunk)
+            for bookmark_id, kind, key in rows:
+                if kind != self.BOOKMARK:
+                    continue
+                if self.index.get(key) == bookmark_id:
+                    del self.index[key]
+                if self._search_index is not None:
+                    self._search_index.remove(bookmark_id)
+
+    def rename_node(self, node_id: int, title: str):
+        with self.storage.lock:
+            self.storage.execute('UPDATE bookmarks SET title = ? WHERE id = ?', (title or '', node_id))
+            self._reindex(node_id)
+
+    def move_node(self, node_id: int, parent_id: int = None, before_id: int = None) -> bool:
+        """Move um nó para parent_id, antes de before_id (None = no fim)
+
+        Só o registo do nó é reescrito. Retorna False se o destino estiver
+        dentro do próprio nó.
+        """
+        with self.storage.transaction() as conn:
+            if parent_id is not None:
+                ancestors = {row[0] for row in conn.execute(
+                    'WITH RECURSIVE up(id) AS ('
+                    '  SELECT ? UNION ALL SELECT b.parent_id FROM bookmarks b JOIN up ON b.id = up.id'
+                    '  WHERE b.parent_id IS NOT NULL) '
+                    'SELECT id FROM up', (parent_id,))}
+                if node_id in ancestors:
+                    return False
+            position = self._position_before(conn, parent_id, before_id, node_id)
+            old_parent = conn.execute('SELECT parent_id FROM bookmarks WHERE id = ?', (node_id,)).fetchone()
+            conn.execute('UPDATE bookmarks SET parent_id = ?, position = ? WHERE id = ?',
+                         (parent_id, position, node_id))
+            if old_parent is not None and old_parent[0] != parent_id:
+                # o caminho da pasta faz parte da pesquisa
+                self._reindex(node_id)
+        return True
+
+    def children(self, parent_id: int = None, limit: int = -1, after_id: int = None) -> list:
+        """Nós de uma pasta, por ordem (opcionalmente só uma página)
+
+        Com after_id, só os nós a seguir a esse: pagina por (position, id) no
+        índice da pasta, e não por OFFSET, como PasswordManager.entries.
+        """
+        if after_id is None:
+            rows = self.storage.query(
+                'SELECT id, kind, url, title, added FROM bookmarks WHERE parent_id IS ? '
+                'ORDER BY position, id LIMIT ?', (parent_id, limit))
+        else:
+            rows = self.storage.query(
+                'SELECT id, kind, url, title, added FROM bookmarks WHERE parent_id IS ? '
+                '  AND (position, id) > (SELECT position, id FROM bookmarks WHERE id = ?) '
+                'ORDER BY position, id LIMIT ?', (parent_id, after_id, limit))
+        return [dict(r) for r in rows]
+
+    def find_folder(self, title: str, parent_id: int = None) -> int:
+        """Id da primeira pasta com este nome dentro de parent_id (ou None)"""
+        row = self.storage.query_one(
+            "SELECT id FROM bookmarks WHERE parent_id IS ? AND kind = 'folder' AND title = ? "
+            'ORDER BY position, id LIMIT 1', (parent_id, title))
+        return row['id'] if row else None
+
+    def folders(self) -> list:
+        """Todas as pastas como [(id, caminho)], ex.: (3, 'Trabalho / Docs')"""
+        rows = self.storage.query(
+            self.FOLDER_PATHS + 'SELECT id, path FROM tree ORDER BY path')
+        return [(r['id'], r['path']) for r in rows]
+
+    def find_by_url(self, url: str) -> dict:
+        """Retorna o bookmark de um URL (lookup pelo índice)"""
+        bookmark_id = self.index.get(canonical_url(url))
+        if bookmark_id is None:
+            return None
+        row = self.storage.query_one(
+            'SELECT url, title, added FROM bookmarks WHERE id = ?', (bookmark_id,))
+        return dict(row) if row else None
 
-    def remove_bookmark(self, url: str):
-        """Remove bookmark por URL"""
-        self.bookmarks = [b for b in self.bookmarks if b['url'] != url]
-        self.save_bookmarks()
+    def count(self) -> int:
+        return self.storage.scalar("SELECT COUNT(*) FROM bookmarks WHERE kind = 'bookmark'")
 
     def load_bookmarks(self) -> list:
-        """Carrega bookmarks"""
-        if os.path.exists(self.bookmarks_file):
-            try:
-                with open(self.bookmarks_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return []
-        return []
+        """Carrega bookmarks (lista plana, sem pastas)"""
+        rows = self.storage.query(
+            "SELECT url, title, added FROM bookmarks WHERE kind = 'bookmark' ORDER BY id")
+        return [dict(r) for r in rows]
 
     def save_bookmarks(self):
-        """Guarda bookmarks"""
-        try:
-            with open(self.bookmarks_file, 'w', encoding='utf-8') as f:
-                json.dump(self.bookmarks, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        """Força a gravação imediata das escritas pendentes"""
+        self.storage.commit()
+
+
+def _write_key(path: str, key: bytes):
+    """Grava um ficheiro de chave de forma atómica (tmp + fsync + rename)"""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(key)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 
 class PasswordManager:
-    """Gerencia senhas encriptadas"""
-    def __init__(self, base_path: str):
+    """Gerencia senhas encriptadas (SQLite)
+
+    As senhas encriptadas ficam também num índice em memória por (chave do
+    serviço, utilizador), e as desencriptadas numa SecretCache de curta
+    duração: pedidos repetidos (autofill) não vão à BD nem desencriptam.
+    """
+    def __init__(self, base_path: str, storage: Storage = None):
+        self.storage = storage or Storage(base_path)
         self.passwords_file = os.path.join(base_path, 'passwords.json')
         self.key_file = os.path.join(base_path, '.key')
+        self.key = None
         self.cipher = self._init_cipher()
-        self.passwords = self.load_passwords()
+        # (chave do serviço, utilizador) -> (id, senha encriptada)
+        self.index = {}
+        # origem (https://host[:porta]) -> {(chave do serviço, utilizador)}, para o autofill
+        self.origins = {}
+        self.secrets = SecretCache()
+        self._load_index()
+        migrate_json_file(self.passwords_file, _load_json_list, self._insert_rows)
+
+    def _load_index(self):
+        with self.storage.lock:
+            # por ordem decrescente: em duplicados antigos fica o mais antigo
+            self.index = {(key, username): (password_id, token)
+                          for password_id, key, username, token in self.storage.conn.execute(
+                              'SELECT id, service_key, username, password FROM passwords ORDER BY id DESC')}
+            self.origins = {}
+            for entry_key in self.index:
+                self._add_origin(entry_key)
+
+    def _add_origin(self, entry_key: tuple):
+        origin = canonical_origin(entry_key[0])
+        if origin:
+            self.origins.setdefault(origin, set()).add(entry_key)
+
+    def _remove_origin(self, entry_key: tuple):
+        logins = self.origins.get(canonical_origin(entry_key[0]))
+        if logins is not None:
+            logins.discard(entry_key)
+            if not logins:
+                del self.origins[canonical_origin(entry_key[0])]
+
+    def logins_for(self, url: str) -> list:
+        """Logins guardados para a origem de um URL: [(serviço, utilizador)]"""
+        return sorted(self.origins.get(canonical_origin(url), ()))
+
+    def _insert_rows(self, passwords: list):
+        rows = [(p.get('service', ''), service_key(p.get('service', '')), p.get('username', ''),
+                 p.get('password', ''), p.get('added', ''))
+                for p in passwords if isinstance(p, dict)]
+        with self.storage.lock:
+            self.storage.executemany(
+                'INSERT INTO passwords (service, service_key, username, password, added) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+            self._load_index()
+        return len(rows)
+
+    @property
+    def passwords(self) -> list:
+        return self.load_passwords()
 
     def _init_cipher(self):
         """Inicializa encriptação Fernet"""
         if not Fernet:
             return None
+        self._finish_key_rotation()
         if os.path.exists(self.key_file):
             try:
                 with open(self.key_file, 'rb') as f:
                     key = f.read()
-                return Fernet(key)
+                cipher = Fernet(key)
+                self.key = key
+                return cipher
             except Exception:
                 return None
         else:
             try:
                 key = Fernet.generate_key()
-                with open(self.key_file, 'wb') as f:
-                    f.write(key)
+                _write_key(self.key_file, key)
+                self.key = key
                 return Fernet(key)
             except Exception:
                 return None
 
+    def _finish_key_rotation(self):
+        """Conclui (ou desfaz) uma troca de chave interrompida a meio
+
+        A chave nova fica em .key.new até a BD reencriptada estar gravada:
+        se houver senhas que só ela desencripta, a troca chegou à BD.
+        """
+        pending = self.key_file + '.new'
+        if not os.path.exists(pending):
+            return
+        try:
+            with open(pending, 'rb') as f:
+                cipher = Fernet(f.read())
+            for row in self.storage.query('SELECT password FROM passwords ORDER BY id LIMIT 20'):
+                try:
+                    cipher.decrypt(row['password'].encode())
+                except Exception:
+                    continue
+                os.replace(pending, self.key_file)
+                return
+        except Exception:
+            pass
+        os.remove(pending)
+
     def add_password(self, service: str, username: str, password: str):
-        """Adiciona senha encriptada"""
+        """Adiciona senha encriptada (substitui a existente para o mesmo serviço/utilizador)"""
         if not self.cipher:
             raise Exception('Encriptação não disponível. Instale: pip install cryptography')
-        
-        encrypted = self.cipher.encrypt(password.encode()).decode()
-        entry = {
-            'service': service,
-            'username': username,
-            'password': encrypted,
-            'added': datetime.datetime.now().isoformat()
-        }
-        self.passwords.append(entry)
-        self.save_passwords()
+
+        with self.storage.lock:
+            # encriptada com o lock: uma troca de chave não a apanha a meio
+            encrypted = self.cipher.encrypt(password.encode()).decode()
+            self.add_encrypted([(service, username, encrypted)])
+        self.secrets.put((service_key(service), username), password)
+
+    def add_encrypted(self, rows: list) -> tuple:
+        """Grava (serviço, utilizador, senha encriptada) numa só transação
+
+        Logins que já existem ficam com a senha nova. Retorna (novos, atualizados).
+        """
+        now = datetime.datetime.now().isoformat()
+        added = updated = 0
+        with self.storage.transaction() as conn:
+            for service, username, encrypted in rows:
+                key = service_key(service)
+                existing = self.index.get((key, username))
+                if existing is not None:
+                    # senha nova: a verificação de senhas comprometidas tem de ser repetida
+                    conn.execute(
+                        'UPDATE passwords SET password = ?, added = ?, breach_count = NULL '
+                        'WHERE service_key = ? AND username = ?',
+                        (encrypted, now, key, username))
+                    password_id = existing[0]
+                    updated += 1
+                else:
+                    password_id = conn.execute(
+                        'INSERT INTO passwords (service, service_key, username, password, added) '
+                        'VALUES (?, ?, ?, ?, ?)', (service, key, username, encrypted, now)).lastrowid
+                    added += 1
+                self.index[(key, username)] = (password_id, encrypted)
+                self._add_origin((key, username))
+                self.secrets.discard((key, username))
+        return added, updated
+
+    def replace_key(self, new_key: bytes, reencrypted: dict) -> int:
+        """Passa a usar new_key, com as senhas já reencriptadas (id -> (antiga, nova))
+
+        Senhas alteradas entretanto são reencriptadas aqui. A reencriptação
+        é gravada numa transação só dela, e a chave nova só substitui a
+        antiga depois de o COMMIT dessa transação ter sucesso. Se falhar, a
+        transação é desfeita, .key.new é apagado e fica a chave antiga.
+        Retorna quantas senhas foram reencriptadas.
+        """
+        pending = self.key_file + '.new'
+        _write_key(pending, new_key)
+        new_cipher = Fernet(new_key)
+        with self.storage.lock:
+            try:
+                # gravar antes as escritas pendentes: a transação fica só com a reencriptação
+                if not self.storage.commit():
+                    raise RuntimeError(f'Falha ao gravar a base de dados: {self.storage.commit_error}')
+                with self.storage.transaction() as conn:
+                    updates = []
+                    for password_id, token in conn.execute('SELECT id, password FROM passwords').fetchall():
+                        tokens = reencrypted.get(password_id)
+                        if tokens is not None and tokens[0] == token:
+                            updates.append((tokens[1], password_id))
+                            continue
+                        try:
+                            plain = self.cipher.decrypt(token.encode())
+                        except Exception:
+                            continue
+                        updates.append((new_cipher.encrypt(plain).decode(), password_id))
+                    conn.executemany('UPDATE passwords SET password = ? WHERE id = ?', updates)
+                if not self.storage.commit():
+                    # senhas encriptadas com a chave nova não podem ficar à espera de outro flush
+                    self.storage.rollback()
+                    raise RuntimeError(f'Falha ao gravar as senhas reencriptadas: {self.storage.commit_error}')
+            except BaseException:
+                os.remove(pending)
+                raise
+            # gravada: a partir daqui só a chave nova desencripta as senhas
+            os.replace(pending, self.key_file)
+            self.key = new_key
+            self.cipher = new_cipher
+            self._load_index()
+        return len(updates)
 
     def get_password(self, service: str, username: str) -> str:
-        """Recupera senha desencriptada"""
+        """Recupera senha desencriptada (da cache, ou desencripta e guarda na cache)"""
         if not self.cipher:
             return None
-        for entry in self.passwords:
-            if entry['service'] == service and entry['username'] == username:
-                try:
-                    decrypted = self.cipher.decrypt(entry['password'].encode()).decode()
-                    return decrypted
-                except Exception:
-                    return None
-        return None
+        entry_key = (service_key(service), username)
+        password = self.secrets.get(entry_key)
+        if password is not None:
+            return password
+        entry = self.index.get(entry_key)
+        if entry is None:
+            return None
+        try:
+            password = self.cipher.decrypt(entry[1].encode()).decode()
+        except Exception:
+            return None
+        self.secrets.put(entry_key, password)
+        return password
 
     def remove_password(self, service: str, username: str):
         """Remove entrada de senha"""
-        self.passwords = [p for p in self.passwords if not (p['service'] == service and p['username'] == username)]
-        self.save_passwords()
-
-    def load_passwords(self) -> list:
-        """Carrega senhas"""
-        if os.path.exists(self.passwords_file):
+        entry_key = (service_key(service), username)
+        with self.storage.transaction() as conn:
+            conn.execute('DELETE FROM passwords WHERE service_key = ? AND username = ?', entry_key)
+            if self.index.pop(entry_key, None) is not None:
+                self._remove_origin(entry_key)
+        self.secrets.discard(entry_key)
+
+    def check_breaches(self, breach_list, progress=None) -> list:
+        """Procura as senhas numa BreachList; retorna as comprometidas
+
+        O resultado fica guardado em cada entrada: só são verificadas as
+        senhas alteradas desde a última verificação ou verificadas com
+        outra lista. Retorna [{'service', 'username', 'breach_count'}].
+        """
+        rows = self.storage.query(
+            'SELECT id, password FROM passwords '
+            'WHERE breach_count IS NULL OR breach_source IS NOT ?', (breach_list.signature,))
+        updates = []
+        for row in rows:
             try:
-                with open(self.passwords_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                password = self.cipher.decrypt(row['password'].encode()).decode()
             except Exception:
-                return []
-        return []
+                continue
+            updates.append((breach_list.count(password), breach_list.signature, row['id'], row['password']))
+            if progress and len(updates) % 1000 == 0:
+                progress(len(updates))
+        # só se a senha não mudou entretanto
+        self.storage.executemany(
+            'UPDATE passwords SET breach_count = ?, breach_source = ? WHERE id = ? AND password = ?',
+            updates)
+        rows = self.storage.query(
+            'SELECT service, username, breach_count FROM passwords '
+            'WHERE breach_count > 0 AND breach_source = ? ORDER BY breach_count DESC',
+            (breach_list.signature,))
+        return [dict(r) for r in rows]
+
+    ENTRY_COLUMNS = 'id, service, service_key, username, added, breach_count'
+
+    def entries(self, text: str = '', after_id: int = 0, limit: int = -1) -> list:
+        """Entradas para mostrar (sem as senhas), por id, a seguir a after_id
+
+        text filtra por serviço/utilizador (todos os termos). Paginar pelo id
+        (e não por OFFSET) mantém as páginas certas quando há remoções.
+        """
+        where, params = 'id > ?', [after_id]
+        for t in text.split():
+            pattern = '%' + t + '%'
+            where += ' AND (service LIKE ? OR username LIKE ?)'
+            params += [pattern, pattern]
+        rows = self.storage.query(
+            f'SELECT {self.ENTRY_COLUMNS} FROM passwords WHERE {where} ORDER BY id LIMIT ?',
+            (*params, limit))
+        return [dict(r) for r in rows]
+
+    def entry_id(self, service: str, username: str) -> int:
+        entry = self.index.get((service_key(service), username))
+        return entry[0] if entry is not None else None
+
+    def load_passwords(self) -> list:
+        """Carrega senhas (encriptadas)"""
+        rows = self.storage.query(
+            'SELECT service, username, password, added FROM passwords ORDER BY id')
+        return [dict(r) for r in rows]
 
     def save_passwords(self):
-        """Guarda senhas"""
-        try:
-            with open(self.passwords_file, 'w', encoding='utf-8') as f:
-                json.dump(self.passwords, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        """Força a gravação imediata das escritas pendentes"""
+        self.storage.commit()
 
 
 class MainWindow(QMainWindow):
+    # emitido (na thread da GUI) quando o histórico termina de carregar
+    history_ready = Signal()
+    history_changed = Signal(object)
+    analytics_ready = Signal(object)
+    # índice de autocompletar: pedido de reconstrução (de qualquer thread),
+    # índice construído e URLs que perderam visitas
+    url_index_stale = Signal()
+    url_index_ready = Signal(object)
+    history_urls_removed = Signal(object)
+    # progresso/fim de tarefas em background (importação, exportação)
+    task_progress = Signal(str)
+    task_finished = Signal(str, str)
+    # acima disto uma remoção reconstrói o índice em vez de atualizar URL a URL
+    URL_INDEX_REFRESH_LIMIT = 2000
+    # links problemáticos listados no fim da verificação (por tipo)
+    LINK_REPORT_LIMIT = 10
+    # senhas comprometidas listadas no fim da verificação de fugas
+    BREACH_REPORT_LIMIT = 10
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle('Pixlet - Qt Browser')
@@ -228,14 +1192,55 @@ class MainWindow(QMainWindow):
         # Simple settings (in-memory for now)
         self.settings = {
             'homepage': 'https://www.google.com',
-            'default_new_tab': 'about:blank'
+            'default_new_tab': 'about:blank',
+            'history_retention_days': 0,
+            'breach_file': ''
         }
 
         # Inicializar managers
         base_path = self.storage_base()
-        self.history_manager = HistoryManager(base_path)
-        self.bookmarks_manager = BookmarksManager(base_path)
-        self.password_manager = PasswordManager(base_path)
+        self.storage = Storage(base_path)
+        self.history_manager = HistoryManager(base_path, self.storage, load_async=True)
+        self.bookmarks_manager = BookmarksManager(base_path, self.storage)
+        self.password_manager = PasswordManager(base_path, self.storage)
+        # guarda a cache de resultados entre verificações
+        self.link_checker = LinkChecker()
+
+        # Índice de autocompletar da barra de endereço (construído em background
+        # e depois atualizado visita a visita)
+        self.url_index = FrecencyIndex()
+        # muda a cada pedido de reconstrução: uma construção em curso fica desatualizada
+        self.url_index_generation = 0
+        self.url_index_building = False
+        # bookmarks guardados durante uma construção (repostos no índice novo)
+        self.url_index_bookmarks = []
+        self.url_index_stale.connect(self.start_url_index_build)
+        self.url_index_ready.connect(self.on_url_index_ready)
+        self.history_urls_removed.connect(self.on_history_urls_removed)
+        self.history_manager.visit_listeners.append(
+            lambda url, title, ts: self.url_index.add_visit(url, title, ts))
+        self.history_manager.change_listeners.append(self.rebuild_url_index)
+        self.history_manager.removal_listeners.append(
+            lambda start, end, urls: self.history_urls_removed.emit(urls))
+        self.rebuild_url_index()
+        self.history_ready.connect(self.on_history_ready)
+        self.task_progress.connect(self.append_status)
+        self.task_finished.connect(self.on_task_finished)
+
+        # Analytics em colunas (top sites), construídas numa thread quando pedidas
+        self.history_columns = None
+        # muda a cada alteração do histórico: uma construção em curso fica desatualizada
+        self.analytics_generation = 0
+        self.analytics_building = False
+        self.analytics_ready.connect(self.on_analytics_ready)
+        self.history_manager.visit_listeners.append(
+            lambda url, title, ts: self.history_columns.append(url, ts) if self.history_columns else None)
+        # as alterações podem vir de threads de importação/expiração
+        self.history_changed.connect(self.on_history_changed)
+        self.history_manager.change_listeners.append(lambda: self.history_changed.emit(None))
+        self.history_manager.removal_listeners.append(
+            lambda start, end, urls: self.history_changed.emit((start, end)))
+        self.history_manager.when_ready(self.history_ready.emit)
 
         # Inicializar Firebase Sync (opcional)
         self.firebase_sync = None
@@ -252,6 +1257,19 @@ class MainWindow(QMainWindow):
         new_tab_action = file_menu.addAction('New Tab')
         new_tab_action.triggered.connect(lambda: self.add_tab(self.settings.get('default_new_tab', 'about:blank')))
         file_menu.addSeparator()
+        import_history_action = file_menu.addAction('Importar Histórico...')
+        import_history_action.triggered.connect(self.import_history_file)
+        export_history_action = file_menu.addAction('Exportar Histórico...')
+        export_history_action.triggered.connect(self.export_history_file)
+        import_bookmarks_action = file_menu.addAction('Importar Bookmarks...')
+        import_bookmarks_action.triggered.connect(self.import_bookmarks_file)
+        export_bookmarks_action = file_menu.addAction('Exportar Bookmarks...')
+        export_bookmarks_action.triggered.connect(self.export_bookmarks_file)
+        import_profile_action = file_menu.addAction('Importar de Chrome/Firefox...')
+        import_profile_action.triggered.connect(self.import_browser_profile)
+        import_passwords_action = file_menu.addAction('Importar Senhas (CSV)...')
+        import_passwords_action.triggered.connect(self.import_passwords_file)
+        file_menu.addSeparator()
         exit_action = file_menu.addAction('Exit')
         exit_action.triggered.connect(self.close)
 
@@ -267,15 +1285,24 @@ class MainWindow(QMainWindow):
         tools_menu.addSeparator()
         history_action = tools_menu.addAction('View History')
         history_action.triggered.connect(self.open_history_dialog)
+        top_sites_action = tools_menu.addAction('Top Sites')
+        top_sites_action.triggered.connect(self.open_top_sites_dialog)
         bookmarks_action = tools_menu.addAction('Manage Bookmarks')
         bookmarks_action.triggered.connect(self.open_bookmarks_dialog)
+        check_links_action = tools_menu.addAction('Verificar Links dos Bookmarks')
+        check_links_action.triggered.connect(self.check_bookmark_links)
         passwords_action = tools_menu.addAction('Manage Passwords')
         passwords_action.triggered.connect(self.open_passwords_dialog)
+        rotate_key_action = tools_menu.addAction('Trocar Chave das Senhas')
+        rotate_key_action.triggered.connect(self.rotate_password_key)
+        breach_action = tools_menu.addAction('Verificar Senhas Comprometidas...')
+        breach_action.triggered.connect(self.check_password_breaches)
         # Disable passwords action if encryption is not available
         try:
-            passwords_action.setEnabled(bool(self.password_manager.cipher))
-            if not self.password_manager.cipher:
-                passwords_action.setToolTip('cryptography not installed; pip install cryptography')
+            for action in (passwords_action, rotate_key_action, import_passwords_action, breach_action):
+                action.setEnabled(bool(self.password_manager.cipher))
+                if not self.password_manager.cipher:
+                    action.setToolTip('cryptography not installed; pip install cryptography')
         except Exception:
             pass
         tools_menu.addSeparator()
@@ -306,6 +1333,10 @@ class MainWindow(QMainWindow):
         self.tabs.tabCloseRequested.connect(self.close_tab)
         self.tabs.currentChanged.connect(self.on_tab_changed)
         self.setCentralWidget(self.tabs)
+        # congela/descarta abas em segundo plano; repõe-nas ao selecionar
+        self.tab_lifecycle = TabLifecycleManager(self.tabs, parent=self)
+        self.tabs.tabBar().setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tabs.tabBar().customContextMenuRequested.connect(self.show_tab_menu)
 
         # Toolbar
         navtb = QToolBar('Navigation')
@@ -329,9 +1360,20 @@ class MainWindow(QMainWindow):
 
         navtb.addSeparator()
 
-        bookmark_btn = QAction('⭐', self)
-        bookmark_btn.triggered.connect(self.add_current_to_bookmarks)
-        navtb.addAction(bookmark_btn)
+        # ★ quando a página atual já está nos bookmarks; clicar alterna
+        self.bookmark_btn = QAction('☆', self)
+        self.bookmark_btn.setCheckable(True)
+        self.bookmark_btn.setToolTip('Adicionar aos bookmarks')
+        self.bookmark_btn.triggered.connect(self.toggle_current_bookmark)
+        navtb.addAction(self.bookmark_btn)
+
+        # 🔑 ativo quando a página tem um login com senha guardada
+        self.autofill_btn = QAction('🔑', self)
+        self.autofill_btn.setShortcut('Ctrl+Shift+L')
+        self.autofill_btn.setToolTip('Preencher login guardado (Ctrl+Shift+L)')
+        self.autofill_btn.setEnabled(False)
+        self.autofill_btn.triggered.connect(self.autofill_current)
+        navtb.addAction(self.autofill_btn)
 
         navtb.addSeparator()
 
@@ -339,6 +1381,14 @@ class MainWindow(QMainWindow):
         self.urlbar.returnPressed.connect(self.navigate_to_url)
         navtb.addWidget(self.urlbar)
 
+        # Sugestões ordenadas pelo FrecencyIndex (sem filtragem do QCompleter)
+        self.url_suggestions = QStringListModel(self)
+        self.url_completer = QCompleter(self.url_suggestions, self)
+        self.url_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.url_completer.activated.connect(lambda _: self.navigate_to_url())
+        self.urlbar.setCompleter(self.url_completer)
+        self.urlbar.textEdited.connect(self.update_url_suggestions)
+
         go_btn = QAction('Ir', self)
         go_btn.triggered.connect(self.navigate_to_url)
         navtb.addAction(go_btn)
@@ -352,6 +1402,7 @@ class MainWindow(QMainWindow):
         except Exception:
             # ignore load errors
             pass
+        self.apply_history_retention()
 
     def add_tab(self, url: str = 'about:blank'):
         tab = BrowserTab(url)
@@ -364,12 +1415,38 @@ class MainWindow(QMainWindow):
         tab.view.loadFinished.connect(lambda ok, i=index: self.statusBar().showMessage(f'Carregada: {tab.view.url().toString()}' if ok else 'Erro ao carregar'))
         # Adicionar ao histórico quando a página carrega
         tab.view.loadFinished.connect(lambda ok, i=index: self._record_history(i) if ok else None)
+        if self.password_manager.cipher:
+            tab.autofill = install_autofill(tab.view.page())
+            tab.autofill.set_url(url, self.password_manager.logins_for(url))
+            tab.view.urlChanged.connect(lambda q, t=tab: self.on_autofill_url(t, q))
+            tab.autofill.form_detected.connect(
+                lambda t=tab: self.update_autofill_button() if self.tabs.currentWidget() is t else None)
 
     def close_tab(self, i):
         if self.tabs.count() < 2:
             # não fechar a última aba
             return
+        tab = self.tabs.widget(i)
         self.tabs.removeTab(i)
+        # removeTab não apaga a aba: sem isto o renderer ficava vivo
+        tab.deleteLater()
+
+    def show_tab_menu(self, pos):
+        index = self.tabs.tabBar().tabAt(pos)
+        if index < 0:
+            return
+        tab = self.tabs.widget(index)
+        menu = QMenu(self)
+        pin_action = menu.addAction('Desafixar Aba' if tab.pinned else 'Fixar Aba')
+        if menu.exec(self.tabs.tabBar().mapToGlobal(pos)) is pin_action:
+            self.set_tab_pinned(tab, not tab.pinned)
+
+    def set_tab_pinned(self, tab, pinned: bool):
+        """Aba fixa: nunca é congelada nem descartada"""
+        tab.pinned = pinned
+        self.tabs.setTabToolTip(self.tabs.indexOf(tab), '📌 Aba fixa' if pinned else '')
+        if pinned:
+            self.tab_lifecycle.wake(tab)
 
     def current_browser(self) -> QWebEngineView:
         widget = self.tabs.currentWidget()
@@ -387,6 +1464,107 @@ class MainWindow(QMainWindow):
         if view:
             view.setUrl(QUrl(url_text))
 
+    def update_url_suggestions(self, text: str):
+        """Atualiza sugestões do autocompletar enquanto se escreve"""
+        suggestions = [url for url, _ in self.url_index.suggest(text, 8)]
+        self.url_suggestions.setStringList(suggestions)
+        if suggestions:
+            self.url_completer.complete()
+
+    def on_history_ready(self):
+        """Histórico antigo importado: atualizar consumidores"""
+        if self.history_manager.count():
+            self.rebuild_url_index()
+            self.reset_history_analytics()
+
+    def reset_history_analytics(self):
+        """Descarta as colunas de analytics (reconstruídas quando precisas)"""
+        self.analytics_generation += 1
+        self.history_columns = None
+
+    def on_history_changed(self, removed):
+        """removed = (início, fim) de um período apagado, ou None para qualquer outra alteração"""
+        if removed is None:
+            self.reset_history_analytics()
+            return
+        self.analytics_generation += 1
+        if self.history_columns is not None:
+            self.history_columns.remove_range(*removed)
+
+    def rebuild_url_index(self):
+        """Pede a reconstrução do índice de autocompletar (seguro de qualquer thread)"""
+        self.url_index_stale.emit()
+
+    def start_url_index_build(self):
+        """Constrói o índice com o histórico completo e os bookmarks numa thread
+
+        Só uma construção de cada vez: um pedido feito durante uma construção
+        desatualiza-a e on_url_index_ready recomeça.
+        """
+        self.url_index_generation += 1
+        if self.url_index_building:
+            return
+        self.url_index_building = True
+        generation = self.url_index_generation
+        self.url_index_bookmarks = []
+
+        def build():
+            try:
+                rows, last_rowid = self.history_manager.url_stats()
+                index = FrecencyIndex()
+                index.load(rows)
+                for bookmark in self.bookmarks_manager.bookmarks:
+                    try:
+                        added = datetime.datetime.fromisoformat(bookmark.get('added', '')).timestamp()
+                    except (TypeError, ValueError):
+                        added = None
+                    # mesma chave que o histórico: um só registo por página
+                    index.add_bookmark(canonical_url(bookmark.get('url', '')), bookmark.get('title', ''), added)
+            except Exception as e:
+                print(f'Erro ao construir índice de autocompletar: {e}')
+                index, last_rowid = None, 0
+            self.url_index_ready.emit((generation, index, last_rowid))
+        threading.Thread(target=build, daemon=True).start()
+
+    def on_url_index_ready(self, result):
+        """Troca pelo índice novo, com as visitas e bookmarks gravados entretanto"""
+        generation, index, last_rowid = result
+        self.url_index_building = False
+        if generation != self.url_index_generation:
+            self.start_url_index_build()
+            return
+        if index is None:
+            return
+        # o índice atual já as tem, mas o novo foi lido antes delas
+        for url, title, visited_at in self.history_manager.visits_after(last_rowid):
+            index.add_visit(url, title, visited_at)
+        for url, title in self.url_index_bookmarks:
+            index.add_bookmark(url, title)
+        self.url_index_bookmarks = []
+        self.url_index = index
+
+    def add_url_index_bookmark(self, url: str, title: str):
+        """Bookmark novo no índice (e no que estiver a ser construído)"""
+        url = canonical_url(url)
+        self.url_index.add_bookmark(url, title)
+        if self.url_index_building:
+            self.url_index_bookmarks.append((url, title))
+
+    def on_history_urls_removed(self, urls):
+        """Visitas apagadas: atualiza só os URLs afetados no índice"""
+        if self.url_index_building or len(urls) > self.URL_INDEX_REFRESH_LIMIT:
+            self.rebuild_url_index()
+            return
+        index = self.url_index
+        for url in urls:
+            index.remove(url)
+        # os que ainda têm visitas voltam com a contagem atualizada
+        index.load(self.history_manager.url_stats_for(urls))
+        for url in urls:
+            bookmark = self.bookmarks_manager.find_by_url(url)
+            if bookmark:
+                index.add_bookmark(url, bookmark.get('title', ''))
+
     @Slot()
     def go_back(self):
         view = self.current_browser()
@@ -411,10 +1589,54 @@ class MainWindow(QMainWindow):
             self.urlbar.setText(view.url().toString())
             self.setWindowTitle(view.title())
             self.statusBar().showMessage(f'Página: {view.url().toString()}')
+            self.update_bookmark_star()
+            self.update_autofill_button()
 
     def on_url_changed(self, index, qurl):
         if index == self.tabs.currentIndex():
             self.urlbar.setText(qurl.toString())
+            self.update_bookmark_star()
+
+    def on_autofill_url(self, tab, qurl):
+        """Nova página: logins guardados para a origem (lookup no índice)"""
+        tab.autofill.set_url(qurl.toString(), self.password_manager.logins_for(qurl.toString()))
+        if self.tabs.currentWidget() is tab:
+            self.update_autofill_button()
+
+    def update_autofill_button(self):
+        tab = self.tabs.currentWidget()
+        self.autofill_btn.setEnabled(bool(tab and tab.autofill and tab.autofill.can_fill))
+
+    def autofill_current(self):
+        """Preenche o login da página atual (desencripta só agora)"""
+        tab = self.tabs.currentWidget()
+        if not (tab and tab.autofill and tab.autofill.has_form):
+            return
+        # relido do índice: pode ter sido guardada uma senha depois de a página abrir
+        logins = self.password_manager.logins_for(tab.autofill.origin)
+        if not logins:
+            return
+        service, username = logins[0]
+        if len(logins) > 1:
+            usernames = [user for _, user in logins]
+            choice, ok = QInputDialog.getItem(self, 'Preencher login', 'Utilizador:', usernames, 0, False)
+            if not ok:
+                return
+            service, username = logins[usernames.index(choice)]
+        password = self.password_manager.get_password(service, username)
+        if password is None:
+            QMessageBox.warning(self, 'Erro', 'Não foi possível desencriptar a senha')
+            return
+        tab.autofill.fill.emit(username, password)
+
+    def update_bookmark_star(self):
+        """Estado da ⭐ para a página atual (lookup no índice de bookmarks)"""
+        view = self.current_browser()
+        url = view.url().toString() if view else ''
+        bookmarked = bool(url) and self.bookmarks_manager.is_bookmarked(url)
+        self.bookmark_btn.setChecked(bookmarked)
+        self.bookmark_btn.setText('★' if bookmarked else '☆')
+        self.bookmark_btn.setToolTip('Remover dos bookmarks' if bookmarked else 'Adicionar aos bookmarks')
 
     def toggle_tab_bar(self):
         bar = self.tabs.tabBar()
@@ -427,12 +1649,22 @@ class MainWindow(QMainWindow):
             # update settings
             self.settings.update(dlg.get_values())
             self.append_status('Definições atualizadas')
+            self.apply_history_retention()
             # persist immediately
             try:
                 self.save_settings_snapshot()
             except Exception:
                 pass
 
+    def apply_history_retention(self):
+        """Expira histórico antigo conforme as definições (em background)"""
+        try:
+            days = int(self.settings.get('history_retention_days', 0))
+        except (TypeError, ValueError):
+            return
+        if days > 0:
+            threading.Thread(target=self.history_manager.expire, args=(days,), daemon=True).start()
+
     def append_status(self, text: str):
         self.statusBar().showMessage(text, 5000)
 
@@ -458,8 +1690,7 @@ class MainWindow(QMainWindow):
             'tabs': [self.tabs.widget(i).view.url().toString() for i in range(self.tabs.count())],
             'saved_at': ts
         }
-        with open(fname, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_json_atomic(fname, data)
         # also update current.json for quick load
         try:
             self.save_current_settings()
@@ -509,8 +1740,7 @@ class MainWindow(QMainWindow):
             'settings': self.settings,
             'saved_at': datetime.datetime.now().isoformat()
         }
-        with open(cur, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_json_atomic(cur, data)
 
     def load_current_settings(self):
         cur = os.path.join(self.storage_base(), 'current.json')
@@ -547,25 +1777,36 @@ class MainWindow(QMainWindow):
             if tab:
                 url = tab.view.url().toString()
                 title = tab.view.title()
+                restoring, tab.restoring = tab.restoring, False
+                # recarregamento de uma aba descartada: a página não foi visitada de novo
+                if restoring and url == tab.recorded_url:
+                    return
                 if url and not url.startswith('about:'):
                     self.history_manager.add_entry(url, title)
+                    tab.recorded_url = url
 
-    def add_current_to_bookmarks(self):
-        """Adiciona página atual aos bookmarks"""
+    def toggle_current_bookmark(self):
+        """Adiciona a página atual aos bookmarks, ou remove se já lá estiver"""
         view = self.current_browser()
         if not view:
             QMessageBox.warning(self, 'Erro', 'Nenhuma aba aberta')
+            self.update_bookmark_star()
             return
         url = view.url().toString()
         title = view.title()
         if not url:
             QMessageBox.warning(self, 'Erro', 'URL vazia')
+            self.update_bookmark_star()
             return
         try:
-            self.bookmarks_manager.add_bookmark(url, title)
-            self.append_status(f'Bookmark guardado: {title}')
+            if self.bookmarks_manager.remove_bookmark(url):
+                self.append_status(f'Bookmark removido: {title}')
+            elif self.bookmarks_manager.add_bookmark(url, title):
+                self.add_url_index_bookmark(url, title)
+                self.append_status(f'Bookmark guardado: {title}')
         except Exception as e:
             QMessageBox.critical(self, 'Erro', f'Falha ao guardar bookmark: {e}')
+        self.update_bookmark_star()
 
     def open_history_dialog(self):
         """Abre diálogo de histórico"""
@@ -575,10 +1816,213 @@ class MainWindow(QMainWindow):
             if url:
                 self.add_tab(url)
 
+    def open_top_sites_dialog(self):
+        """Abre diálogo de top sites (na 1ª vez, depois de construir as colunas numa thread)"""
+        if self.history_columns is not None:
+            self.show_top_sites_dialog()
+            return
+        if self.analytics_building:
+            return
+        self.analytics_building = True
+        self.append_status('A preparar estatísticas do histórico...')
+        generation = self.analytics_generation
+
+        def build():
+            try:
+                columns = HistoryColumns.from_storage(self.storage)
+            except Exception as e:
+                columns = None
+                self.task_finished.emit('Erro', f'Estatísticas do histórico falharam: {e}')
+            self.analytics_ready.emit((generation, columns))
+        threading.Thread(target=build, daemon=True).start()
+
+    def on_analytics_ready(self, result):
+        generation, columns = result
+        self.analytics_building = False
+        if columns is None:
+            return
+        if generation != self.analytics_generation:
+            # o histórico mudou durante a construção: construir de novo
+            self.open_top_sites_dialog()
+            return
+        # visitas gravadas enquanto a thread lia
+        columns.catch_up(self.storage)
+        self.history_columns = columns
+        self.show_top_sites_dialog()
+
+    def show_top_sites_dialog(self):
+        dlg = TopSitesDialog(self, self.history_columns)
+        if dlg.exec() == QDialog.Accepted:
+            url = dlg.get_selected_url()
+            if url:
+                self.add_tab(url)
+
+    def run_task(self, description: str, task):
+        """Corre task(progress) numa thread; o progresso aparece na status bar
+
+        task retorna a mensagem final a mostrar ao utilizador.
+        """
+        def progress(count):
+            self.task_progress.emit(f'{description}: {count} registos...')
+
+        def worker():
+            try:
+                self.task_finished.emit('Sucesso', task(progress))
+            except Exception as e:
+                self.task_finished.emit('Erro', f'{description} falhou: {e}')
+
+        self.append_status(f'{description}...')
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_task_finished(self, title: str, message: str):
+        self.append_status(message)
+        if title == 'Erro':
+            QMessageBox.critical(self, title, message)
+        else:
+            QMessageBox.information(self, title, message)
+
+    def import_history_file(self):
+        """Importa histórico de JSONL/CSV/JSON (em streaming, sem duplicados)"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, 'Importar Histórico', '', 'JSON Lines (*.jsonl);;CSV (*.csv);;JSON (*.json)')
+        if not path:
+            return
+
+        def task(progress):
+            imported, skipped = import_history(self.history_manager, path, progress)
+            return f'Histórico importado: {imported} visitas ({skipped} ignoradas)'
+        self.run_task('A importar histórico', task)
+
+    def export_history_file(self):
+        """Exporta histórico para JSONL/CSV (em streaming)"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, 'Exportar Histórico', 'history.jsonl', 'JSON Lines (*.jsonl);;CSV (*.csv)')
+        if not path:
+            return
+
+        def task(progress):
+            count = export_history(self.history_manager, path, progress)
+            return f'Histórico exportado: {count} visitas em {path}'
+        self.run_task('A exportar histórico', task)
+
+    def import_bookmarks_file(self):
+        """Importa bookmarks de HTML (Netscape)/JSONL/CSV/JSON (sem duplicados)"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, 'Importar Bookmarks', '',
+            'Bookmarks HTML (*.html *.htm);;JSON Lines (*.jsonl);;CSV (*.csv);;JSON (*.json)')
+        if not path:
+            return
+        importer = import_bookmarks_html if path.lower().endswith(('.html', '.htm')) else import_bookmarks
+
+        def task(progress):
+            imported, skipped = importer(self.bookmarks_manager, path, progress)
+            if imported:
+                self.rebuild_url_index()
+            return f'Bookmarks importados: {imported} ({skipped} ignorados)'
+        self.run_task('A importar bookmarks', task)
+
+    def export_bookmarks_file(self):
+        """Exporta bookmarks para HTML (Netscape, com pastas)/JSONL/CSV"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, 'Exportar Bookmarks', 'bookmarks.html',
+            'Bookmarks HTML (*.html);;JSON Lines (*.jsonl);;CSV (*.csv)')
+        if not path:
+            return
+        exporter = export_bookmarks_html if path.lower().endswith(('.html', '.htm')) else export_bookmarks
+
+        def task(progress):
+            count = exporter(self.bookmarks_manager, path, progress)
+            return f'Bookmarks exportados: {count} em {path}'
+        self.run_task('A exportar bookmarks', task)
+
+    def import_browser_profile(self):
+        """Importa histórico e bookmarks de uma cópia de um perfil Chrome/Firefox"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, 'Importar de Chrome/Firefox', '',
+            'Perfis de navegador (History places.sqlite Bookmarks);;Todos os ficheiros (*)')
+        if not path:
+            return
+
+        def task(progress):
+            result = import_profile(path, self.history_manager, self.bookmarks_manager, progress)
+            # importar visitas já reconstrói o índice (notify_changed)
+            if result['bookmarks'][0] and not result['visits'][0]:
+                self.rebuild_url_index()
+            visits, bookmarks = result['visits'], result['bookmarks']
+            return (f'Importadas {visits[0]} visitas ({visits[1]} ignoradas) e '
+                    f'{bookmarks[0]} bookmarks ({bookmarks[1]} ignorados)')
+        self.run_task('A importar perfil', task)
+
+    def import_passwords_file(self):
+        """Importa senhas de um CSV exportado por outro navegador/gestor"""
+        path, _ = QFileDialog.getOpenFileName(self, 'Importar Senhas', '', 'CSV (*.csv)')
+        if not path:
+            return
+
+        def task(progress):
+            added, updated, skipped = import_passwords_csv(self.password_manager, path, progress)
+            return f'Senhas importadas: {added} novas, {updated} atualizadas ({skipped} ignoradas)'
+        self.run_task('A importar senhas', task)
+
+    def rotate_password_key(self):
+        """Gera uma chave nova e reencripta todas as senhas com ela"""
+        reply = QMessageBox.question(
+            self, 'Trocar Chave', 'Gerar uma chave de encriptação nova e reencriptar todas as senhas?\n'
+            'Cópias antigas do ficheiro .key deixam de servir.', QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+
+        def task(progress):
+            count = rotate_key(self.password_manager, progress)
+            return f'Chave trocada: {count} senhas reencriptadas'
+        self.run_task('A reencriptar senhas', task)
+
+    def check_password_breaches(self):
+        """Procura as senhas guardadas numa lista de hashes de fugas de dados (offline)"""
+        path = self.settings.get('breach_file', '')
+        if not path or not os.path.exists(path):
+            path, _ = QFileDialog.getOpenFileName(
+                self, 'Lista de Senhas Comprometidas', '', 'Lista de hashes SHA-1 (*.txt);;Todos (*)')
+            if not path:
+                return
+            self.settings['breach_file'] = path
+            try:
+                self.save_current_settings()
+            except Exception:
+                pass
+
+        def task(progress):
+            with BreachList(path) as breach_list:
+                found = self.password_manager.check_breaches(breach_list, progress)
+            if not found:
+                return 'Nenhuma senha guardada aparece na lista ✅'
+            lines = [f'{len(found)} senhas comprometidas (mude-as):']
+            for entry in found[:self.BREACH_REPORT_LIMIT]:
+                lines.append(f"⚠️ {entry['service']} · {entry['username']} ({entry['breach_count']} vezes)")
+            return '\n'.join(lines)
+        self.run_task('A verificar senhas', task)
+
+    def check_bookmark_links(self):
+        """Procura bookmarks mortos, redirecionados ou lentos (em segundo plano)"""
+        def task(progress):
+            report = check_bookmarks(self.bookmarks_manager, self.link_checker, progress)
+            lines = [f'Links verificados: {sum(len(r) for r in report.values())}',
+                     f'Mortos: {len(report[DEAD])} · Redirecionados: {len(report[REDIRECTED])} · '
+                     f'Lentos: {len(report[SLOW])}']
+            for result in report[DEAD][:self.LINK_REPORT_LIMIT]:
+                lines.append(f'✗ {result.url} ({result.code or result.error})')
+            for result in report[REDIRECTED][:self.LINK_REPORT_LIMIT]:
+                lines.append(f'→ {result.url} → {result.final_url}')
+            return '\n'.join(lines)
+        self.run_task('A verificar links', task)
+
     def open_bookmarks_dialog(self):
         """Abre diálogo de bookmarks"""
         dlg = BookmarksDialog(self, self.bookmarks_manager)
-        if dlg.exec() == QDialog.Accepted:
+        accepted = dlg.exec() == QDialog.Accepted
+        # o diálogo pode ter removido o bookmark da página atual
+        self.update_bookmark_star()
+        if accepted:
             url = dlg.get_selected_url()
             if url:
                 self.add_tab(url)
@@ -587,6 +2031,10 @@ class MainWindow(QMainWindow):
         """Abre diálogo de senhas"""
         dlg = PasswordsDialog(self, self.password_manager)
         dlg.exec()
+        # senhas adicionadas/removidas para a página atual
+        tab = self.tabs.currentWidget()
+        if tab and tab.autofill:
+            self.on_autofill_url(tab, tab.view.url())
 
     def firebase_login(self):
         """Abre diálogo de login Firebase"""
@@ -609,7 +2057,7 @@ class MainWindow(QMainWindow):
         
         try:
             # Sincronizar histórico
-            self.firebase_sync.sync_history(self.history_manager.history)
+            self.firebase_sync.sync_history([e.to_dict() for e in self.history_manager.history])
             # Sincronizar bookmarks
             self.firebase_sync.sync_bookmarks(self.bookmarks_manager.bookmarks)
             # Sincronizar senhas
@@ -620,6 +2068,15 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, 'Erro', f'Falha ao sincronizar: {e}')
 
+    def closeEvent(self, event):
+        """Fecha a base de dados ao sair"""
+        self.password_manager.secrets.clear()
+        try:
+            self.storage.close()
+        except Exception:
+            pass
+        super().closeEvent(event)
+
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None, current_settings=None):
@@ -635,6 +2092,13 @@ class SettingsDialog(QDialog):
         self.newtab_edit = QLineEdit(self.current.get('default_new_tab', 'about:blank'))
         form.addRow('Default new tab:', self.newtab_edit)
 
+        self.retention_spin = QSpinBox()
+        self.retention_spin.setRange(0, 3650)
+        self.retention_spin.setSuffix(' dias')
+        self.retention_spin.setSpecialValueText('Sempre')
+        self.retention_spin.setValue(int(self.current.get('history_retention_days', 0) or 0))
+        form.addRow('Manter histórico:', self.retention_spin)
+
         # Buttons
         btns = QWidget()
         btn_layout = QVBoxLayout(btns)
@@ -649,12 +2113,516 @@ class SettingsDialog(QDialog):
     def get_values(self):
         return {
             'homepage': self.home_edit.text().strip(),
-            'default_new_tab': self.newtab_edit.text().strip()
+            'default_new_tab': self.newtab_edit.text().strip(),
+            'history_retention_days': self.retention_spin.value()
         }
 
 
+class PagedListModel(QAbstractListModel):
+    """Modelo de lista virtual: vai buscar páginas ao store à medida do scroll
+
+    fetch_page(after, limit) devolve a página a seguir à entrada after (a
+    última carregada, None na primeira), como uma lista de dicionários, e
+    display(entry) o texto a mostrar; o URL fica em Qt.UserRole.
+    """
+    PAGE_SIZE = 200
+
+    def __init__(self, fetch_page, display, parent=None):
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.display = display
+        self.entries = []
+        self.exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.entries):
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            return self.display(entry)
+        if role in (Qt.UserRole, Qt.ToolTipRole):
+            return entry.get('url', '')
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        page = self.fetch_page(self.entries[-1] if self.entries else None, self.PAGE_SIZE)
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+        start = len(self.entries)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self.entries.extend(page)
+        self.endInsertRows()
+
+    def reload(self, fetch_page=None):
+        """Descarta as páginas carregadas (opcionalmente com nova fonte)"""
+        self.beginResetModel()
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self.entries = []
+        self.exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+
+class _BookmarkNode:
+    """Nó da árvore carregado em memória pelo BookmarkTreeModel"""
+    __slots__ = ('id', 'kind', 'title', 'url', 'parent', 'row', 'children', 'complete')
+
+    def __init__(self, id, kind, title='', url='', parent=None, row=0):
+        self.id = id
+        self.kind = kind
+        self.title = title
+        self.url = url
+        self.parent = parent
+        self.row = row
+        self.children = []
+        # pastas só são lidas da BD quando expandidas (e por páginas)
+        self.complete = kind != BookmarksManager.FOLDER
+
+
+class BookmarkTreeModel(QAbstractItemModel):
+    """Árvore de bookmarks: cada pasta é lida só quando é expandida
+
+    Os filhos de uma pasta vêm em páginas de PAGE_SIZE, por isso abrir
+    uma pasta com milhares de bookmarks não lê a pasta inteira.
+    """
+    PAGE_SIZE = 200
+    SEPARATOR_TEXT = '─' * 24
+
+    def __init__(self, bookmarks_manager, parent=None):
+        super().__init__(parent)
+        self.manager = bookmarks_manager
+        self.root = _BookmarkNode(None, BookmarksManager.FOLDER)
+
+    def node(self, index) -> _BookmarkNode:
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index_of(self, node: _BookmarkNode):
+        if node is self.root or node is None:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if column != 0 or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, 0, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return node.kind == BookmarksManager.FOLDER and (not node.complete or bool(node.children))
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.internalPointer().kind != BookmarksManager.SEPARATOR:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            if node.kind == BookmarksManager.SEPARATOR:
+                return self.SEPARATOR_TEXT
+            if node.kind == BookmarksManager.FOLDER:
+                return f'📁 {node.title or "Sem nome"}'
+            return node.title or node.url
+        if role == Qt.EditRole:
+            return node.title
+        if role in (Qt.UserRole, Qt.ToolTipRole):
+            return node.url
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Renomear na própria árvore (F2): grava só esse nó"""
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        node = index.internalPointer()
+        node.title = str(value).strip()
+        self.manager.rename_node(node.id, node.title)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not self.node(parent).complete
+
+    def fetchMore(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.complete:
+            return
+        # a seguir ao último filho carregado (as posições na BD mudam com move_node)
+        after_id = node.children[-1].id if node.children else None
+        page = self.manager.children(node.id, self.PAGE_SIZE, after_id)
+        if not page:
+            # sem mais filhos: numa pasta vazia deixa de mostrar a seta de expandir
+            self.layoutAboutToBeChanged.emit()
+            node.complete = True
+            self.layoutChanged.emit()
+            return
+        if len(page) < self.PAGE_SIZE:
+            node.complete = True
+        start = len(node.children)
+        self.beginInsertRows(parent, start, start + len(page) - 1)
+        node.children.extend(
+            _BookmarkNode(entry['id'], entry['kind'], entry['title'], entry['url'], node, start + i)
+            for i, entry in enumerate(page))
+        self.endInsertRows()
+
+    @staticmethod
+    def _renumber(node: _BookmarkNode, start: int = 0):
+        for row in range(start, len(node.children)):
+            node.children[row].row = row
+
+    def append_node(self, parent: QModelIndex, node_id: int, kind: str, title: str = '', url: str = ''):
+        """Mostra um nó acabado de criar no fim da pasta (se já estiver carregada)"""
+        folder = self.node(parent)
+        if not folder.complete:
+            # a pasta ainda não foi lida (toda): o nó aparece quando for
+            return
+        row = len(folder.children)
+        self.beginInsertRows(parent, row, row)
+        folder.children.append(_BookmarkNode(node_id, kind, title, url, folder, row))
+        self.endInsertRows()
+
+    def remove_index(self, index):
+        node = index.internalPointer()
+        folder = node.parent
+        self.beginRemoveRows(self.index_of(folder), node.row, node.row)
+        del folder.children[node.row]
+        self._renumber(folder, node.row)
+        self.endRemoveRows()
+
+    def move_index(self, index, parent: QModelIndex, row: int) -> bool:
+        """Move um nó para a linha row de parent (na BD e na árvore)"""
+        node = index.internalPointer()
+        folder = self.node(parent)
+        source = node.parent
+        # row conta as linhas antes de retirar o nó (convenção do beginMoveRows);
+        # numa pasta carregada só em parte o nó seguinte pode ainda estar na BD
+        while row >= len(folder.children) and not folder.complete:
+            self.fetchMore(parent)
+        before = folder.children[row] if row < len(folder.children) else None
+        if not self.manager.move_node(node.id, folder.id, before.id if before else None):
+            return False
+        if not self.beginMoveRows(self.index_of(source), node.row, node.row, parent, row):
+            return False
+        del source.children[node.row]
+        if folder is source and row > node.row:
+            row -= 1
+        folder.children.insert(row, node)
+        node.parent = folder
+        self._renumber(source)
+        if folder is not source:
+            self._renumber(folder)
+        self.endMoveRows()
+        return True
+
+
+class BookmarkListModel(QAbstractListModel):
+    """Todos os bookmarks do índice de pesquisa numa lista plana, por título
+
+    Os dados vêm da memória (BookmarkSearchIndex), sem ir à BD; o id do
+    bookmark fica em ID_ROLE e o URL em Qt.UserRole.
+    """
+    ID_ROLE = Qt.UserRole + 1
+
+    def __init__(self, search_index: BookmarkSearchIndex, parent=None):
+        super().__init__(parent)
+        self.search_index = search_index
+        with search_index.lock:
+            entries = dict(search_index.entries)
+        self.ids = sorted(entries, key=lambda i: (fold(entries[i][1] or entries[i][0]), i))
+        self.rows = {bookmark_id: row for row, bookmark_id in enumerate(self.ids)}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.ids):
+            return None
+        bookmark_id = self.ids[index.row()]
+        if role == self.ID_ROLE:
+            return bookmark_id
+        entry = self.search_index.entry(bookmark_id)
+        if entry is None:
+            return None
+        url, title, folder, _ = entry
+        if role == Qt.DisplayRole:
+            return f'{title or url}\n{url}' + (f'\n📁 {folder}' if folder else '')
+        if role in (Qt.UserRole, Qt.ToolTipRole):
+            return url
+        return None
+
+    def remove_id(self, bookmark_id: int):
+        row = self.rows.get(bookmark_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.ids[row]
+        del self.rows[bookmark_id]
+        for i in range(row, len(self.ids)):
+            self.rows[self.ids[i]] = i
+        self.endRemoveRows()
+
+
+class BookmarkFilterModel(QAbstractProxyModel):
+    """Proxy com as linhas do BookmarkListModel que correspondem à pesquisa
+
+    O filtro é um conjunto de ids vindo do índice de tokens, por isso não há
+    uma chamada por linha da fonte como no QSortFilterProxyModel: mudar o
+    texto custa O(resultados). As linhas mantêm a ordem da fonte.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text = ''
+        self.source_rows = []
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.rowsAboutToBeRemoved.connect(self.beginResetModel)
+        model.rowsRemoved.connect(self._source_changed)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._source_changed)
+        self.set_filter(self.text)
+
+    def set_filter(self, text: str):
+        self.beginResetModel()
+        self.text = text
+        self._filter_rows()
+        self.endResetModel()
+
+    def _source_changed(self, *args):
+        self._filter_rows()
+        self.endResetModel()
+
+    def _filter_rows(self):
+        source = self.sourceModel()
+        if source is None:
+            self.source_rows = []
+            return
+        ids = source.search_index.search(self.text)
+        if len(ids) * 8 > len(source.ids):
+            # quase tudo corresponde: percorrer a fonte já ordenada é mais barato que ordenar
+            self.source_rows = [row for row, bookmark_id in enumerate(source.ids) if bookmark_id in ids]
+        else:
+            rows = source.rows
+            self.source_rows = sorted(rows[i] for i in ids if i in rows)
+
+    def mapToSource(self, index):
+        if not index.isValid() or index.row() >= len(self.source_rows):
+            return QModelIndex()
+        return self.sourceModel().index(self.source_rows[index.row()], 0)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = bisect.bisect_left(self.source_rows, source_index.row())
+        if row == len(self.source_rows) or self.source_rows[row] != source_index.row():
+            return QModelIndex()
+        return self.createIndex(row, 0)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < len(self.source_rows):
+            return QModelIndex()
+        return self.createIndex(row, 0)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.source_rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+
+class PasswordTableModel(QAbstractTableModel):
+    """Tabela de senhas (serviço, utilizador, apagar) carregada por páginas
+
+    Abrir custa uma página, seja qual for o tamanho do cofre; adicionar ou
+    apagar uma senha mexe só nessa linha. As senhas encriptadas nunca
+    chegam ao modelo; o id da entrada fica em Qt.UserRole.
+    """
+    PAGE_SIZE = 200
+    HEADERS = ('Serviço', 'Utilizador', '')
+    DELETE_COLUMN = 2
+    DELETE_TEXT = 'Apagar'
+
+    def __init__(self, password_manager, parent=None):
+        super().__init__(parent)
+        self.manager = password_manager
+        self.text = ''
+        self.entries = []
+        self.exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.entries):
+            return None
+        entry = self.entries[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return entry['service']
+            if column == 1:
+                return entry['username']
+            return self.DELETE_TEXT
+        if role == Qt.UserRole:
+            return entry['id']
+        if column == 0 and entry.get('breach_count'):
+            if role == Qt.ForegroundRole:
+                return QColor(Qt.red)
+            if role == Qt.ToolTipRole:
+                return f"⚠️ Senha comprometida: aparece {entry['breach_count']} vezes em fugas de dados"
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        after_id = self.entries[-1]['id'] if self.entries else 0
+        page = self.manager.entries(self.text, after_id, self.PAGE_SIZE)
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+        start = len(self.entries)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self.entries.extend(page)
+        self.endInsertRows()
+
+    def set_filter(self, text: str):
+        """Recomeça a lista com as entradas que têm todos os termos de text"""
+        self.beginResetModel()
+        self.text = text
+        self.entries = []
+        self.exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def _row_of(self, password_id: int) -> int:
+        for row, entry in enumerate(self.entries):
+            if entry['id'] == password_id:
+                return row
+        return None
+
+    def refresh_entry(self, password_id: int):
+        """Entrada nova ou alterada: atualiza ou acrescenta só essa linha"""
+        page = self.manager.entries(self.text, password_id - 1, 1)
+        entry = page[0] if page and page[0]['id'] == password_id else None
+        row = self._row_of(password_id)
+        if row is not None:
+            if entry is None:
+                self.remove_rows([row])
+                return
+            self.entries[row] = entry
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+        elif entry is not None and self.exhausted:
+            # ids crescentes: uma entrada nova vai para o fim; se a lista
+            # ainda não chegou ao fim, aparece quando essa página for lida
+            row = len(self.entries)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.entries.append(entry)
+            self.endInsertRows()
+
+    def remove_login(self, service: str, username: str):
+        """Tira as linhas de um login apagado (e de duplicados antigos dele)"""
+        key = service_key(service)
+        self.remove_rows([row for row, entry in enumerate(self.entries)
+                          if entry['service_key'] == key and entry['username'] == username])
+
+    def remove_rows(self, rows: list):
+        for row in sorted(rows, reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.entries[row]
+            self.endRemoveRows()
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Desenha um botão na célula (sem criar um widget por linha)"""
+    clicked = Signal(QModelIndex)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # (linha, coluna) do botão premido, até o rato ser largado
+        self._pressed = None
+
+    def _button_option(self, option, index) -> QStyleOptionButton:
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = index.data(Qt.DisplayRole) or ''
+        button.state = QStyle.State_Enabled
+        if self._pressed == (index.row(), index.column()):
+            button.state |= QStyle.State_Sunken
+        else:
+            button.state |= QStyle.State_Raised
+        return button
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, self._button_option(option, index), painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            self._pressed = (index.row(), index.column())
+            return True
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            pressed, self._pressed = self._pressed, None
+            if pressed == (index.row(), index.column()) and option.rect.contains(event.position().toPoint()):
+                self.clicked.emit(index)
+            return True
+        return False
+
+
 class HistoryDialog(QDialog):
     """Diálogo para visualizar histórico"""
+    CLEAR_RANGES = [
+        ('Última hora', 3600),
+        ('Últimas 24 horas', 86400),
+        ('Últimos 7 dias', 7 * 86400),
+        ('Últimas 4 semanas', 28 * 86400),
+        ('Tudo', None),
+    ]
+
     def __init__(self, parent=None, history_manager=None):
         super().__init__(parent)
         self.setWindowTitle('Histórico de Navegação')
@@ -664,23 +2632,37 @@ class HistoryDialog(QDialog):
 
         layout = QVBoxLayout(self)
         
-        label = QLabel('Clique num item para abrir, ou feche para cancelar:')
-        layout.addWidget(label)
-
-        self.list_widget = QListWidget()
-        self.list_widget.itemDoubleClicked.connect(self.on_item_selected)
-        layout.addWidget(self.list_widget)
-
-        # Carregar histórico
+        self.label = QLabel('Clique num item para abrir, ou feche para cancelar:')
+        layout.addWidget(self.label)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('Pesquisar no histórico...')
+        self.search_edit.setClearButtonEnabled(True)
+        layout.addWidget(self.search_edit)
+
+        # Pesquisa enquanto se escreve (com pequeno debounce)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(120)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_edit.textChanged.connect(lambda _: self.search_timer.start())
+
+        self.list_view = QListView()
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.doubleClicked.connect(self.on_item_selected)
+        layout.addWidget(self.list_view)
+
+        # Histórico carregado por páginas conforme o scroll
+        self.model = PagedListModel(self._fetch_recent, self.format_entry, self)
+        self.list_view.setModel(self.model)
         if history_manager:
-            for entry in history_manager.get_recent(100):
-                url = entry.get('url', '')
-                title = entry.get('title', 'Sem título')
-                visited = entry.get('visited', '')
-                item_text = f"{title}\n{url}\n({visited})"
-                item = QListWidgetItem(item_text)
-                item.setData(256, url)  # Guardar URL em role 256
-                self.list_widget.addItem(item)
+            self.model.fetchMore()
+            # ainda a importar histórico antigo: recarregar quando terminar
+            if not history_manager.ready.is_set() and hasattr(parent, 'history_ready'):
+                self.label.setText('A carregar histórico... (a lista atualiza automaticamente)')
+                parent.history_ready.connect(self.on_history_ready)
+        else:
+            self.model.exhausted = True
 
         # Botões
         btn_layout = QHBoxLayout()
@@ -695,21 +2677,54 @@ class HistoryDialog(QDialog):
         btn_layout.addWidget(close_btn)
         layout.addLayout(btn_layout)
 
+    def on_history_ready(self):
+        self.label.setText('Clique num item para abrir, ou feche para cancelar:')
+        self.run_search()
+
+    @staticmethod
+    def format_entry(entry: dict) -> str:
+        title = entry.get('title') or 'Sem título'
+        visits = entry.get('visit_count', 1)
+        return (f"{title}\n{entry.get('url', '')}\n"
+                f"({entry.get('visited', '')} · {visits} visita{'s' if visits != 1 else ''})")
+
+    def _fetch_recent(self, after, limit: int) -> list:
+        return self.history_manager.get_recent(limit, after)
+
+    def run_search(self):
+        """Filtra o histórico pelo texto da caixa de pesquisa"""
+        if not self.history_manager:
+            return
+        text = self.search_edit.text().strip()
+        if text:
+            self.model.reload(lambda after, limit: self.history_manager.search(text, limit, after))
+        else:
+            self.model.reload(self._fetch_recent)
+
     def on_item_selected(self):
         """Abre URL selecionada"""
-        item = self.list_widget.currentItem()
-        if item:
-            self.selected_url = item.data(256)
+        index = self.list_view.currentIndex()
+        if index.isValid():
+            self.selected_url = index.data(Qt.UserRole)
             self.accept()
 
     def clear_all(self):
-        """Limpa histórico"""
-        reply = QMessageBox.question(self, 'Confirmar', 'Deseja limpar todo o histórico?',
+        """Limpa histórico (todo ou só um período recente)"""
+        labels = [label for label, _ in self.CLEAR_RANGES]
+        choice, ok = QInputDialog.getItem(self, 'Limpar Histórico', 'Período a limpar:',
+                                          labels, 0, False)
+        if not ok:
+            return
+        seconds = dict(self.CLEAR_RANGES)[choice]
+        reply = QMessageBox.question(self, 'Confirmar', f'Deseja limpar o histórico ({choice.lower()})?',
                                      QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
             if self.history_manager:
-                self.history_manager.clear_history()
-            self.list_widget.clear()
+                if seconds is None:
+                    self.history_manager.clear_history()
+                else:
+                    self.history_manager.delete_recent(seconds)
+            self.run_search()
             QMessageBox.information(self, 'Sucesso', 'Histórico limpo')
 
     def get_selected_url(self):
@@ -717,7 +2732,9 @@ class HistoryDialog(QDialog):
 
 
 class BookmarksDialog(QDialog):
-    """Diálogo para gerir bookmarks"""
+    """Diálogo para gerir bookmarks (árvore de pastas)"""
+    TREE_LABEL = 'Bookmarks guardados (F2 para renomear):'
+
     def __init__(self, parent=None, bookmarks_manager=None):
         super().__init__(parent)
         self.setWindowTitle('Bookmarks')
@@ -727,24 +2744,56 @@ class BookmarksDialog(QDialog):
 
         layout = QVBoxLayout(self)
 
-        label = QLabel('Bookmarks guardados:')
-        layout.addWidget(label)
-
-        self.list_widget = QListWidget()
-        self.list_widget.itemDoubleClicked.connect(self.on_item_selected)
-        layout.addWidget(self.list_widget)
-
-        # Carregar bookmarks
+        self.label = QLabel(self.TREE_LABEL)
+        layout.addWidget(self.label)
+
+        # Filtra enquanto se escreve; o índice de pesquisa só é construído no primeiro uso
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('Pesquisar por título, URL ou pasta...')
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.apply_filter)
+        layout.addWidget(self.search_edit)
+        self.search_model = None
+
+        self.results_view = QListView()
+        self.results_view.setUniformItemSizes(True)
+        # layout por lotes: o filtro não espera pelo layout de milhares de linhas
+        self.results_view.setLayoutMode(QListView.Batched)
+        self.results_view.setBatchSize(BookmarkTreeModel.PAGE_SIZE)
+        self.results_view.doubleClicked.connect(self.on_item_selected)
+        self.results_view.hide()
+        layout.addWidget(self.results_view)
+
+        # Pastas lidas só quando expandidas, por páginas
+        self.tree_view = QTreeView()
+        self.tree_view.setHeaderHidden(True)
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.setEditTriggers(QTreeView.EditKeyPressed)
+        self.tree_view.doubleClicked.connect(self.on_item_selected)
+        layout.addWidget(self.tree_view)
+
+        self.model = BookmarkTreeModel(bookmarks_manager, self)
+        self.tree_view.setModel(self.model)
         if bookmarks_manager:
-            for bookmark in bookmarks_manager.bookmarks:
-                url = bookmark.get('url', '')
-                title = bookmark.get('title', 'Sem título')
-                item_text = f"{title}\n{url}"
-                item = QListWidgetItem(item_text)
-                item.setData(256, url)
-                self.list_widget.addItem(item)
+            self.model.fetchMore()
+            # índice de pesquisa preparado em segundo plano, antes da primeira tecla
+            threading.Thread(target=lambda: bookmarks_manager.search_index, daemon=True).start()
+        else:
+            self.model.root.complete = True
 
         # Botões
+        edit_layout = QHBoxLayout()
+        # só se aplicam à árvore: desativados enquanto há uma pesquisa
+        self.edit_buttons = []
+        for text, slot in (('Nova Pasta', self.new_folder), ('Separador', self.new_separator),
+                           ('Renomear', self.rename_selected), ('Mover para...', self.move_selected),
+                           ('↑', lambda: self.shift_selected(-1)), ('↓', lambda: self.shift_selected(1))):
+            btn = QPushButton(text)
+            btn.clicked.connect(slot)
+            edit_layout.addWidget(btn)
+            self.edit_buttons.append(btn)
+        layout.addLayout(edit_layout)
+
         btn_layout = QHBoxLayout()
         open_btn = QPushButton('Abrir')
         open_btn.clicked.connect(self.on_item_selected)
@@ -757,22 +2806,239 @@ class BookmarksDialog(QDialog):
         btn_layout.addWidget(close_btn)
         layout.addLayout(btn_layout)
 
+    def is_filtering(self) -> bool:
+        return not self.results_view.isHidden()
+
+    def apply_filter(self, text: str):
+        """Mostra só os bookmarks com todos os termos (título, URL ou pasta)"""
+        text = text.strip()
+        filtering = bool(text) and self.bookmarks_manager is not None
+        if filtering:
+            if self.search_model is None:
+                source = BookmarkListModel(self.bookmarks_manager.search_index, self)
+                self.search_model = BookmarkFilterModel(self)
+                self.search_model.setSourceModel(source)
+                self.results_view.setModel(self.search_model)
+            self.search_model.set_filter(text)
+            count = self.search_model.rowCount()
+            self.label.setText(f'{count} bookmark{"s" if count != 1 else ""} encontrado{"s" if count != 1 else ""}:')
+        else:
+            self.label.setText(self.TREE_LABEL)
+        self.results_view.setVisible(filtering)
+        self.tree_view.setVisible(not filtering)
+        for btn in self.edit_buttons:
+            btn.setEnabled(not filtering)
+
+    def _target_folder(self) -> QModelIndex:
+        """Pasta onde criar nós: a selecionada, ou a pasta do item selecionado"""
+        index = self.tree_view.currentIndex()
+        if not index.isValid():
+            return QModelIndex()
+        if self.model.node(index).kind == BookmarksManager.FOLDER:
+            return index
+        return index.parent()
+
     def on_item_selected(self):
         """Abre bookmark selecionado"""
-        item = self.list_widget.currentItem()
-        if item:
-            self.selected_url = item.data(256)
+        if self.is_filtering():
+            index = self.results_view.currentIndex()
+            if index.isValid():
+                self.selected_url = index.data(Qt.UserRole)
+                self.accept()
+            return
+        index = self.tree_view.currentIndex()
+        if index.isValid() and self.model.node(index).kind == BookmarksManager.BOOKMARK:
+            self.selected_url = index.data(Qt.UserRole)
             self.accept()
 
+    def new_folder(self):
+        if not self.bookmarks_manager:
+            return
+        title, ok = QInputDialog.getText(self, 'Nova Pasta', 'Nome da pasta:')
+        if not ok or not title.strip():
+            return
+        parent = self._target_folder()
+        folder_id = self.bookmarks_manager.add_folder(title.strip(), self.model.node(parent).id)
+        self.model.append_node(parent, folder_id, BookmarksManager.FOLDER, title.strip())
+        self.tree_view.expand(parent)
+
+    def new_separator(self):
+        if not self.bookmarks_manager:
+            return
+        parent = self._target_folder()
+        separator_id = self.bookmarks_manager.add_separator(self.model.node(parent).id)
+        self.model.append_node(parent, separator_id, BookmarksManager.SEPARATOR)
+
+    def rename_selected(self):
+        index = self.tree_view.currentIndex()
+        if index.isValid() and self.model.flags(index) & Qt.ItemIsEditable:
+            self.tree_view.edit(index)
+
+    def move_selected(self):
+        """Move o item selecionado para outra pasta (para o fim)"""
+        index = self.tree_view.currentIndex()
+        if not index.isValid() or not self.bookmarks_manager:
+            return
+        folders = [(None, '(Raiz)')] + self.bookmarks_manager.folders()
+        labels = [path for _, path in folders]
+        choice, ok = QInputDialog.getItem(self, 'Mover', 'Mover para a pasta:', labels, 0, False)
+        if not ok:
+            return
+        folder_id = folders[labels.index(choice)][0]
+        node = self.model.node(index)
+        if not self.bookmarks_manager.move_node(node.id, folder_id):
+            QMessageBox.warning(self, 'Erro', 'Não é possível mover uma pasta para dentro de si própria')
+            return
+        # a pasta de destino volta a ser lida quando for expandida
+        self.model.remove_index(index)
+        self._reload_folder(folder_id)
+
+    def _reload_folder(self, folder_id):
+        """Descarta os filhos carregados de uma pasta visível (lidos de novo ao expandir)"""
+        stack = [self.model.root]
+        while stack:
+            node = stack.pop()
+            if node.id == folder_id and node.kind == BookmarksManager.FOLDER:
+                parent = self.model.index_of(node)
+                if node.children:
+                    self.model.beginRemoveRows(parent, 0, len(node.children) - 1)
+                    node.children = []
+                    self.model.endRemoveRows()
+                node.complete = False
+                if node is self.model.root:
+                    self.model.fetchMore()
+                return
+            stack.extend(child for child in node.children if child.kind == BookmarksManager.FOLDER)
+
+    def shift_selected(self, step: int):
+        """Sobe/desce o item selecionado dentro da pasta"""
+        index = self.tree_view.currentIndex()
+        if not index.isValid():
+            return
+        node = self.model.node(index)
+        row = node.row + step
+        if row >= len(node.parent.children) and self.model.canFetchMore(index.parent()):
+            # último nó carregado: o seguinte vem na próxima página
+            self.model.fetchMore(index.parent())
+        if row < 0 or row >= len(node.parent.children):
+            return
+        # destino no formato do beginMoveRows: abaixo conta a linha do próprio nó
+        self.model.move_index(index, index.parent(), row if step < 0 else row + 1)
+        self.tree_view.setCurrentIndex(self.model.index_of(node))
+
     def remove_selected(self):
-        """Remove bookmark selecionado"""
-        item = self.list_widget.currentItem()
-        if item:
-            url = item.data(256)
-            if self.bookmarks_manager:
-                self.bookmarks_manager.remove_bookmark(url)
-            self.list_widget.takeItem(self.list_widget.row(item))
-            QMessageBox.information(self, 'Sucesso', 'Bookmark removido')
+        """Remove item selecionado (uma pasta é removida com o conteúdo)"""
+        if self.is_filtering():
+            self.remove_search_result()
+            return
+        index = self.tree_view.currentIndex()
+        if not index.isValid():
+            return
+        node = self.model.node(index)
+        if node.kind == BookmarksManager.FOLDER:
+            reply = QMessageBox.question(self, 'Confirmar',
+                                         f'Remover a pasta "{node.title}" e todo o conteúdo?',
+                                         QMessageBox.Yes | QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+        if self.bookmarks_manager:
+            self.bookmarks_manager.remove_node(node.id)
+        self.model.remove_index(index)
+        if node.kind != BookmarksManager.SEPARATOR:
+            QMessageBox.information(self, 'Sucesso', 'Pasta removida' if node.kind == BookmarksManager.FOLDER
+                                    else 'Bookmark removido')
+
+    def remove_search_result(self):
+        """Remove o bookmark selecionado nos resultados da pesquisa"""
+        index = self.results_view.currentIndex()
+        if not index.isValid() or not self.bookmarks_manager:
+            return
+        bookmark_id = index.data(BookmarkListModel.ID_ROLE)
+        entry = self.bookmarks_manager.search_index.entry(bookmark_id)
+        self.bookmarks_manager.remove_node(bookmark_id)
+        self.search_model.sourceModel().remove_id(bookmark_id)
+        if entry is not None:
+            # a pasta na árvore volta a ser lida quando for expandida
+            self._reload_folder(entry[3])
+        self.apply_filter(self.search_edit.text())
+        QMessageBox.information(self, 'Sucesso', 'Bookmark removido')
+
+    def get_selected_url(self):
+        return self.selected_url
+
+
+class TopSitesDialog(QDialog):
+    """Diálogo com os sites mais visitados e atividade por dia/hora"""
+    PERIODS = [
+        ('Últimos 7 dias', 7),
+        ('Últimos 30 dias', 30),
+        ('Último ano', 365),
+        ('Sempre', None),
+    ]
+
+    def __init__(self, parent=None, columns=None):
+        super().__init__(parent)
+        self.setWindowTitle('Top Sites')
+        self.setGeometry(100, 100, 600, 500)
+        self.columns = columns
+        self.selected_url = None
+
+        layout = QVBoxLayout(self)
+
+        self.period_combo = QComboBox()
+        for label, _ in self.PERIODS:
+            self.period_combo.addItem(label)
+        self.period_combo.setCurrentIndex(1)
+        self.period_combo.currentIndexChanged.connect(self.refresh)
+        layout.addWidget(self.period_combo)
+
+        self.table_widget = QTableWidget()
+        self.table_widget.setColumnCount(2)
+        self.table_widget.setHorizontalHeaderLabels(['Site', 'Visitas'])
+        self.table_widget.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table_widget.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table_widget.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table_widget.cellDoubleClicked.connect(self.on_item_selected)
+        layout.addWidget(self.table_widget)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        close_btn = QPushButton('Fechar')
+        close_btn.clicked.connect(self.reject)
+        layout.addWidget(close_btn)
+
+        self.refresh()
+
+    def refresh(self):
+        """Recalcula top sites e resumo para o período escolhido"""
+        if not self.columns:
+            self.summary_label.setText('Sem histórico')
+            return
+        days = self.PERIODS[self.period_combo.currentIndex()][1]
+        start = time.time() - days * 86400 if days else None
+        top = self.columns.top_sites(20, start)
+        self.table_widget.setRowCount(len(top))
+        for i, (host, count) in enumerate(top):
+            self.table_widget.setItem(i, 0, QTableWidgetItem(host or '(local)'))
+            self.table_widget.setItem(i, 1, QTableWidgetItem(str(count)))
+        per_day = self.columns.visits_per_day(start)
+        per_hour = self.columns.visits_per_hour(start)
+        total = sum(c for _, c in per_day)
+        if total:
+            peak_hour = max(range(24), key=lambda h: per_hour[h])
+            busiest = max(per_day, key=lambda d: d[1])
+            self.summary_label.setText(
+                f'{total} visitas em {len(per_day)} dias · média {total / len(per_day):.1f}/dia · '
+                f'dia mais ativo {busiest[0].isoformat()} ({busiest[1]}) · hora de pico {peak_hour:02d}h')
+        else:
+            self.summary_label.setText('Sem visitas neste período')
+
+    def on_item_selected(self, row: int, column: int = 0):
+        item = self.table_widget.item(row, 0)
+        if item and item.text() != '(local)':
+            self.selected_url = 'https://' + item.text()
+            self.accept()
 
     def get_selected_url(self):
         return self.selected_url
@@ -799,25 +3065,36 @@ class PasswordsDialog(QDialog):
         label = QLabel('Senhas guardadas (encriptadas):')
         layout.addWidget(label)
 
-        self.table_widget = QTableWidget()
-        self.table_widget.setColumnCount(3)
-        self.table_widget.setHorizontalHeaderLabels(['Serviço', 'Utilizador', ''])
-        header = self.table_widget.horizontalHeader()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('Filtrar por serviço ou utilizador...')
+        self.search_edit.setClearButtonEnabled(True)
+        layout.addWidget(self.search_edit)
+
+        # Filtra enquanto se escreve (com pequeno debounce)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(120)
+        self.search_timer.timeout.connect(self.refresh_table)
+        self.search_edit.textChanged.connect(lambda _: self.search_timer.start())
+
+        # Senhas carregadas por páginas conforme o scroll
+        self.model = PasswordTableModel(password_manager, self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setSelectionBehavior(QTableView.SelectRows)
+        self.table_view.verticalHeader().hide()
+        # altura fixa: a vista não mede as linhas uma a uma
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.delete_delegate = ButtonDelegate(self.table_view)
+        self.delete_delegate.clicked.connect(lambda index: self.delete_password(index.row()))
+        self.table_view.setItemDelegateForColumn(PasswordTableModel.DELETE_COLUMN, self.delete_delegate)
+        header = self.table_view.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
         header.setSectionResizeMode(1, QHeaderView.Stretch)
-        layout.addWidget(self.table_widget)
-
-        # Carregar senhas
-        if password_manager:
-            for i, pwd in enumerate(password_manager.passwords):
-                self.table_widget.insertRow(i)
-                service = QTableWidgetItem(pwd.get('service', ''))
-                username = QTableWidgetItem(pwd.get('username', ''))
-                delete_btn = QPushButton('Apagar')
-                delete_btn.clicked.connect(lambda checked, row=i: self.delete_password(row))
-                self.table_widget.setItem(i, 0, service)
-                self.table_widget.setItem(i, 1, username)
-                self.table_widget.setCellWidget(i, 2, delete_btn)
+        header.setSectionResizeMode(PasswordTableModel.DELETE_COLUMN, QHeaderView.Fixed)
+        header.resizeSection(PasswordTableModel.DELETE_COLUMN, 90)
+        layout.addWidget(self.table_view)
+        self.model.fetchMore()
 
         # Formulário para adicionar nova senha
         form_layout = QFormLayout()
@@ -856,36 +3133,26 @@ class PasswordsDialog(QDialog):
             self.service_edit.clear()
             self.username_edit.clear()
             self.password_edit.clear()
-            # Recarregar tabela
-            self.refresh_table()
+            # só a linha desta senha muda
+            self.model.refresh_entry(self.password_manager.entry_id(service, username))
         except Exception as e:
             QMessageBox.critical(self, 'Erro', f'Falha ao adicionar senha: {e}')
 
     def delete_password(self, row: int):
         """Remove senha da linha especificada"""
-        service = self.table_widget.item(row, 0).text()
-        username = self.table_widget.item(row, 1).text()
+        entry = self.model.entries[row]
+        service, username = entry['service'], entry['username']
         reply = QMessageBox.question(self, 'Confirmar',
                                     f'Deseja apagar a senha para {service}/{username}?',
                                     QMessageBox.Yes | QMessageBox.No)
         if reply == QMessageBox.Yes:
             self.password_manager.remove_password(service, username)
-            self.refresh_table()
+            self.model.remove_login(service, username)
             QMessageBox.information(self, 'Sucesso', 'Senha removida')
 
     def refresh_table(self):
-        """Recarrega tabela de senhas"""
-        self.table_widget.setRowCount(0)
-        if self.password_manager:
-            for i, pwd in enumerate(self.password_manager.passwords):
-                self.table_widget.insertRow(i)
-                service = QTableWidgetItem(pwd.get('service', ''))
-                username = QTableWidgetItem(pwd.get('username', ''))
-                delete_btn = QPushButton('Apagar')
-                delete_btn.clicked.connect(lambda checked, row=i: self.delete_password(row))
-                self.table_widget.setItem(i, 0, service)
-                self.table_widget.setItem(i, 1, username)
-                self.table_widget.setCellWidget(i, 2, delete_btn)
+        """Recarrega a tabela com o filtro atual"""
+        self.model.set_filter(self.search_edit.text().strip())
 
 
 class FirebaseLoginDialog(QDialog):
@@ -977,4 +3244,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # necessário para o pool de processos do importador no executável
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,86 @@
+"""
+Secret Cache - Cache de curta duração para senhas desencriptadas
+
+- Cada valor fica num bytearray e é sobrescrito com zeros quando expira,
+  quando é removido ou quando a cache é limpa
+- A expiração é fixa a partir do momento em que o valor entra (não se
+  renova com o uso); um temporizador em segundo plano limpa os expirados
+  mesmo que ninguém volte a pedir nada
+
+As strings devolvidas por get() são cópias que o Python não permite apagar;
+a cache só garante que a sua própria cópia não fica em memória.
+"""
+
+import threading
+import time
+
+
+TTL = 60.0
+
+
+def _zero(buffer: bytearray):
+    buffer[:] = bytes(len(buffer))
+
+
+class SecretCache:
+    """Valores desencriptados por chave, apagados ao fim de ttl segundos"""
+
+    def __init__(self, ttl: float = TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}   # chave -> (bytearray, expira_em)
+        self._timer = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key) -> str:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            buffer, expires = entry
+            if time.monotonic() >= expires:
+                del self.entries[key]
+                _zero(buffer)
+                return None
+            return buffer.decode('utf-8')
+
+    def put(self, key, secret: str):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                _zero(old[0])
+            self.entries[key] = (bytearray(secret.encode('utf-8')), time.monotonic() + self.ttl)
+            if self._timer is None:
+                self._schedule(self.ttl)
+
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                _zero(entry[0])
+
+    def clear(self):
+        with self.lock:
+            for buffer, _ in self.entries.values():
+                _zero(buffer)
+            self.entries.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _schedule(self, delay: float):
+        """Chamado com o lock adquirido"""
+        self._timer = threading.Timer(max(delay, 0.01), self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _expire(self):
+        with self.lock:
+            now = time.monotonic()
+            for key in [k for k, (_, expires) in self.entries.items() if expires <= now]:
+                _zero(self.entries.pop(key)[0])
+            self._timer = None
+            if self.entries:
+                self._schedule(min(expires for _, expires in self.entries.values()) - now)
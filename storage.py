@@ -0,0 +1,475 @@
+"""
+Storage - Armazenamento SQLite partilhado para histórico, bookmarks e senhas
+Usa o módulo sqlite3 da biblioteca padrão (sem dependências externas)
+
+- Um único ficheiro pixlet.db em modo WAL
+- Índices em url, timestamp e (service, username)
+- URLs/serviços guardados com chave canónica (url_canon)
+- Histórico agregado por URL (urls) + log compacto de visitas (visits)
+- Índice full-text (FTS5 trigram) sobre títulos e URLs do histórico
+- Migrações de esquema via PRAGMA user_version
+- Write-behind: commits agrupados numa thread em background
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from url_canon import canonical_url, service_key
+
+
+DB_NAME = 'pixlet.db'
+
+
+def _run_script(conn, script: str):
+    """Executa as instruções de um script uma a uma
+
+    Ao contrário de executescript (que faz COMMIT antes de começar), não
+    sai da transação aberta pela migração.
+    """
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        # blocos de triggers têm ';' no meio: só executar instruções completas
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ''
+    if statement.strip():
+        conn.execute(statement)
+
+
+def _migrate_v1(conn):
+    """Esquema inicial: histórico, bookmarks e senhas"""
+    _run_script(conn, '''
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_url ON history(url);
+        CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+
+        CREATE TABLE IF NOT EXISTS bookmarks (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            added TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_bookmarks_url ON bookmarks(url);
+
+        CREATE TABLE IF NOT EXISTS passwords (
+            id INTEGER PRIMARY KEY,
+            service TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL,
+            added TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_passwords_service_user ON passwords(service, username);
+    ''')
+
+
+def _migrate_v2(conn):
+    """Índice full-text (trigram) sobre títulos e URLs do histórico
+
+    Tabela FTS5 de conteúdo externo mantida por triggers, por isso cada
+    add_entry atualiza o índice incrementalmente. Se o SQLite não tiver
+    FTS5/trigram a pesquisa cai para LIKE.
+    """
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                url, title, content='history', content_rowid='id', tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+    _run_script(conn, '''
+        CREATE TRIGGER IF NOT EXISTS history_fts_ai AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts(rowid, url, title) VALUES (new.id, new.url, new.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS history_fts_ad AFTER DELETE ON history BEGIN
+            INSERT INTO history_fts(history_fts, rowid, url, title)
+            VALUES ('delete', old.id, old.url, old.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS history_fts_au AFTER UPDATE ON history BEGIN
+            INSERT INTO history_fts(history_fts, rowid, url, title)
+            VALUES ('delete', old.id, old.url, old.title);
+            INSERT INTO history_fts(rowid, url, title) VALUES (new.id, new.url, new.title);
+        END;
+        INSERT INTO history_fts(history_fts) VALUES ('rebuild');
+    ''')
+
+
+def _migrate_v3(conn):
+    """Modelo agregado: um registo por URL + log compacto de visitas
+
+    urls guarda título, nº de visitas e primeira/última visita (epoch);
+    visits guarda só (url_id, epoch). O índice full-text passa a ser
+    sobre urls, com uma linha por URL em vez de uma por visita.
+    """
+    _run_script(conn, '''
+        CREATE TABLE IF NOT EXISTS urls (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL DEFAULT '',
+            visit_count INTEGER NOT NULL DEFAULT 0,
+            first_visit INTEGER NOT NULL,
+            last_visit INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_urls_last_visit ON urls(last_visit);
+
+        CREATE TABLE IF NOT EXISTS visits (
+            url_id INTEGER NOT NULL REFERENCES urls(id) ON DELETE CASCADE,
+            visited_at INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_visits_time ON visits(visited_at);
+        CREATE INDEX IF NOT EXISTS idx_visits_url ON visits(url_id);
+
+        CREATE TEMP TABLE history_epoch AS
+            SELECT id, url, title,
+                   COALESCE(CAST(strftime('%s', substr(timestamp, 1, 19), 'utc') AS INTEGER), 0) AS ts
+            FROM history;
+        INSERT INTO urls (url, title, visit_count, first_visit, last_visit)
+            SELECT url,
+                   (SELECT h2.title FROM history_epoch h2 WHERE h2.url = h.url ORDER BY h2.id DESC LIMIT 1),
+                   COUNT(*), MIN(ts), MAX(ts)
+            FROM history_epoch h GROUP BY url;
+        INSERT INTO visits (url_id, visited_at)
+            SELECT u.id, h.ts FROM history_epoch h JOIN urls u ON u.url = h.url ORDER BY h.id;
+        DROP TABLE history_epoch;
+
+        DROP TRIGGER IF EXISTS history_fts_ai;
+        DROP TRIGGER IF EXISTS history_fts_ad;
+        DROP TRIGGER IF EXISTS history_fts_au;
+        DROP TABLE IF EXISTS history_fts;
+        DROP TABLE IF EXISTS history;
+    ''')
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS urls_fts USING fts5(
+                url, title, content='urls', content_rowid='id', tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+    _run_script(conn, '''
+        CREATE TRIGGER IF NOT EXISTS urls_fts_ai AFTER INSERT ON urls BEGIN
+            INSERT INTO urls_fts(rowid, url, title) VALUES (new.id, new.url, new.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS urls_fts_ad AFTER DELETE ON urls BEGIN
+            INSERT INTO urls_fts(urls_fts, rowid, url, title)
+            VALUES ('delete', old.id, old.url, old.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS urls_fts_au AFTER UPDATE OF url, title ON urls
+        WHEN old.url IS NOT new.url OR old.title IS NOT new.title BEGIN
+            INSERT INTO urls_fts(urls_fts, rowid, url, title)
+            VALUES ('delete', old.id, old.url, old.title);
+            INSERT INTO urls_fts(rowid, url, title) VALUES (new.id, new.url, new.title);
+        END;
+        INSERT INTO urls_fts(urls_fts) VALUES ('rebuild');
+    ''')
+
+
+def _migrate_v4(conn):
+    """Índice (url_id, visited_at): procurar visitas repetidas ao importar
+
+    Substitui idx_visits_url, que passa a ser um prefixo do novo índice.
+    """
+    _run_script(conn, '''
+        CREATE INDEX IF NOT EXISTS idx_visits_url_time ON visits(url_id, visited_at);
+        DROP INDEX IF EXISTS idx_visits_url;
+    ''')
+
+
+def _migrate_v5(conn):
+    """Chaves canónicas (url_canon) para histórico, bookmarks e senhas
+
+    O histórico passa a guardar o URL canónico, por isso URLs que só
+    diferem em fragmento, tracking, porta, etc. são fundidos num só.
+    Bookmarks e senhas mantêm o texto original e ganham uma coluna de
+    chave indexada para procurar e evitar duplicados.
+    """
+    conn.create_function('canonical_url', 1, canonical_url, deterministic=True)
+    conn.create_function('service_key', 1, service_key, deterministic=True)
+    _run_script(conn, '''
+        ALTER TABLE bookmarks ADD COLUMN url_key TEXT NOT NULL DEFAULT '';
+        UPDATE bookmarks SET url_key = canonical_url(url);
+        CREATE INDEX IF NOT EXISTS idx_bookmarks_key ON bookmarks(url_key);
+        DROP INDEX IF EXISTS idx_bookmarks_url;
+
+        ALTER TABLE passwords ADD COLUMN service_key TEXT NOT NULL DEFAULT '';
+        UPDATE passwords SET service_key = service_key(service);
+        CREATE INDEX IF NOT EXISTS idx_passwords_key_user ON passwords(service_key, username);
+        DROP INDEX IF EXISTS idx_passwords_service_user;
+    ''')
+    rows = conn.execute(
+        'SELECT id, url, title, visit_count, first_visit, last_visit FROM urls').fetchall()
+    for url_id, url, title, visit_count, first_visit, last_visit in rows:
+        canon = canonical_url(url)
+        if canon == url:
+            continue
+        target = conn.execute(
+            'SELECT id, last_visit FROM urls WHERE url = ?', (canon,)).fetchone()
+        if target is None:
+            conn.execute('UPDATE urls SET url = ? WHERE id = ?', (canon, url_id))
+            continue
+        # fundir no URL canónico já existente
+        conn.execute('UPDATE visits SET url_id = ? WHERE url_id = ?', (target[0], url_id))
+        conn.execute(
+            'UPDATE urls SET '
+            "  title = CASE WHEN ? > last_visit AND ? != '' THEN ? ELSE title END, "
+            '  visit_count = visit_count + ?, '
+            '  first_visit = MIN(first_visit, ?), last_visit = MAX(last_visit, ?) '
+            'WHERE id = ?',
+            (last_visit, title, title, visit_count, first_visit, last_visit, target[0]))
+        conn.execute('DELETE FROM urls WHERE id = ?', (url_id,))
+
+
+def _migrate_v6(conn):
+    """Árvore de bookmarks: pastas, separadores e ordem dentro de cada pasta
+
+    Cada nó guarda o pai e uma posição fracionária: mover um nó só
+    reescreve esse registo (a posição fica entre as dos novos vizinhos).
+    """
+    _run_script(conn, '''
+        ALTER TABLE bookmarks ADD COLUMN kind TEXT NOT NULL DEFAULT 'bookmark';
+        ALTER TABLE bookmarks ADD COLUMN parent_id INTEGER REFERENCES bookmarks(id) ON DELETE CASCADE;
+        ALTER TABLE bookmarks ADD COLUMN position REAL NOT NULL DEFAULT 0;
+        UPDATE bookmarks SET position = id;
+        CREATE INDEX IF NOT EXISTS idx_bookmarks_parent ON bookmarks(parent_id, position);
+    ''')
+
+
+def _migrate_v7(conn):
+    """Resultado da verificação de senhas comprometidas, por entrada
+
+    breach_count NULL = ainda não verificada; breach_source identifica a
+    lista usada (verificar com outra lista repete a verificação).
+    """
+    _run_script(conn, '''
+        ALTER TABLE passwords ADD COLUMN breach_count INTEGER;
+        ALTER TABLE passwords ADD COLUMN breach_source TEXT;
+    ''')
+
+
+# Cada entrada leva a base de dados da versão i para i + 1 (dentro de uma
+# transação aberta por Storage._migrate: não podem fazer COMMIT)
+MIGRATIONS = [
+    _migrate_v1,
+    _migrate_v2,
+    _migrate_v3,
+    _migrate_v4,
+    _migrate_v5,
+    _migrate_v6,
+    _migrate_v7,
+]
+
+
+class Storage:
+    """Ligação SQLite partilhada pelos managers
+
+    As escritas são executadas de imediato (leituras na mesma ligação já as
+    veem), mas o commit é diferido: uma thread em background faz no máximo
+    um commit a cada flush_interval_ms, juntando todas as escritas entretanto
+    feitas. close() (ou commit()) faz o flush final de forma síncrona.
+    """
+
+    def __init__(self, base_path: str, flush_interval_ms: int = 500):
+        self.db_file = os.path.join(base_path, DB_NAME)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.lock = threading.RLock()
+        # isolation_level=None: transações controladas explicitamente
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        # cache maior: importações e índices grandes sem ir ao disco a cada página
+        self.conn.execute('PRAGMA cache_size=-32000')
+        self._migrate()
+        self._dirty = threading.Event()
+        self._closed = False
+        # último erro de commit() (quando retorna False)
+        self.commit_error = None
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _migrate(self):
+        """Aplica migrações de esquema pendentes
+
+        Cada migração e a nova user_version são gravadas na mesma transação:
+        uma migração interrompida não deixa alterações a meio, e é repetida
+        por inteiro na próxima abertura.
+        """
+        with self.lock:
+            version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+            for i in range(version, len(MIGRATIONS)):
+                self.conn.execute('BEGIN')
+                try:
+                    MIGRATIONS[i](self.conn)
+                    self.conn.execute(f'PRAGMA user_version = {i + 1}')
+                except BaseException:
+                    self.conn.execute('ROLLBACK')
+                    raise
+                self.conn.execute('COMMIT')
+
+    def has_table(self, name: str) -> bool:
+        row = self.query_one(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+        return row is not None
+
+    @property
+    def schema_version(self) -> int:
+        with self.lock:
+            return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def _begin(self):
+        """Abre a transação diferida se ainda não existir (lock adquirido)"""
+        if not self.conn.in_transaction:
+            self.conn.execute('BEGIN')
+        self._dirty.set()
+
+    def _flush_loop(self):
+        """Thread de write-behind: commits agrupados"""
+        while not self._closed:
+            self._dirty.wait()
+            if self._closed:
+                break
+            time.sleep(self.flush_interval)
+            if not self.commit():
+                print(f'Erro ao gravar base de dados: {self.commit_error}')
+
+    @contextmanager
+    def transaction(self):
+        """Várias escritas atómicas (savepoint dentro da transação diferida)"""
+        with self.lock:
+            self._begin()
+            self.conn.execute('SAVEPOINT tx')
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute('ROLLBACK TO tx')
+                self.conn.execute('RELEASE tx')
+                raise
+            self.conn.execute('RELEASE tx')
+
+    def execute(self, sql: str, params=()) -> int:
+        """Executa uma escrita; retorna o lastrowid"""
+        with self.lock:
+            self._begin()
+            return self.conn.execute(sql, params).lastrowid
+
+    def execute_rowcount(self, sql: str, params=()) -> int:
+        """Executa uma escrita e retorna o número de linhas afetadas"""
+        with self.lock:
+            self._begin()
+            return self.conn.execute(sql, params).rowcount
+
+    def executemany(self, sql: str, rows):
+        """Executa escritas em lote de forma atómica"""
+        with self.transaction() as conn:
+            conn.executemany(sql, rows)
+
+    def query(self, sql: str, params=()) -> list:
+        """Executa uma leitura e retorna todas as linhas"""
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params=()):
+        """Executa uma leitura e retorna a primeira linha (ou None)"""
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def scalar(self, sql: str, params=()):
+        """Executa uma leitura e retorna o primeiro valor"""
+        row = self.query_one(sql, params)
+        return row[0] if row else None
+
+    def reader(self) -> sqlite3.Connection:
+        """Nova ligação só de leitura (para leituras longas noutra thread)
+
+        Faz flush antes, para que a ligação veja todas as escritas feitas.
+        """
+        self.commit()
+        uri = 'file:' + pathname2url(self.db_file) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def commit(self) -> bool:
+        """Flush imediato das escritas pendentes
+
+        Retorna False se o COMMIT falhou (erro em commit_error); as escritas
+        continuam pendentes e o próximo flush tenta de novo.
+        """
+        with self.lock:
+            self._dirty.clear()
+            if self._closed:
+                return False
+            try:
+                if self.conn.in_transaction:
+                    self.conn.execute('COMMIT')
+            except sqlite3.Error as e:
+                self.commit_error = e
+                self._dirty.set()
+                return False
+            return True
+
+    def rollback(self):
+        """Descarta as escritas ainda não gravadas"""
+        with self.lock:
+            self._dirty.clear()
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+
+    def close(self):
+        """Flush final e fecho da ligação (checkpoint do WAL)"""
+        with self.lock:
+            if self._closed:
+                return
+            if not self.commit():
+                print(f'Erro ao gravar base de dados: {self.commit_error}')
+            self._closed = True
+            self._dirty.set()
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+
+
+def write_json_atomic(path: str, data):
+    """Escreve JSON num ficheiro temporário e troca-o atomicamente"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def migrate_json_file(path: str, rows_loader, insert):
+    """Migração única de um ficheiro JSON legado
+
+    rows_loader(path) devolve os registos (lista ou iterável em streaming);
+    insert(rows) grava-os e retorna quantos gravou. O ficheiro original é
+    renomeado para <path>.migrated.
+    """
+    if not os.path.exists(path):
+        return 0
+    try:
+        count = insert(rows_loader(path)) or 0
+    except Exception as e:
+        print(f'Erro ao migrar {path}: {e}')
+        return 0
+    try:
+        os.replace(path, path + '.migrated')
+    except Exception:
+        pass
+    return count
@@ -0,0 +1,116 @@
+"""
+Tab Lifecycle - Suspende abas em segundo plano para poupar memória e CPU
+
+Usa o QWebEnginePage.LifecycleState de cada aba:
+- Active: a aba atual e as que estiveram em uso há pouco
+- Frozen: em segundo plano há freeze_after segundos (sem JS nem timers,
+  mas o renderer continua em memória)
+- Discarded: em segundo plano há discard_after segundos, ou fora das
+  max_live abas usadas mais recentemente (LRU); o renderer é libertado
+
+Abas fixas e abas a tocar áudio ficam sempre ativas, e nenhuma aba passa
+do recommendedState da página (o Qt recomenda Active ou Frozen quando a
+suspensão perderia áudio ou texto escrito num formulário). Ao selecionar
+uma aba ela volta a Active; uma aba descartada recarrega o seu URL e fica
+com restoring = True até esse carregamento terminar (não é uma visita nova).
+"""
+
+import time
+
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtWebEngineCore import QWebEnginePage
+
+
+FREEZE_AFTER = 5 * 60
+DISCARD_AFTER = 30 * 60
+MAX_LIVE_TABS = 8
+CHECK_INTERVAL_MS = 30 * 1000
+
+State = QWebEnginePage.LifecycleState
+# do estado que gasta mais recursos para o que gasta menos
+_RANK = {State.Active: 0, State.Frozen: 1, State.Discarded: 2}
+
+
+class TabLifecycleManager(QObject):
+    """Congela e descarta as abas de um QTabWidget conforme o tempo sem uso
+
+    As abas são BrowserTab: cada uma tem view, last_active (time.monotonic()
+    da última vez que foi a aba atual), pinned e restoring.
+    """
+
+    def __init__(self, tabs, freeze_after: float = FREEZE_AFTER,
+                 discard_after: float = DISCARD_AFTER, max_live: int = MAX_LIVE_TABS,
+                 interval_ms: int = CHECK_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.tabs = tabs
+        self.freeze_after = freeze_after
+        self.discard_after = discard_after
+        self.max_live = max_live
+        self.current = None
+        tabs.currentChanged.connect(self.on_current_changed)
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.apply)
+        self.timer.start()
+
+    def on_current_changed(self, index: int):
+        now = time.monotonic()
+        previous, self.current = self.current, self.tabs.widget(index)
+        if previous is not None and previous is not self.current:
+            # em segundo plano a partir de agora
+            previous.last_active = now
+        if self.current is not None:
+            self.current.last_active = now
+            self.wake(self.current)
+        # uma aba acordada pode pôr outra fora do limite de abas vivas
+        self.apply()
+
+    @staticmethod
+    def wake(tab):
+        """Volta a Active (uma aba descartada recarrega a página)"""
+        page = tab.view.page()
+        state = page.lifecycleState()
+        if state != State.Active:
+            tab.restoring = state == State.Discarded
+            page.setLifecycleState(State.Active)
+
+    def apply(self):
+        """Passa cada aba em segundo plano para o estado que lhe cabe"""
+        now = time.monotonic()
+        current = self.tabs.currentWidget()
+        background = []
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if tab is current:
+                tab.last_active = now
+            else:
+                background.append(tab)
+        # as usadas há menos tempo primeiro: as restantes passam do limite
+        background.sort(key=lambda t: t.last_active, reverse=True)
+        live = 1 if current is not None else 0
+        for tab in background:
+            idle = now - tab.last_active
+            if idle >= self.discard_after:
+                target = State.Discarded
+            elif idle >= self.freeze_after:
+                target = State.Frozen
+            else:
+                target = State.Active
+            if live >= self.max_live:
+                target = State.Discarded
+            target = self._allowed(tab, target)
+            page = tab.view.page()
+            # só avança; voltar a Active é na seleção (wake)
+            if _RANK[target] > _RANK[page.lifecycleState()]:
+                page.setLifecycleState(target)
+            if page.lifecycleState() != State.Discarded:
+                live += 1
+
+    @staticmethod
+    def _allowed(tab, target):
+        """target limitado pelas exceções e pelo recommendedState da página"""
+        page = tab.view.page()
+        if tab.pinned or page.recentlyAudible():
+            return State.Active
+        recommended = page.recommendedState()
+        return target if _RANK[target] <= _RANK[recommended] else recommended
@@ -0,0 +1,84 @@
+import heapq
+import os
+import random
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from autocomplete import FrecencyIndex, strip_url, url_keys  # noqa: E402
+
+
+WORDS = ['news', 'mail', 'docs', 'shop', 'video', 'wiki', 'python', 'search', 'login', 'api']
+NOW = 1700000000
+
+
+def make_rows(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        host = f'{rng.choice(WORDS)}{i % 500}.example{i % 7}.com'
+        path = '/'.join(rng.choice(WORDS) + str(rng.randint(0, 99)) for _ in range(2))
+        rows.append((f'https://{host}/{path}?id={i}', f't{i}', rng.randint(1, 20),
+                     NOW - rng.randint(0, 90 * 86400)))
+    return rows
+
+
+def brute_force(index: FrecencyIndex, text: str, limit: int) -> list:
+    """Sugestões calculadas percorrendo todos os URLs"""
+    query = strip_url(text)
+    matches = [uid for url, uid in index.ids.items()
+               if any(key.startswith(query) for key in url_keys(url))]
+    best = heapq.nlargest(limit, matches, key=index.scores.__getitem__)
+    return [index.urls[uid] for uid in best]
+
+
+class SuggestTest(unittest.TestCase):
+    def assertMatchesBruteForce(self, index, queries):
+        for query in queries:
+            got = [url for url, _ in index.suggest(query, 8)]
+            want = brute_force(index, query, 8)
+            # empates de pontuação podem vir por outra ordem
+            self.assertEqual([index.scores[index.ids[u]] for u in got],
+                             [index.scores[index.ids[u]] for u in want], query)
+
+    def test_matches_brute_force_after_updates(self):
+        index = FrecencyIndex()
+        rows = make_rows(3000)
+        index.load(rows)
+        queries = ['n', 'ne', 'new', 'news1', 'v', 'vi', 'py', 'example3', 'e', 'zz']
+        self.assertMatchesBruteForce(index, queries)
+
+        rng = random.Random(2)
+        for url, title, _, _ in rng.sample(rows, 300):
+            index.add_visit(url, title, NOW + rng.randint(0, 86400))
+        for i in range(100):
+            index.add_bookmark(f'https://novo{i}.org/news', 'novo', NOW)
+        # remove os mais bem pontuados, para esvaziar as listas dos prefixos
+        for url in [url for url, _ in index.suggest('n', 8)] + [url for url, _ in index.suggest('v', 8)]:
+            index.remove(url)
+        for url, _, _, _ in rng.sample(rows, 500):
+            index.remove(url)
+        self.assertMatchesBruteForce(index, queries + ['no', 'novo1'])
+
+    def test_short_prefix_cost_does_not_grow_with_index(self):
+        def cost(count: int) -> float:
+            index = FrecencyIndex()
+            index.load(make_rows(count))
+            timings = []
+            for _ in range(5):
+                start = time.perf_counter()
+                for query in ('n', 'ne', 'v', 'vi', 'p', 'py', 'e'):
+                    index.suggest(query, 8)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        small, large = cost(2000), cost(40000)
+        # percorrer os candidatos seria ~20x mais lento no índice maior
+        self.assertLess(large, small * 4 + 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import Storage  # noqa: E402
+
+try:
+    from PySide6.QtCore import QModelIndex
+    from qt_browser import BookmarksManager, BookmarkTreeModel
+except ImportError:
+    # sem PySide6/QtWebEngine
+    BookmarkTreeModel = None
+
+
+@unittest.skipIf(BookmarkTreeModel is None, 'qt_browser não disponível')
+class MoveInPartlyLoadedFolderTest(unittest.TestCase):
+    COUNT = 500
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = Storage(self.tmp.name)
+        self.manager = BookmarksManager(self.tmp.name, self.storage)
+        self.manager.add_bookmarks([{'url': f'https://site{i}.com/', 'title': f'b{i}'}
+                                    for i in range(self.COUNT)])
+        self.model = BookmarkTreeModel(self.manager)
+        self.model.fetchMore(QModelIndex())
+        self.page = self.model.rowCount()
+        self.assertLess(self.page, self.COUNT)
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def stored_titles(self) -> list:
+        return [c['title'] for c in self.manager.children(None)]
+
+    def loaded_titles(self) -> list:
+        return [self.model.node(self.model.index(row, 0)).title for row in range(self.model.rowCount())]
+
+    def move_down(self, row: int):
+        # destino no formato do beginMoveRows, como em BookmarksDialog.shift_selected
+        self.assertTrue(self.model.move_index(self.model.index(row, 0), QModelIndex(), row + 2))
+
+    def test_move_before_unloaded_sibling(self):
+        last = self.page - 1
+        self.move_down(last - 1)
+        stored = self.stored_titles()
+        self.assertEqual(stored[last - 1:last + 1], [f'b{last}', f'b{last - 1}'])
+        self.assertEqual(len(stored), self.COUNT)
+        # a árvore continua a mostrar os nós pela ordem da BD, sem falhas
+        loaded = self.loaded_titles()
+        self.assertEqual(loaded, stored[:len(loaded)])
+        self.assertGreaterEqual(len(loaded), self.page)
+
+    def test_move_last_loaded_node(self):
+        last = self.page - 1
+        self.move_down(last)
+        stored = self.stored_titles()
+        self.assertEqual(stored[last:last + 2], [f'b{last + 1}', f'b{last}'])
+        loaded = self.loaded_titles()
+        self.assertEqual(loaded, stored[:len(loaded)])
+
+
+if __name__ == '__main__':
+    unittest.main()
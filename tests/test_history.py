@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import Storage  # noqa: E402
+
+try:
+    from qt_browser import HistoryManager
+except ImportError:
+    # sem PySide6/QtWebEngine
+    HistoryManager = None
+
+
+@unittest.skipIf(HistoryManager is None, 'qt_browser não disponível')
+class PagingTest(unittest.TestCase):
+    COUNT = 450
+    PAGE = 100
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = Storage(self.tmp.name)
+        self.history = HistoryManager(self.tmp.name, self.storage)
+        # muitos URLs com a mesma última visita: a ordem desempata pelo id
+        self.history.add_visits([(f'https://site{i}.com/page', f'página {i}', 1700000000 + i // 50)
+                                 for i in range(self.COUNT)])
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def page_through(self, fetch, on_page=None) -> list:
+        seen, after = [], None
+        while True:
+            page = fetch(after, self.PAGE)
+            seen += [entry.url for entry in page]
+            if len(page) < self.PAGE:
+                return seen
+            after = page[-1]
+            if on_page:
+                on_page(page)
+
+    def delete_page(self, page):
+        # remove as entradas já mostradas (como limpar o período mais recente)
+        for entry in page:
+            self.storage.execute('DELETE FROM visits WHERE url_id = ?', (entry.url_id,))
+            self.storage.execute('DELETE FROM urls WHERE id = ?', (entry.url_id,))
+
+    def test_recent_pages_survive_deletions(self):
+        expected = [entry.url for entry in self.history.get_recent(self.COUNT)]
+        seen = self.page_through(lambda after, limit: self.history.get_recent(limit, after), self.delete_page)
+        self.assertEqual(seen, expected)
+
+    def test_search_pages_survive_deletions(self):
+        expected = [entry.url for entry in self.history.search('site', self.COUNT)]
+        self.assertEqual(len(expected), self.COUNT)
+        seen = self.page_through(lambda after, limit: self.history.search('site', limit, after), self.delete_page)
+        self.assertEqual(seen, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
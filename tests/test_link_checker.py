@@ -0,0 +1,130 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from link_checker import DEAD, OK, REDIRECTED, SLOW, LinkChecker  # noqa: E402
+
+
+class LinkCheckerTest(unittest.IsolatedAsyncioTestCase):
+    """Verificações contra um servidor HTTP local (asyncio.start_server)"""
+
+    async def asyncSetUp(self):
+        self.requests = []
+        self.writers = set()
+        self.release = asyncio.Event()
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.base = f'http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}'
+
+    async def asyncTearDown(self):
+        self.release.set()
+        self.server.close()
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                method, path, _ = line.decode().split(' ', 2)
+                while (await reader.readline()) not in (b'\r\n', b''):
+                    pass
+                self.requests.append((method, path, time.monotonic()))
+                if path == '/hang':
+                    # nunca responde
+                    await self.release.wait()
+                    return
+                if path == '/moved':
+                    head, body = '301 Moved Permanently\r\nLocation: /ok/moved', b''
+                elif path == '/found':
+                    head, body = f'302 Found\r\nLocation: {self.base}/ok/found', b''
+                elif path == '/loop':
+                    head, body = '302 Found\r\nLocation: /loop', b''
+                elif path == '/missing':
+                    head, body = '404 Not Found', b'not found'
+                elif path == '/nohead' and method == 'HEAD':
+                    head, body = '405 Method Not Allowed', b''
+                elif path == '/slow':
+                    await asyncio.sleep(0.3)
+                    head, body = '200 OK', b'hello world'
+                else:
+                    head, body = '200 OK', b'hello world'
+                writer.write(f'HTTP/1.1 {head}\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+                             + (body if method == 'GET' else b''))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def check(self, path: str, **options):
+        checker = LinkChecker(**{'host_rate': 0, 'timeout': 2.0, **options})
+        return await checker.check(self.base + path)
+
+    async def test_ok(self):
+        result = await self.check('/page')
+        self.assertEqual((result.status, result.code), (OK, 200))
+        self.assertEqual(result.final_url, self.base + '/page')
+
+    async def test_redirects_are_followed(self):
+        moved = await self.check('/moved')
+        self.assertEqual((moved.status, moved.code), (REDIRECTED, 200))
+        self.assertEqual(moved.final_url, self.base + '/ok/moved')
+        found = await self.check('/found')
+        self.assertEqual((found.status, found.final_url), (REDIRECTED, self.base + '/ok/found'))
+
+    async def test_redirect_loop_is_dead(self):
+        result = await self.check('/loop')
+        self.assertEqual(result.status, DEAD)
+        self.assertEqual(result.error, 'demasiados redirecionamentos')
+
+    async def test_not_found_is_dead(self):
+        result = await self.check('/missing')
+        self.assertEqual((result.status, result.code), (DEAD, 404))
+        # 404 a HEAD é repetido com GET antes de dar o link como morto
+        self.assertEqual([m for m, p, _ in self.requests if p == '/missing'], ['HEAD', 'GET'])
+
+    async def test_head_refused_falls_back_to_get(self):
+        result = await self.check('/nohead')
+        self.assertEqual((result.status, result.code), (OK, 200))
+        self.assertEqual([m for m, _, _ in self.requests], ['HEAD', 'GET'])
+
+    async def test_hanging_server_times_out(self):
+        start = time.monotonic()
+        result = await self.check('/hang', timeout=0.3)
+        self.assertEqual((result.status, result.error), (DEAD, 'timeout'))
+        self.assertLess(time.monotonic() - start, 2.0)
+
+    async def test_slow_response(self):
+        result = await self.check('/slow', slow_seconds=0.1)
+        self.assertEqual(result.status, SLOW)
+
+    async def test_host_rate_limit(self):
+        count, rate = 6, 20.0
+        checker = LinkChecker(concurrency=count, host_rate=rate, timeout=2.0)
+        results = await checker.check_all([f'{self.base}/ok/{i}' for i in range(count)])
+        self.assertEqual([r.status for r in results], [OK] * count)
+        starts = sorted(t for _, _, t in self.requests)
+        self.assertEqual(len(starts), count)
+        # um pedido a cada 1/rate segundos, mesmo com todos os workers livres
+        self.assertGreaterEqual(starts[-1] - starts[0], (count - 1) / rate * 0.9)
+
+    async def test_results_are_cached(self):
+        checker = LinkChecker(host_rate=0, timeout=2.0)
+        first = await checker.check(self.base + '/page')
+        second = await checker.check(self.base + '/page')
+        self.assertIs(first, second)
+        self.assertEqual(len(self.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import Storage  # noqa: E402
+
+try:
+    from cryptography.fernet import Fernet
+    from qt_browser import PasswordManager
+except ImportError:
+    # sem cryptography ou sem QtWebEngine
+    PasswordManager = None
+
+
+def _deny_commit(action, arg1, arg2, db_name, trigger):
+    if action == sqlite3.SQLITE_TRANSACTION and arg1 == 'COMMIT':
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+@unittest.skipIf(PasswordManager is None, 'qt_browser/cryptography não disponíveis')
+class ReplaceKeyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = self.tmp.name
+        self.storage = Storage(self.base)
+        self.manager = PasswordManager(self.base, self.storage)
+        self.manager.add_password('https://example.com', 'ana', 'segredo-1')
+        self.manager.add_password('https://example.org', 'rui', 'segredo-2')
+        self.assertTrue(self.storage.commit())
+        with open(self.manager.key_file, 'rb') as f:
+            self.old_key = f.read()
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def reopen(self) -> PasswordManager:
+        self.storage.close()
+        self.storage = Storage(self.base)
+        return PasswordManager(self.base, self.storage)
+
+    def test_rotation_keeps_passwords(self):
+        self.manager.replace_key(Fernet.generate_key(), {})
+        manager = self.reopen()
+        self.assertNotEqual(manager.key, self.old_key)
+        self.assertEqual(manager.get_password('https://example.com', 'ana'), 'segredo-1')
+        self.assertEqual(manager.get_password('https://example.org', 'rui'), 'segredo-2')
+
+    def test_failed_commit_keeps_old_key(self):
+        self.storage.conn.set_authorizer(_deny_commit)
+        try:
+            with self.assertRaises(RuntimeError):
+                self.manager.replace_key(Fernet.generate_key(), {})
+        finally:
+            self.storage.conn.set_authorizer(None)
+
+        self.assertFalse(os.path.exists(self.manager.key_file + '.new'))
+        with open(self.manager.key_file, 'rb') as f:
+            self.assertEqual(f.read(), self.old_key)
+        # a reencriptação desfeita não é gravada por um flush posterior
+        self.assertTrue(self.storage.commit())
+        manager = self.reopen()
+        self.assertEqual(manager.key, self.old_key)
+        self.assertEqual(manager.get_password('https://example.com', 'ana'), 'segredo-1')
+        self.assertEqual(manager.get_password('https://example.org', 'rui'), 'segredo-2')
+
+
+if __name__ == '__main__':
+    unittest.main()
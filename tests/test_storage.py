@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import Storage, MIGRATIONS, DB_NAME  # noqa: E402
+
+
+# Abre a BD com a última migração trocada por uma que aplica o primeiro
+# ALTER e mata o processo antes de a migração terminar
+INTERRUPTED_MIGRATION = textwrap.dedent('''
+    import os, sys
+    sys.path.insert(0, {root!r})
+    import storage
+
+    def crash(conn):
+        conn.execute('ALTER TABLE passwords ADD COLUMN breach_count INTEGER')
+        os._exit(1)
+
+    storage.MIGRATIONS[-1] = crash
+    storage.Storage({base!r})
+''')
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def columns(self, table: str) -> set:
+        conn = sqlite3.connect(os.path.join(self.base, DB_NAME))
+        try:
+            return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        finally:
+            conn.close()
+
+    def test_new_database_reaches_latest_version(self):
+        storage = Storage(self.base)
+        try:
+            self.assertEqual(storage.schema_version, len(MIGRATIONS))
+        finally:
+            storage.close()
+
+    def test_reopen_after_interrupted_migration(self):
+        script = INTERRUPTED_MIGRATION.format(root=ROOT, base=self.base)
+        result = subprocess.run([sys.executable, '-c', script])
+        self.assertEqual(result.returncode, 1)
+        # o ALTER da migração interrompida não ficou gravado
+        self.assertNotIn('breach_count', self.columns('passwords'))
+
+        storage = Storage(self.base)
+        try:
+            self.assertEqual(storage.schema_version, len(MIGRATIONS))
+        finally:
+            storage.close()
+        self.assertTrue({'breach_count', 'breach_source'} <= self.columns('passwords'))
+
+    def test_failed_migration_is_rolled_back(self):
+        def fail(conn):
+            conn.execute('ALTER TABLE passwords ADD COLUMN breach_count INTEGER')
+            raise RuntimeError('falha a meio')
+
+        original = MIGRATIONS[-1]
+        MIGRATIONS[-1] = fail
+        try:
+            with self.assertRaises(RuntimeError):
+                Storage(self.base)
+        finally:
+            MIGRATIONS[-1] = original
+        self.assertNotIn('breach_count', self.columns('passwords'))
+
+        storage = Storage(self.base)
+        try:
+            self.assertEqual(storage.schema_version, len(MIGRATIONS))
+        finally:
+            storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+URL Canon - Forma canónica de URLs, usada como chave no histórico, bookmarks e senhas
+
+- Esquema e host em minúsculas, host internacional (IDN) em punycode
+- Sem porta por omissão (http:80, https:443, ...), sem fragmento (#...)
+- Sem parâmetros de tracking (utm_*, fbclid, gclid, ...)
+- Caminho vazio passa a '/', barra final removida nos restantes
+- Resultados em cache LRU: o mesmo URL é normalizado uma só vez
+
+Endereços sem host (about:, data:, javascript:) ficam como estão.
+"""
+
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+
+
+CACHE_SIZE = 65536
+
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ws': 80, 'wss': 443, 'ftp': 21}
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'yclid', '_ga',
+})
+
+
+def _host(hostname: str) -> str:
+    """Host em minúsculas e em ASCII (punycode)"""
+    host = hostname.rstrip('.')
+    if host.isascii():
+        return host
+    try:
+        return host.encode('idna').decode('ascii')
+    except UnicodeError:
+        return host
+
+
+def _is_tracking(param: str) -> bool:
+    name = param.partition('=')[0].lower()
+    return name.startswith('utm_') or name in TRACKING_PARAMS
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_url(url: str) -> str:
+    """Forma canónica de um URL (idempotente)"""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.netloc or parts.hostname is None:
+        return url
+    scheme = parts.scheme.lower()
+    host = _host(parts.hostname)
+    if ':' in host:
+        host = f'[{host}]'
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{port}'
+    userinfo = parts.netloc.rpartition('@')[0]
+    netloc = f'{userinfo}@{host}' if userinfo else host
+    path = parts.path.rstrip('/') or '/'
+    query = '&'.join(p for p in parts.query.split('&') if p and not _is_tracking(p))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def canonical_origin(url: str) -> str:
+    """Origem canónica (esquema://host[:porta]) de um URL; vazio se não tiver host
+
+    Um host sem esquema ('gmail.com', 'gmail.com/login') conta como https.
+    """
+    url = url.strip()
+    if '://' not in url:
+        scheme, colon, rest = url.partition('/')[0].partition(':')
+        if colon and not rest.isdigit():
+            # about:, data:, mailto:, ... (sem host)
+            return ''
+        url = 'https://' + url
+    canon = canonical_url(url)
+    parts = urlsplit(canon)
+    if not parts.netloc:
+        return ''
+    return f'{parts.scheme}://{parts.netloc.rpartition("@")[2]}'
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def service_key(service: str) -> str:
+    """Chave de um serviço de senhas: URL canónico, ou o nome em minúsculas"""
+    service = service.strip()
+    if '://' in service:
+        return canonical_url(service)
+    return service.lower()